@@ -0,0 +1,70 @@
+"""Benchmark: vectorized classify_batch vs. per-email classify_email
+
+Run from the repository root:
+
+    python benchmarks/bench_classify_batch.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.models.email_models import EmailAddress, EmailMessage  # noqa: E402
+from src.services.ai_service import AIEmailService  # noqa: E402
+
+BATCH_SIZES = [100, 1_000, 10_000]
+
+FILLER = (
+    "the team shared notes about the release while reviewing the attached "
+    "document for our quarterly plans with colleagues across several offices"
+).split()
+KEYWORDS = (
+    "meeting invoice sale thank urgent deadline party bank newsletter "
+    "linkedin help question schedule payment"
+).split()
+
+
+def make_emails(count: int, seed: int = 0):
+    """Build a folder of short emails with a mix of keywords"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    sender = EmailAddress(email="sender@example.com")
+    return [
+        EmailMessage(
+            id=str(i),
+            subject=" ".join(rng.choices(FILLER, k=4) + rng.choices(KEYWORDS, k=1)),
+            sender=sender,
+            recipients=[sender],
+            body=" ".join(rng.choices(FILLER, k=150) + rng.choices(KEYWORDS, k=5)),
+            date=now - timedelta(minutes=rng.randint(0, 180)),
+            folder="inbox"
+        )
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    service = AIEmailService()
+    print(f"{'emails':>8} {'per-email ms':>13} {'batch ms':>9} {'speedup':>8}")
+
+    for size in BATCH_SIZES:
+        emails = make_emails(size)
+        service.classify_batch(emails[:10])
+
+        start = time.perf_counter()
+        single = [service.classify_email(email) for email in emails]
+        per_email = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = service.classify_batch(emails)
+        batched = time.perf_counter() - start
+
+        assert batch == single
+        print(f"{size:>8} {per_email * 1e3:>13.1f} {batched * 1e3:>9.1f} {per_email / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark: chunked IMAP FETCH vs. one FETCH per message
+
+Uses the local IMAP stand-in from the test suite, with a configurable
+per-command latency to simulate a WAN link. Run from the repository root:
+
+    python benchmarks/bench_imap_fetch.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.models.email_models import EmailConfig  # noqa: E402
+from src.services.email_service import EmailService  # noqa: E402
+from tests.standin_server import StandinServer  # noqa: E402
+
+MESSAGES = 500
+LATENCIES = [0.0, 0.002, 0.01]
+
+
+def legacy_fetch(service: EmailService, limit: int) -> list:
+    """Fetch the way fetch_emails did before chunking: one FETCH per message"""
+    service.connect_imap()
+    service.imap_connection.select("INBOX")
+    _, numbers = service.imap_connection.search(None, "ALL")
+    emails = []
+    for num in numbers[0].split()[-limit:]:
+        _, data = service.imap_connection.fetch(num, "(RFC822)")
+        emails.append(service._parse_email(data[0][1], num.decode(), "INBOX"))
+    return emails
+
+
+def run(server: StandinServer, fetch) -> tuple:
+    config = EmailConfig(
+        email_address="user@example.com",
+        imap_server="127.0.0.1",
+        smtp_server="127.0.0.1",
+        imap_port=server.port,
+        use_ssl=False
+    )
+    service = EmailService(config, "secret")
+    server.reset_counters()
+    start = time.perf_counter()
+    emails = fetch(service)
+    elapsed = time.perf_counter() - start
+    service.disconnect()
+    return len(emails), server.round_trips, elapsed
+
+
+def main() -> None:
+    print(f"messages={MESSAGES}")
+    print(f"{'latency ms':>10} {'mode':>8} {'round trips':>12} {'wall ms':>9}")
+    for latency in LATENCIES:
+        with StandinServer(latency=latency) as server:
+            server.seed(MESSAGES)
+            for mode, fetch in (
+                ("legacy", lambda s: legacy_fetch(s, MESSAGES)),
+                ("chunked", lambda s: s.fetch_emails(limit=MESSAGES)),
+            ):
+                count, trips, elapsed = run(server, fetch)
+                assert count == MESSAGES
+                print(f"{latency * 1e3:>10.0f} {mode:>8} {trips:>12} {elapsed * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
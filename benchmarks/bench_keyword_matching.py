@@ -0,0 +1,68 @@
+"""Benchmark: single-pass keyword matching vs. per-keyword substring scans
+
+Run from the repository root:
+
+    python benchmarks/bench_keyword_matching.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.ai_service import AIEmailService  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+FILLER = (
+    "the quarterly figures look fine and the team shared notes about lunch "
+    "plans while reviewing the attached document for the upcoming release"
+).split()
+
+
+def make_body(size: int, seed: int = 0) -> str:
+    """Build a newsletter-like body of roughly `size` characters"""
+    rng = random.Random(seed)
+    words = FILLER + ["meeting", "invoice", "sale", "thank", "update"]
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def legacy_scan(text: str) -> set:
+    """Keyword lookups the way the service did them before the matcher"""
+    service = AIEmailService
+    found = set()
+    for keywords in service.CATEGORIES.values():
+        found.update(k for k in keywords if k in text)
+    found.update(k for k in service.URGENT_KEYWORDS if k in text)
+    for keywords in service.TAG_KEYWORDS.values():
+        found.update(k for k in keywords if k in text)
+    found.update(k for k in service.POSITIVE_WORDS + service.NEGATIVE_WORDS if k in text)
+    found.update(k for k in service.SPAM_KEYWORDS if k in text)
+    return found
+
+
+def main() -> None:
+    matcher = AIEmailService.get_matcher()
+    backend = "aho-corasick" if matcher._automaton is not None else "fallback"
+    print(f"keywords={len(matcher.keywords)} backend={backend}")
+    print(f"{'size':>10} {'legacy ms':>10} {'matcher ms':>11} {'speedup':>8}")
+
+    for size in SIZES:
+        text = make_body(size).lower()
+        assert legacy_scan(text) == set(matcher.count(text))
+
+        number = max(1, 200_000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_scan(text), number=number, repeat=3)) / number
+        single = min(timeit.repeat(lambda: matcher.count(text), number=number, repeat=3)) / number
+        print(f"{size:>10} {legacy * 1e3:>10.3f} {single * 1e3:>11.3f} {legacy / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
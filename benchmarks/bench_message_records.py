@@ -0,0 +1,89 @@
+"""Benchmark: slotted message records vs. validated pydantic models
+
+Compares parsing into MessageRecord with parsing plus the EmailMessage
+validation _parse_email used to do, analysis over both types, and the
+memory held by 100k parsed messages. Run from the repository root:
+
+    python benchmarks/bench_message_records.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.models.email_models import EmailConfig, EmailMessage  # noqa: E402
+from src.models.records import MessageRecord  # noqa: E402
+from src.services.ai_service import AIEmailService  # noqa: E402
+from src.services.email_service import EmailService  # noqa: E402
+from tests.standin_server import make_message  # noqa: E402
+
+PARSE_MESSAGES = 5_000
+HELD_MESSAGES = 100_000
+
+
+def held_size(build, count: int) -> int:
+    """Bytes allocated while building and holding count messages"""
+    tracemalloc.start()
+    held = [build(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def main() -> None:
+    config = EmailConfig(email_address="user@example.com", imap_server="127.0.0.1", smtp_server="127.0.0.1")
+    service = EmailService(config, "secret")
+    raws = [
+        make_message(i, html=f"<p>Body of message {i}</p>" if i % 2 else None)
+        for i in range(PARSE_MESSAGES)
+    ]
+
+    start = time.perf_counter()
+    records = [service._parse_email(raw, str(i), "INBOX") for i, raw in enumerate(raws)]
+    parse_records = time.perf_counter() - start
+
+    start = time.perf_counter()
+    models = [
+        EmailMessage.model_validate(service._parse_email(raw, str(i), "INBOX").to_dict())
+        for i, raw in enumerate(raws)
+    ]
+    parse_models = time.perf_counter() - start
+
+    ai_service = AIEmailService()
+    start = time.perf_counter()
+    for record in records:
+        ai_service.analyze_email(record)
+    analyze_records = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for model in models:
+        ai_service.analyze_email(model)
+    analyze_models = time.perf_counter() - start
+
+    print(f"messages={PARSE_MESSAGES}")
+    print(f"{'step':>8} {'model us/msg':>13} {'record us/msg':>14} {'speedup':>8}")
+    for step, model_time, record_time in (
+        ("parse", parse_models, parse_records),
+        ("analyze", analyze_models, analyze_records),
+    ):
+        print(
+            f"{step:>8} {model_time / PARSE_MESSAGES * 1e6:>13.1f} "
+            f"{record_time / PARSE_MESSAGES * 1e6:>14.1f} {model_time / record_time:>7.2f}x"
+        )
+
+    # Both build from JSON so every message owns its strings, as after parsing
+    payload = json.dumps(records[1].to_dict())
+    model_bytes = held_size(lambda i: EmailMessage.model_validate_json(payload), HELD_MESSAGES)
+    record_bytes = held_size(lambda i: MessageRecord.from_dict(json.loads(payload)), HELD_MESSAGES)
+    print(f"\nheld messages={HELD_MESSAGES}")
+    print(f"{'type':>8} {'MB':>8} {'bytes/msg':>10}")
+    for name, size in (("model", model_bytes), ("record", record_bytes)):
+        print(f"{name:>8} {size / 1e6:>8.1f} {size / HELD_MESSAGES:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark: FastAPI response_model serialization vs. FastJSONResponse
+
+Encodes a list of parsed messages the way FastAPI does for a
+`response_model=List[EmailMessage]` route (dump, re-validate, encode) and
+with the fast path, with and without a `fields=` projection and with the
+standard library encoder fallback. Run from the repository root:
+
+    python benchmarks/bench_serialization.py
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from src.api import serialization  # noqa: E402
+from src.api.serialization import FastJSONResponse, project_all  # noqa: E402
+from src.models.email_models import EmailConfig, EmailMessage  # noqa: E402
+from src.services.email_service import EmailService  # noqa: E402
+from tests.standin_server import make_message  # noqa: E402
+
+SIZES = [100, 1_000]
+ROUNDS = 5
+LIST_FIELDS = ["id", "uid", "subject", "sender", "date", "is_read", "is_starred", "attachments"]
+
+
+def best_of(encode) -> float:
+    """Fastest of a few runs, in seconds"""
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        encode()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    config = EmailConfig(email_address="user@example.com", imap_server="127.0.0.1", smtp_server="127.0.0.1")
+    service = EmailService(config, "secret")
+    field = create_response_field("Response_fetch_emails", List[EmailMessage])
+    loop = asyncio.new_event_loop()
+    orjson = serialization.orjson
+
+    def response_model_path(records) -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=[r.to_model() for r in records])
+        )
+        return JSONResponse(content).body
+
+    def stdlib_path(records) -> bytes:
+        serialization.orjson = None
+        try:
+            return FastJSONResponse(records).body
+        finally:
+            serialization.orjson = orjson
+
+    print(f"{'messages':>8} {'path':>16} {'ms':>8} {'KB':>8} {'speedup':>8}")
+    for size in SIZES:
+        body = "Please review the attached project report before Friday. " * 40
+        records = [
+            service._parse_email(make_message(i, body=body, html=f"<p>{body}</p>"), str(i), "INBOX")
+            for i in range(size)
+        ]
+        paths = [
+            ("response_model", lambda: response_model_path(records)),
+            ("fast", lambda: FastJSONResponse(records).body),
+            ("fast stdlib", lambda: stdlib_path(records)),
+            ("fast fields=", lambda: FastJSONResponse(project_all(records, LIST_FIELDS)).body),
+        ]
+        baseline = None
+        for name, encode in paths:
+            elapsed = best_of(encode)
+            baseline = baseline or elapsed
+            print(f"{size:>8} {name:>16} {elapsed * 1e3:>8.1f} {len(encode()) / 1e3:>8.0f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Benchmark suite for the parse and AI hot paths over a synthetic corpus
+
+Times _parse_email, classify_email, analyze_email, detect_spam,
+classify_batch and a full fetch from the local IMAP stand-in over a seeded
+corpus (tests/corpus.py), and writes the results as JSON. With --baseline,
+each benchmark is compared against a stored run and the suite exits with
+status 1 if any got slower than the threshold allows. Run from the
+repository root:
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --save-baseline benchmarks/results/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.models.email_models import EmailConfig  # noqa: E402
+from src.services.ai_service import AIEmailService  # noqa: E402
+from src.services.email_service import EmailService  # noqa: E402
+from tests.corpus import generate_corpus  # noqa: E402
+from tests.standin_server import StandinServer  # noqa: E402
+
+
+def measure(run: Callable[[], Any], items: int, rounds: int) -> Dict[str, Any]:
+    """Best-of-rounds timing of run, which processes items messages"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "items": items,
+        "rounds": rounds,
+        "seconds": best,
+        "median_seconds": sorted(timings)[len(timings) // 2],
+        "per_item_us": best / items * 1e6,
+        "items_per_second": items / best,
+    }
+
+
+def make_config(port: int = 993) -> EmailConfig:
+    return EmailConfig(
+        email_address="user@example.com",
+        imap_server="127.0.0.1",
+        smtp_server="127.0.0.1",
+        imap_port=port,
+        use_ssl=False
+    )
+
+
+def fetch_all(server: StandinServer, count: int) -> None:
+    """Fetch every message in the stand-in's inbox over IMAP"""
+    service = EmailService(make_config(server.port), "secret")
+    emails = service.fetch_emails(limit=count)
+    service.disconnect()
+    assert len(emails) == count
+
+
+def run_suite(
+    count: int,
+    seed: int,
+    rounds: int,
+    only: Optional[List[str]] = None,
+    latency: float = 0.0
+) -> Dict[str, Any]:
+    """Run the benchmarks and return the results document"""
+    corpus = generate_corpus(count, seed)
+    raws = [message.raw for message in corpus]
+    service = EmailService(make_config(), "secret")
+    records = [service._parse_email(raw, str(i), "INBOX") for i, raw in enumerate(raws)]
+    # No analysis cache, so every round does the work
+    ai_service = AIEmailService()
+
+    benchmarks: Dict[str, Callable[[], Any]] = {
+        "parse_email": lambda: [service._parse_email(raw, str(i), "INBOX") for i, raw in enumerate(raws)],
+        "classify_email": lambda: [ai_service.classify_email(record) for record in records],
+        "analyze_email": lambda: [ai_service.analyze_email(record) for record in records],
+        "detect_spam": lambda: [ai_service.detect_spam(record) for record in records],
+        "classify_batch": lambda: ai_service.classify_batch(records),
+    }
+
+    results: Dict[str, Any] = {}
+    for name, run in benchmarks.items():
+        if not only or name in only:
+            results[name] = measure(run, count, rounds)
+
+    if not only or "fetch" in only:
+        with StandinServer(latency=latency) as server:
+            for raw in raws:
+                server.folders["INBOX"].append(raw)
+            results["fetch"] = measure(lambda: fetch_all(server, count), count, rounds)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus_size": count,
+            "corpus_bytes": sum(len(raw) for raw in raws),
+            "seed": seed,
+            "imap_latency": latency,
+        },
+        "results": results,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Current commit hash, if run from a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print current vs. baseline per-message times and return the regressed benchmarks"""
+    if any(baseline["meta"].get(key) != current["meta"][key] for key in ("corpus_size", "seed", "imap_latency")):
+        print("warning: baseline was run on a different corpus or latency")
+
+    regressions = []
+    print(f"{'benchmark':>16} {'baseline us':>12} {'current us':>11} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:>16} {'-':>12} {result['per_item_us']:>11.1f} {'new':>8}")
+            continue
+        change = result["per_item_us"] / before["per_item_us"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>16} {before['per_item_us']:>12.1f} {result['per_item_us']:>11.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000, help="messages in the corpus")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--rounds", type=int, default=5, help="timed runs per benchmark; the best counts")
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each IMAP command for fetch")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results JSON as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against this baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15,
+        help="slowdown per message, as a fraction, that counts as a regression"
+    )
+    args = parser.parse_args()
+
+    current = run_suite(args.count, args.seed, args.rounds, args.only, args.latency)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        return 0
+
+    print(f"corpus={args.count} seed={args.seed} bytes={current['meta']['corpus_bytes']}")
+    print(f"{'benchmark':>16} {'us/msg':>10} {'msgs/s':>10}")
+    for name, result in current["results"].items():
+        print(f"{name:>16} {result['per_item_us']:>10.1f} {result['items_per_second']:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 """AI-Powered Personal Email Management Assistant - Main Application"""
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import uvicorn
 
-from src.api.routes import router
+from src.api.routes import get_profiler, router, service_stats, shutdown_services, start_services
+from src.utils.metrics import metrics
+from src.utils.profiling import ProfilingMiddleware
 from src.utils.logger import setup_logging
 
 # Setup logging
@@ -31,10 +34,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Capture profiles of requests an admin armed the profiler for
+app.add_middleware(ProfilingMiddleware, profiler=get_profiler())
+
 # Include API routes
 app.include_router(router, prefix="/api/v1", tags=["Email Management"])
 
 
+@app.on_event("startup")
+async def startup():
+    """Start background services"""
+    await start_services()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled resources on shutdown"""
+    await shutdown_services()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -46,6 +64,17 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Stage latency histograms, counters and pool/cache stats in Prometheus text format"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        metrics.render(service_stats()),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
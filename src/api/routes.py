@@ -1,21 +1,95 @@
 """FastAPI routes for email management"""
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from pydantic import BaseModel
+import asyncio
+import hmac
+import os
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, Path, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Union
+import logging
+from pydantic import BaseModel, Field
 
+from .serialization import FastJSONResponse, check_fields, dumps, project, project_all
 from ..services.email_service import EmailService
 from ..services.ai_service import AIEmailService
-from ..models.email_models import EmailMessage, EmailAnalysis, EmailConfig
-from ..utils.config import get_email_config, get_email_password
+from ..services.batch_service import BatchAnalysisService
+from ..services.sync_state import SyncStateStore
+from ..services.message_store import MessageStore
+from ..services.analysis_cache import AnalysisCache
+from ..services.search_index import QuerySyntaxError, SearchIndex
+from ..services.mailbox_summary import MailboxSummary
+from ..services.idle_watcher import EventBroker, IdleWatcher
+from ..services.pipeline import FetchPipeline, PipelineResult, PipelineStats
+from ..services.accounts import Account, AccountRegistry
+from ..services.scheduler import FairScheduler
+from ..models.email_models import (
+    EmailMessage, 
+    EmailAnalysis, 
+    EmailSummary, 
+    SyncResult, 
+    OutgoingEmail, 
+    BulkSendResult, 
+    SearchHit,
+    TriageSummary
+)
+from ..models.records import MessageRecord
+from ..utils.config import (
+    DEFAULT_ACCOUNT,
+    get_account_names,
+    get_email_config, 
+    get_email_password, 
+    get_account_max_concurrency,
+    get_fetch_slots,
+    get_analysis_slots,
+    get_batch_workers, 
+    get_batch_chunk_size,
+    get_pipeline_queue_size,
+    get_pool_size,
+    get_pool_idle_timeout,
+    get_sync_state_path,
+    get_message_store_path,
+    get_search_index_path,
+    get_summary_path,
+    get_analysis_cache_size,
+    get_analysis_cache_ttl,
+    get_analysis_cache_path,
+    get_analysis_cache_disk_size,
+    get_admin_token,
+    get_profile_dir,
+    get_watch_folders,
+    get_idle_timeout
+)
+from ..utils.profiling import RequestProfiler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Seconds between keepalive comments on idle event streams
+EVENT_KEEPALIVE_SECONDS = 15
+
 
 # Request/Response models
 class EmailFetchRequest(BaseModel):
     folder: str = "INBOX"
     limit: int = 50
     unread_only: bool = False
+    mode: Literal["full", "headers"] = "full"
+    preview_length: int = Field(default=200, ge=0)
+    fields: Optional[List[str]] = Field(default=None, min_length=1)
+
+
+class EmailStreamRequest(BaseModel):
+    folder: str = "INBOX"
+    limit: int = Field(default=50, ge=1)
+    unread_only: bool = False
+    analyze: bool = False
+    fields: Optional[List[str]] = Field(default=None, min_length=1)
+
+
+class EmailSyncRequest(BaseModel):
+    folder: str = "INBOX"
+    initial_limit: int = Field(default=500, ge=1)
 
 
 class EmailSendRequest(BaseModel):
@@ -27,29 +101,398 @@ class EmailSendRequest(BaseModel):
     bcc: Optional[List[str]] = None
 
 
+class BulkSendRequest(BaseModel):
+    messages: List[OutgoingEmail] = Field(min_length=1)
+    max_sessions: Optional[int] = Field(default=None, ge=1)
+
+
 class AnalysisRequest(BaseModel):
     email_id: str
 
 
-# Dependency to get email service
-def get_email_service() -> EmailService:
-    """Get configured email service"""
-    config = get_email_config()
-    password = get_email_password()
-    
-    if not config.email_address or not password:
+class BatchAnalysisRequest(BaseModel):
+    emails: List[EmailMessage]
+    operation: Literal["analyze", "classify", "spam-check"] = "analyze"
+    chunk_size: Optional[int] = Field(default=None, ge=1)
+    stream: bool = False
+
+
+class ProfilingRequest(BaseModel):
+    routes: List[str] = Field(default=["/emails/fetch", "/emails/analyze"], min_length=1)
+    count: int = Field(default=1, ge=1, le=100)
+    mode: Literal["cprofile", "sampling"] = "sampling"
+
+
+_account_registry: Optional[AccountRegistry] = None
+
+
+def _load_account(name: str) -> Account:
+    """Read an account's settings, keeping the error if they are invalid"""
+    try:
+        return Account(
+            name=name,
+            config=get_email_config(name),
+            password=get_email_password(name),
+            max_concurrency=get_account_max_concurrency(name),
+            watch_folders=get_watch_folders(name)
+        )
+    except ValueError as e:
+        logger.warning(f"Account {name} is misconfigured: {e}")
+        return Account(name=name, config=None, password="", error=str(e))
+
+
+def get_account_registry() -> AccountRegistry:
+    """Get the process-wide registry of configured accounts"""
+    global _account_registry
+    if _account_registry is None:
+        _account_registry = AccountRegistry(
+            [_load_account(name) for name in get_account_names()],
+            pool_size=get_pool_size(),
+            pool_idle_timeout=get_pool_idle_timeout()
+        )
+    return _account_registry
+
+
+def get_account_name(
+    account: Optional[str] = Query(None, description="Account to use; defaults to the first configured one")
+) -> str:
+    """Resolve the account selector of a request to an account name"""
+    registry = get_account_registry()
+    if account is None:
+        return registry.default.name if registry.default is not None else DEFAULT_ACCOUNT
+    if account not in registry:
+        raise HTTPException(status_code=404, detail=f"Unknown account: {account}")
+    return account
+
+
+def get_account(name: str = Depends(get_account_name)) -> Account:
+    """Get the selected account"""
+    registry = get_account_registry()
+    if name in registry and registry.get(name).error is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Account {name} is misconfigured: {registry.get(name).error}"
+        )
+    if name not in registry or not registry.get(name).password:
         raise HTTPException(
             status_code=400,
             detail="Email configuration not set. Please set EMAIL_ADDRESS and EMAIL_PASSWORD environment variables."
         )
-    
-    return EmailService(config, password)
+    return registry.get(name)
+
+
+# Dependency to get email service
+def get_email_service(account: Account = Depends(get_account)) -> EmailService:
+    """Get an email service for the selected account, using its connection pools"""
+    return get_account_registry().service(account, message_store=get_message_store())
+
+
+def _account_limits() -> Dict[str, int]:
+    return {account.name: account.max_concurrency for account in get_account_registry()}
+
+
+_fetch_scheduler: Optional[FairScheduler] = None
+
+
+def get_fetch_scheduler() -> FairScheduler:
+    """Get the scheduler sharing mailbox operations fairly between accounts"""
+    global _fetch_scheduler
+    if _fetch_scheduler is None:
+        _fetch_scheduler = FairScheduler(
+            get_fetch_slots(),
+            _account_limits(),
+            default_limit=get_account_max_concurrency()
+        )
+    return _fetch_scheduler
+
+
+_analysis_scheduler: Optional[FairScheduler] = None
+
+
+def get_analysis_scheduler() -> FairScheduler:
+    """Get the scheduler sharing analysis chunks fairly between accounts"""
+    global _analysis_scheduler
+    if _analysis_scheduler is None:
+        _analysis_scheduler = FairScheduler(
+            get_analysis_slots(),
+            _account_limits(),
+            default_limit=get_account_max_concurrency()
+        )
+    return _analysis_scheduler
+
+
+async def hold_fetch_slot(name: str = Depends(get_account_name)):
+    """Run the request in one of the selected account's fetch slots"""
+    async with get_fetch_scheduler().async_slot(name):
+        yield
 
 
 # Dependency to get AI service
 def get_ai_service() -> AIEmailService:
     """Get AI service"""
-    return AIEmailService()
+    return AIEmailService(cache=get_analysis_cache())
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Get the process-wide analysis result cache, if enabled"""
+    global _analysis_cache
+    if _analysis_cache is None and get_analysis_cache_size() > 0:
+        _analysis_cache = AnalysisCache(
+            max_entries=get_analysis_cache_size(),
+            ttl=get_analysis_cache_ttl(),
+            disk_path=get_analysis_cache_path(),
+            max_disk_entries=get_analysis_cache_disk_size()
+        )
+    return _analysis_cache
+
+
+async def run_analysis(function: Callable[..., Any], *args: Any) -> Any:
+    """Run a cached analysis call, on the threadpool if the cache may read or write its disk tier"""
+    if _analysis_cache is not None and _analysis_cache.disk_path:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+
+_batch_service: Optional[BatchAnalysisService] = None
+
+
+# Dependency to get batch analysis service
+def get_batch_service() -> BatchAnalysisService:
+    """Get the process-wide batch analysis service"""
+    global _batch_service
+    if _batch_service is None:
+        _batch_service = BatchAnalysisService(
+            max_workers=get_batch_workers(),
+            chunk_size=get_batch_chunk_size(),
+            scheduler=get_analysis_scheduler()
+        )
+    return _batch_service
+
+
+# Stage statistics shared by every fetch pipeline run
+_pipeline_stats = PipelineStats()
+
+
+_sync_state_store: Optional[SyncStateStore] = None
+
+
+# Dependency to get sync state store
+def get_sync_state_store() -> SyncStateStore:
+    """Get the process-wide mailbox sync state store"""
+    global _sync_state_store
+    if _sync_state_store is None:
+        _sync_state_store = SyncStateStore(get_sync_state_path())
+    return _sync_state_store
+
+
+_message_store: Optional[MessageStore] = None
+
+
+def get_message_store() -> Optional[MessageStore]:
+    """Get the process-wide local message store, if enabled"""
+    global _message_store
+    path = get_message_store_path()
+    if _message_store is None and path:
+        _message_store = MessageStore(path)
+    return _message_store
+
+
+_search_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """Get the process-wide full-text search index, if enabled"""
+    global _search_index
+    path = get_search_index_path()
+    if _search_index is None and path:
+        _search_index = SearchIndex(path)
+    return _search_index
+
+
+def index_emails(
+    account: str, 
+    folder: str, 
+    uidvalidity: Optional[int], 
+    emails: List[MessageRecord]
+) -> None:
+    """Classify and index fetched emails that are not in the search index yet, in an analysis slot of the account"""
+    index = get_search_index()
+    if index is None:
+        return
+    new_emails = index.new_emails(account, folder, uidvalidity, emails)
+    if new_emails:
+        with get_analysis_scheduler().slot(account):
+            classifications, priority_inputs = AIEmailService().classify_batch_with_inputs(new_emails)
+        index.add_many(account, folder, uidvalidity, new_emails, classifications, priority_inputs)
+
+
+_mailbox_summary: Optional[MailboxSummary] = None
+
+
+def get_mailbox_summary() -> Optional[MailboxSummary]:
+    """Get the process-wide mailbox triage summary, if enabled"""
+    global _mailbox_summary
+    path = get_summary_path()
+    if _mailbox_summary is None and path:
+        _mailbox_summary = MailboxSummary(path)
+    return _mailbox_summary
+
+
+def summarize_emails(
+    account: str, 
+    folder: str, 
+    uidvalidity: Optional[int], 
+    emails: List[MessageRecord],
+    analyses: Optional[List[EmailAnalysis]] = None
+) -> None:
+    """Count fetched emails that are new to the summary, and update the read state of the rest
+    
+    New emails are analyzed here, in an analysis slot of the account,
+    unless their `analyses` are given.
+    """
+    summary = get_mailbox_summary()
+    if summary is None:
+        return
+    new_emails = summary.new_emails(account, folder, uidvalidity, emails)
+    if new_emails:
+        # Background work does not use the shared cache, so it cannot push out client entries
+        ai_service = AIEmailService()
+        if analyses is None:
+            with get_analysis_scheduler().slot(account):
+                new_analyses = [ai_service.analyze_email(e) for e in new_emails]
+                priority_inputs = [ai_service.priority_inputs(e) for e in new_emails]
+        else:
+            by_uid = {email.uid: analysis for email, analysis in zip(emails, analyses)}
+            new_analyses = [by_uid[e.uid] for e in new_emails]
+            priority_inputs = [ai_service.priority_inputs(e) for e in new_emails]
+        summary.add_many(account, folder, uidvalidity, new_emails, new_analyses, priority_inputs)
+    summary.set_read(account, folder, [(email.uid, email.is_read) for email in emails if email.uid is not None])
+
+
+def summarize_analyzed(account: str, emails: List[MessageRecord], results: List[Dict[str, Any]]) -> None:
+    """Count batch-analyzed emails that carry a UID in the summary, folder by folder"""
+    by_folder: Dict[str, Tuple[List[MessageRecord], List[EmailAnalysis]]] = {}
+    for email, result in zip(emails, results):
+        # UIDs come from the client here, so only plain numbers are taken
+        if email.uid is None or not email.uid.isdigit() or result is None:
+            continue
+        folder_emails, analyses = by_folder.setdefault(email.folder, ([], []))
+        folder_emails.append(email)
+        analyses.append(EmailAnalysis.model_validate(result))
+    for folder, (folder_emails, analyses) in by_folder.items():
+        summarize_emails(account, folder, None, folder_emails, analyses)
+
+
+def record_sync(account: str, result: SyncResult) -> None:
+    """Bring the search index and the summary up to date with a sync's changes"""
+    emails = [MessageRecord.from_model(message) for message in result.new_messages]
+    index_emails(account, result.folder, result.uidvalidity, emails)
+    summarize_emails(account, result.folder, result.uidvalidity, emails)
+    summary = get_mailbox_summary()
+    if summary is not None:
+        summary.set_read(account, result.folder, [(change.uid, change.is_read) for change in result.flag_changes])
+    if result.expunged:
+        for store in (get_search_index(), summary):
+            if store is not None:
+                store.delete(account, result.folder, result.expunged)
+
+
+_event_broker: Optional[EventBroker] = None
+
+
+def get_event_broker() -> EventBroker:
+    """Get the broker that fans new-mail events out to subscribers"""
+    global _event_broker
+    if _event_broker is None:
+        _event_broker = EventBroker()
+    return _event_broker
+
+
+_idle_watchers: Dict[str, IdleWatcher] = {}
+
+_pool_reaper: Optional[asyncio.Task] = None
+
+
+async def reap_idle_connections(interval: float) -> None:
+    """Close pooled connections idle past POOL_IDLE_TIMEOUT every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await get_account_registry().evict_idle()
+            if evicted:
+                logger.info(f"Closed {evicted} idle pooled connections")
+        except Exception as e:
+            logger.warning(f"Closing idle pooled connections failed: {e}")
+
+
+async def start_services() -> None:
+    """Start background services: the idle connection reaper and an IDLE watcher per account with WATCH_FOLDERS set"""
+    global _pool_reaper
+    if _pool_reaper is None:
+        _pool_reaper = asyncio.create_task(reap_idle_connections(max(get_pool_idle_timeout() / 2, 1.0)))
+    for account in get_account_registry():
+        if not account.watch_folders or not account.password:
+            continue
+        # Watches hold their connections open, so they do not borrow from the pools
+        watcher = _idle_watchers[account.name] = IdleWatcher(
+            lambda account=account: EmailService(account.config, account.password, message_store=get_message_store()),
+            account.watch_folders,
+            get_ai_service(),
+            get_event_broker(),
+            idle_timeout=get_idle_timeout(),
+            summary=get_mailbox_summary(),
+            index=get_search_index()
+        )
+        watcher.start()
+
+
+_profiler: Optional[RequestProfiler] = None
+
+
+def get_profiler() -> RequestProfiler:
+    """Get the process-wide request profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = RequestProfiler(get_profile_dir())
+    return _profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Allow only requests carrying the configured admin token"""
+    token = get_admin_token()
+    if token is None:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+async def shutdown_services() -> None:
+    """Release process-wide service resources"""
+    global _pool_reaper
+    if _pool_reaper is not None:
+        _pool_reaper.cancel()
+        await asyncio.gather(_pool_reaper, return_exceptions=True)
+        _pool_reaper = None
+    for watcher in _idle_watchers.values():
+        await watcher.stop()
+    _idle_watchers.clear()
+    if _batch_service is not None:
+        _batch_service.shutdown()
+    if _sync_state_store is not None:
+        _sync_state_store.close()
+    if _message_store is not None:
+        _message_store.close()
+    if _analysis_cache is not None:
+        _analysis_cache.close()
+    if _search_index is not None:
+        _search_index.close()
+    if _mailbox_summary is not None:
+        _mailbox_summary.close()
+    if _account_registry is not None:
+        await _account_registry.close()
 
 
 @router.get("/health")
@@ -58,33 +501,286 @@ async def health_check():
     return {"status": "healthy", "service": "AI Email Management Assistant"}
 
 
-@router.post("/emails/fetch", response_model=List[EmailMessage])
+@router.post("/emails/fetch", response_model=Union[List[EmailMessage], List[EmailSummary]], dependencies=[Depends(hold_fetch_slot)])
 async def fetch_emails(
     request: EmailFetchRequest,
+    background_tasks: BackgroundTasks,
     email_service: EmailService = Depends(get_email_service)
 ):
-    """Fetch emails from specified folder"""
+    """Fetch emails from specified folder
+    
+    With mode "headers" only lightweight summaries are returned; full
+    messages can then be loaded with /emails/by-uid/{uid}. `fields`
+    limits each returned item to the named fields.
+    """
+    check_fields(request.fields, EmailSummary if request.mode == "headers" else EmailMessage)
     try:
-        emails = email_service.fetch_emails(
+        if request.mode == "headers":
+            summaries = await run_in_threadpool(
+                email_service.fetch_summaries,
+                folder=request.folder,
+                limit=request.limit,
+                unread_only=request.unread_only,
+                preview_length=request.preview_length
+            )
+            summary = get_mailbox_summary()
+            if summary is not None:
+                # Summaries carry every message's flags, so read state is kept current from them too
+                background_tasks.add_task(
+                    summary.set_read,
+                    email_service.account,
+                    request.folder,
+                    [(s.uid, s.is_read) for s in summaries if s.uid is not None]
+                )
+            return FastJSONResponse(project_all(summaries, request.fields))
+        emails = await email_service.fetch_emails_async(
             folder=request.folder,
             limit=request.limit,
             unread_only=request.unread_only
         )
-        return emails
+        for task in (index_emails, summarize_emails):
+            background_tasks.add_task(
+                task,
+                email_service.account,
+                request.folder,
+                email_service.selected_uidvalidity,
+                emails
+            )
+        return FastJSONResponse(project_all(emails, request.fields))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await email_service.disconnect_async()
+
+
+@router.post("/emails/fetch/stream")
+async def stream_emails(
+    request: EmailStreamRequest,
+    account: Account = Depends(get_account),
+    email_service: EmailService = Depends(get_email_service),
+    batch_service: BatchAnalysisService = Depends(get_batch_service)
+):
+    """Stream emails as NDJSON lines as soon as each one is parsed
+    
+    Each line is `{"email": ...}`, with an `"analysis"` key when analyze
+    is set. Chunks are parsed and analyzed on the batch workers while the
+    next ones download, each in a fetch or analysis slot of the account.
+    A failure after the response has started is reported as a final
+    `{"error": ...}` line. Streamed messages are added to the search index and
+    the summary a chunk at a time, with their analysis if it was made.
+    """
+    check_fields(request.fields, EmailMessage)
+    pipeline = FetchPipeline(
+        email_service,
+        batch_service.get_executor(),
+        stats=_pipeline_stats,
+        queue_size=get_pipeline_queue_size(),
+        account=account.name,
+        fetch_scheduler=get_fetch_scheduler(),
+        analysis_scheduler=get_analysis_scheduler()
+    )
+    
+    chunk_size = email_service.config.fetch_chunk_size
+    
+    def record(batch: List[PipelineResult]) -> None:
+        """Index and count a batch of streamed messages; failures are logged, as the response is under way"""
+        emails = [email for email, _ in batch]
+        analyses = [analysis for _, analysis in batch] if request.analyze else None
+        uidvalidity = email_service.selected_uidvalidity
+        try:
+            index_emails(account.name, request.folder, uidvalidity, emails)
+            summarize_emails(account.name, request.folder, uidvalidity, emails, analyses)
+        except Exception as e:
+            logger.warning(f"Recording streamed messages failed: {e}")
+        batch.clear()
+    
+    def stream_lines():
+        batch: List[PipelineResult] = []
+        try:
+            for email, analysis in pipeline.run(
+                folder=request.folder,
+                limit=request.limit,
+                unread_only=request.unread_only,
+                analyze=request.analyze
+            ):
+                batch.append((email, analysis))
+                if len(batch) >= chunk_size:
+                    record(batch)
+                line = {"email": project(email, request.fields)}
+                if request.analyze:
+                    line["analysis"] = analysis
+                yield dumps(line) + b"\n"
+        except Exception as e:
+            yield dumps({"error": str(e)}) + b"\n"
+        finally:
+            if batch:
+                record(batch)
+            email_service.disconnect()
+    
+    # Starlette iterates sync generators on the threadpool
+    return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/emails/events")
+async def email_events(folder: Optional[str] = None, account: Optional[str] = None):
+    """Stream analyzed new mail as server-sent events
+    
+    Needs WATCH_FOLDERS. Each `new-mail` event carries the message and its
+    analysis as JSON; a comment is sent every 15 seconds while quiet to
+    keep proxies from closing the connection. Events of every watched
+    account are sent unless `account` names one.
+    """
+    if not _idle_watchers:
+        raise HTTPException(status_code=503, detail="Mail watcher is disabled; set WATCH_FOLDERS")
+    if account is not None and account not in _idle_watchers:
+        raise HTTPException(status_code=404, detail=f"Account {account} is not watched")
+    broker = get_event_broker()
+    queue = broker.subscribe()
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if (folder is None or event.folder == folder) and (account is None or event.account == account):
+                    yield b"event: new-mail\ndata: " + dumps(event) + b"\n\n"
+        finally:
+            broker.unsubscribe(queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/emails/by-uid/{uid}", response_model=EmailMessage, dependencies=[Depends(hold_fetch_slot)])
+async def get_email_by_uid(
+    uid: int = Path(..., ge=1, description="Message UID"),
+    folder: str = "INBOX",
+    email_service: EmailService = Depends(get_email_service)
+):
+    """Fetch one full email by UID"""
+    try:
+        email = await run_in_threadpool(email_service.fetch_email_by_uid, uid, folder)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await email_service.disconnect_async()
+    
+    if email is None:
+        raise HTTPException(status_code=404, detail=f"Email {uid} not found in {folder}")
+    return email.to_model()
+
+
+@router.get("/emails/search", response_model=List[SearchHit])
+async def search_emails(
+    q: str = Query(..., min_length=1, description="Search query"),
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    folder: Optional[str] = None,
+    order: Literal["relevance", "date"] = "relevance",
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    account: Account = Depends(get_account)
+):
+    """Search indexed emails by text, category and priority"""
+    index = get_search_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Search index is disabled")
+    
+    try:
+        return await run_in_threadpool(
+            index.search,
+            q,
+            account=account.name,
+            folder=folder,
+            category=category,
+            priority=priority,
+            order=order,
+            limit=limit,
+            offset=offset
+        )
+    except QuerySyntaxError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/emails/summary", response_model=TriageSummary)
+async def get_email_summary(
+    folder: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    unread_only: bool = False,
+    domains: int = Query(10, ge=0, le=100, description="Number of top sender domains"),
+    account: Account = Depends(get_account)
+):
+    """Count fetched and synced mail by category, priority, sentiment, read state and sender domain
+    
+    Counts are kept up to date as mail is fetched, synced and watched, so
+    answering does not touch IMAP or re-analyze messages. Filters narrow
+    every count except the sender domains.
+    """
+    summary = get_mailbox_summary()
+    if summary is None:
+        raise HTTPException(status_code=503, detail="Mailbox summary is disabled")
+    
+    try:
+        return await run_in_threadpool(
+            summary.summary,
+            account.name,
+            folder=folder,
+            category=category,
+            priority=priority,
+            sentiment=sentiment,
+            unread_only=unread_only,
+            domains=domains
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/emails/sync", response_model=SyncResult, dependencies=[Depends(hold_fetch_slot)])
+async def sync_emails(
+    request: EmailSyncRequest,
+    background_tasks: BackgroundTasks,
+    email_service: EmailService = Depends(get_email_service),
+    state_store: SyncStateStore = Depends(get_sync_state_store)
+):
+    """Fetch only new messages, flag changes and expunges since the last sync"""
+    account = email_service.account
+    summary = get_mailbox_summary()
+    
+    def sync() -> SyncResult:
+        # Expunges are looked for among the messages the summary counts
+        known_uids = summary.uids(account, request.folder) if summary is not None else None
+        return email_service.sync_emails(
+            state_store,
+            folder=request.folder,
+            initial_limit=request.initial_limit,
+            known_uids=known_uids
+        )
+    
+    try:
+        result = await run_in_threadpool(sync)
+        background_tasks.add_task(record_sync, account, result)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        email_service.disconnect()
+        await email_service.disconnect_async()
 
 
-@router.post("/emails/send")
+@router.post("/emails/send", dependencies=[Depends(hold_fetch_slot)])
 async def send_email(
     request: EmailSendRequest,
     email_service: EmailService = Depends(get_email_service)
 ):
     """Send an email"""
     try:
-        success = email_service.send_email(
+        success = await run_in_threadpool(
+            email_service.send_email,
             to=request.to,
             subject=request.subject,
             body=request.body,
@@ -99,7 +795,25 @@ async def send_email(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        email_service.disconnect()
+        await email_service.disconnect_async()
+
+
+@router.post("/emails/send/bulk", response_model=BulkSendResult, dependencies=[Depends(hold_fetch_slot)])
+async def send_bulk(
+    request: BulkSendRequest,
+    email_service: EmailService = Depends(get_email_service)
+):
+    """Send many emails over pooled SMTP sessions with per-recipient status"""
+    try:
+        return await run_in_threadpool(
+            email_service.send_bulk,
+            request.messages,
+            max_sessions=request.max_sessions
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await email_service.disconnect_async()
 
 
 @router.post("/emails/analyze", response_model=EmailAnalysis)
@@ -109,12 +823,51 @@ async def analyze_email(
 ):
     """Analyze email using AI"""
     try:
-        analysis = ai_service.analyze_email(email)
+        analysis = await run_analysis(ai_service.analyze_email, MessageRecord.from_model(email))
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/emails/analyze/batch")
+async def analyze_batch(
+    request: BatchAnalysisRequest,
+    account: str = Depends(get_account_name),
+    batch_service: BatchAnalysisService = Depends(get_batch_service)
+):
+    """Analyze many emails on the batch worker pool, in analysis slots of the account
+    
+    Analyzed emails that carry a UID are counted in the account's summary.
+    A failure while streaming is reported as a final `{"error": ...}` line.
+    """
+    # Records pickle to the worker processes faster than the API models
+    emails = [MessageRecord.from_model(email) for email in request.emails]
+    summarize = request.operation == "analyze" and account in get_account_registry()
+    if request.stream:
+        async def stream_results():
+            results: List[Optional[Dict[str, Any]]] = [None] * len(emails)
+            try:
+                async for index, result in batch_service.iter_process(
+                    emails, request.operation, request.chunk_size, account=account
+                ):
+                    results[index] = result
+                    yield dumps({"index": index, "result": result}) + b"\n"
+                if summarize:
+                    await run_in_threadpool(summarize_analyzed, account, emails, results)
+            except Exception as e:
+                yield dumps({"error": str(e)}) + b"\n"
+        
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+    
+    try:
+        results = await batch_service.process(emails, request.operation, request.chunk_size, account=account)
+        if summarize:
+            await run_in_threadpool(summarize_analyzed, account, emails, results)
+        return FastJSONResponse(results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/emails/classify")
 async def classify_email(
     email: EmailMessage,
@@ -122,7 +875,7 @@ async def classify_email(
 ):
     """Classify email into category and priority"""
     try:
-        classification = ai_service.classify_email(email)
+        classification = await run_analysis(ai_service.classify_email, MessageRecord.from_model(email))
         return classification
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -135,18 +888,153 @@ async def check_spam(
 ):
     """Check if email is spam"""
     try:
-        is_spam = ai_service.detect_spam(email)
+        is_spam = await run_analysis(ai_service.detect_spam, MessageRecord.from_model(email))
         return {"is_spam": is_spam, "email_id": email.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/emails/triage")
+async def triage_email(
+    email: EmailMessage,
+    ai_service: AIEmailService = Depends(get_ai_service)
+):
+    """Analyze email and check it for spam in one pass"""
+    try:
+        record = MessageRecord.from_model(email)
+        features = ai_service.extract_features(record)
+        analysis = ai_service.analyze_email(record, features)
+        is_spam = ai_service.detect_spam(record, features)
+        return {"email_id": email.id, "analysis": analysis, "is_spam": is_spam}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _pool_target(kind: str, account: Account) -> str:
+    config = account.config
+    if kind == "smtp":
+        return f"{config.email_address}@{config.smtp_server}:{config.smtp_port}"
+    return f"{config.email_address}@{config.imap_server}:{config.imap_port}"
+
+
+@router.get("/pool/stats")
+async def get_pool_stats():
+    """Get connection pool statistics"""
+    stats: Dict[str, Dict[str, Any]] = {"imap": {}, "imap_async": {}, "smtp": {}}
+    if _account_registry is not None:
+        for kind, account, pool in _account_registry.pools():
+            stats[kind][_pool_target(kind, account)] = pool.stats()
+    return stats
+
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats():
+    """Get fetch and analysis slots running, waiting and granted per account"""
+    return {
+        "fetch": get_fetch_scheduler().stats(),
+        "analysis": get_analysis_scheduler().stats()
+    }
+
+
+@router.get("/pipeline/stats")
+async def get_pipeline_stats():
+    """Get fetch pipeline throughput per stage and queue depths"""
+    return _pipeline_stats.stats()
+
+
+def service_stats() -> List[Tuple[str, Dict[str, str], Dict[str, Any]]]:
+    """Pool and cache statistics as (component, labels, stats) entries for /metrics"""
+    entries = []
+    if _account_registry is not None:
+        for kind, account, pool in _account_registry.pools():
+            labels = {"pool": kind, "account": account.name, "target": _pool_target(kind, account)}
+            entries.append(("pool", labels, pool.stats()))
+    for name, scheduler in (("fetch", _fetch_scheduler), ("analysis", _analysis_scheduler)):
+        if scheduler is not None:
+            for account, stats in scheduler.stats().items():
+                entries.append(("scheduler", {"scheduler": name, "account": account}, stats))
+    if _analysis_cache is not None:
+        entries.append(("analysis_cache", {}, _analysis_cache.stats()))
+    if _message_store is not None:
+        entries.append(("message_store", {}, _message_store.stats()))
+    for name, watcher in _idle_watchers.items():
+        entries.append(("watcher", {"account": name}, watcher.stats()))
+    pipeline = _pipeline_stats.stats()
+    entries.append(("pipeline", {}, {"runs": pipeline["runs"]}))
+    for stage, stats in pipeline["stages"].items():
+        entries.append(("pipeline_stage", {"stage": stage}, stats))
+    for name, stats in pipeline["queues"].items():
+        entries.append(("pipeline_queue", {"queue": name}, stats))
+    return entries
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get analysis cache and message store hit/miss statistics"""
+    return {
+        "analysis": _analysis_cache.stats() if _analysis_cache is not None else None,
+        "message_store": _message_store.stats() if _message_store is not None else None
+    }
+
+
+@router.post("/admin/profiling", dependencies=[Depends(require_admin)])
+async def start_profiling(request: ProfilingRequest):
+    """Profile the next requests to the given routes
+    
+    Route paths match the end of the request path, so "/emails/fetch"
+    covers /api/v1/emails/fetch. Captures are listed by GET
+    /admin/profiling and downloaded from /admin/profiling/{capture_id}.
+    """
+    profiler = get_profiler()
+    profiler.arm(request.routes, request.count, request.mode)
+    return profiler.status()
+
+
+@router.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def get_profiling_status():
+    """Get armed routes and captured profiles with their hottest functions"""
+    return get_profiler().status()
+
+
+@router.delete("/admin/profiling", dependencies=[Depends(require_admin)])
+async def stop_profiling():
+    """Stop profiling requests that have not been captured yet"""
+    profiler = get_profiler()
+    profiler.disarm()
+    return profiler.status()
+
+
+@router.get("/admin/profiling/{capture_id}", dependencies=[Depends(require_admin)])
+async def download_profile(capture_id: str):
+    """Download a captured profile (.pstats or collapsed stacks)"""
+    capture = get_profiler().get_capture(capture_id)
+    if capture is None or not os.path.exists(capture.file):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(capture.file, filename=os.path.basename(capture.file), media_type="application/octet-stream")
+
+
+@router.get("/accounts")
+async def list_accounts():
+    """List the configured accounts (without passwords)"""
+    return [
+        {
+            "name": account.name,
+            "email_address": account.config.email_address if account.config is not None else None,
+            "max_concurrency": account.max_concurrency,
+            "watch_folders": account.watch_folders,
+            "error": account.error
+        }
+        for account in get_account_registry()
+    ]
+
+
 @router.get("/config")
-async def get_config():
-    """Get current email configuration (without password)"""
+async def get_config(account: Account = Depends(get_account)):
+    """Get the email configuration of an account (without password)"""
     try:
-        config = get_email_config()
+        config = account.config
         return {
+            "account": account.name,
             "email_address": config.email_address,
             "imap_server": config.imap_server,
             "smtp_server": config.smtp_server,
@@ -0,0 +1,67 @@
+"""Fast JSON responses for lists of records and models built by the services"""
+import dataclasses
+import json
+from datetime import date
+from typing import Any, Iterable, List, Optional, Sequence, Type
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from ..utils.metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode values the JSON encoder does not handle natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value):
+        return {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@metrics.timed("serialization")
+def dumps(content: Any) -> bytes:
+    """Encode content as JSON, with orjson when it is installed"""
+    if orjson is not None:
+        # orjson encodes dataclasses and datetimes natively
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    """JSON response that encodes content as is, without response_model re-validation"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        body = dumps(content)
+        metrics.count("bytes", "serialization", len(body))
+        return body
+
+
+def check_fields(fields: Optional[Sequence[str]], model: Type[BaseModel]) -> None:
+    """Reject projections naming fields the response model does not have"""
+    unknown = sorted(set(fields or ()) - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+
+def project(item: Any, fields: Optional[Sequence[str]]) -> Any:
+    """Keep only the named attributes of an item, or return it unchanged"""
+    if not fields:
+        return item
+    return {name: getattr(item, name) for name in fields}
+
+
+def project_all(items: Iterable[Any], fields: Optional[Sequence[str]]) -> List[Any]:
+    """Apply project to every item"""
+    if not fields:
+        return list(items)
+    return [project(item, fields) for item in items]
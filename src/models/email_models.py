@@ -1,6 +1,6 @@
 """Email data models"""
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, EmailStr
 
 
@@ -10,6 +10,13 @@ class EmailAddress(BaseModel):
     email: EmailStr
 
 
+class AttachmentInfo(BaseModel):
+    """Attachment metadata; the payload itself is not kept"""
+    filename: Optional[str] = None
+    content_type: str
+    size: int
+
+
 class EmailMessage(BaseModel):
     """Email message model"""
     id: str
@@ -22,6 +29,25 @@ class EmailMessage(BaseModel):
     html_body: Optional[str] = None
     date: datetime
     attachments: Optional[List[str]] = []
+    attachment_info: List[AttachmentInfo] = []
+    body_truncated: bool = False
+    is_read: bool = False
+    is_starred: bool = False
+    folder: str = "inbox"
+    uid: Optional[str] = None
+
+
+class EmailSummary(BaseModel):
+    """Lightweight email summary for list views"""
+    id: str
+    uid: Optional[str] = None
+    subject: str
+    sender: EmailAddress
+    recipients: List[EmailAddress] = []
+    date: datetime
+    preview: str = ""
+    size: Optional[int] = None
+    has_attachments: bool = False
     is_read: bool = False
     is_starred: bool = False
     folder: str = "inbox"
@@ -46,6 +72,91 @@ class EmailAnalysis(BaseModel):
     action_items: List[str] = []
 
 
+class SearchHit(BaseModel):
+    """Message matching a search query"""
+    uid: str
+    folder: str
+    date: Optional[datetime] = None
+    subject: str = ""
+    sender: str = ""
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    tags: List[str] = []
+    snippet: str = ""
+    score: float = 0.0
+
+
+class FacetCount(BaseModel):
+    """Messages with one value of a summary facet"""
+    total: int = 0
+    unread: int = 0
+
+
+class DomainCount(FacetCount):
+    """Messages from one sender domain"""
+    domain: str
+
+
+class TriageSummary(BaseModel):
+    """Counts of summarized messages by category, priority, sentiment, read state and sender domain"""
+    account: str
+    folder: Optional[str] = None
+    total: int = 0
+    unread: int = 0
+    by_category: Dict[str, FacetCount] = {}
+    by_priority: Dict[str, FacetCount] = {}
+    by_sentiment: Dict[str, FacetCount] = {}
+    by_read_state: Dict[str, int] = {}
+    top_sender_domains: List[DomainCount] = []
+
+
+class FlagChange(BaseModel):
+    """Flags of a message that changed since the last sync"""
+    uid: str
+    flags: List[str] = []
+    is_read: bool = False
+    is_starred: bool = False
+
+
+class SyncResult(BaseModel):
+    """Result of an incremental mailbox sync"""
+    folder: str
+    uidvalidity: int
+    highest_uid: int
+    highest_modseq: Optional[int] = None
+    full_resync: bool = False
+    new_messages: List[EmailMessage] = []
+    flag_changes: List[FlagChange] = []
+    expunged: List[str] = []
+
+
+class OutgoingEmail(BaseModel):
+    """Email to be sent"""
+    to: List[str]
+    subject: str
+    body: str
+    html: Optional[str] = None
+    cc: Optional[List[str]] = None
+    bcc: Optional[List[str]] = None
+
+
+class RecipientStatus(BaseModel):
+    """Delivery status of one recipient of a bulk send"""
+    message_index: int
+    recipient: str
+    status: str
+    code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkSendResult(BaseModel):
+    """Result of a bulk send"""
+    sent: int = 0
+    failed: int = 0
+    sessions: int = 0
+    recipients: List[RecipientStatus] = []
+
+
 class EmailConfig(BaseModel):
     """Email configuration"""
     email_address: EmailStr
@@ -54,3 +165,7 @@ class EmailConfig(BaseModel):
     imap_port: int = 993
     smtp_port: int = 587
     use_ssl: bool = True
+    smtp_starttls: bool = True
+    fetch_chunk_size: int = 200
+    imap_timeout: float = 30.0
+    max_body_bytes: int = 1_000_000
@@ -0,0 +1,149 @@
+"""Lightweight internal message records
+
+The services and AI layer pass these slotted dataclasses around instead of
+pydantic models: building them skips validation and they take a fraction
+of the memory. API models are built from them only at the FastAPI edge.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .email_models import AttachmentInfo, EmailAddress, EmailMessage
+
+
+@dataclass(slots=True)
+class AddressRecord:
+    """Parsed email address"""
+    email: str
+    name: Optional[str] = None
+
+    def to_model(self) -> EmailAddress:
+        """Build the API model without re-validating"""
+        return EmailAddress.model_construct(name=self.name, email=self.email)
+
+
+@dataclass(slots=True)
+class AttachmentRecord:
+    """Attachment metadata; the payload itself is not kept"""
+    filename: Optional[str]
+    content_type: str
+    size: int
+
+    def to_model(self) -> AttachmentInfo:
+        """Build the API model without re-validating"""
+        return AttachmentInfo.model_construct(filename=self.filename, content_type=self.content_type, size=self.size)
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    """Parsed email message, with the same fields as EmailMessage"""
+    id: str
+    subject: str
+    sender: AddressRecord
+    recipients: List[AddressRecord]
+    body: str
+    date: datetime
+    cc: List[AddressRecord] = field(default_factory=list)
+    bcc: List[AddressRecord] = field(default_factory=list)
+    html_body: Optional[str] = None
+    attachments: List[str] = field(default_factory=list)
+    attachment_info: List[AttachmentRecord] = field(default_factory=list)
+    body_truncated: bool = False
+    is_read: bool = False
+    is_starred: bool = False
+    folder: str = "inbox"
+    uid: Optional[str] = None
+
+    def to_model(self) -> EmailMessage:
+        """Build the API model without re-validating"""
+        return EmailMessage.model_construct(
+            id=self.id,
+            subject=self.subject,
+            sender=self.sender.to_model(),
+            recipients=[address.to_model() for address in self.recipients],
+            cc=[address.to_model() for address in self.cc],
+            bcc=[address.to_model() for address in self.bcc],
+            body=self.body,
+            html_body=self.html_body,
+            date=self.date,
+            attachments=list(self.attachments),
+            attachment_info=[attachment.to_model() for attachment in self.attachment_info],
+            body_truncated=self.body_truncated,
+            is_read=self.is_read,
+            is_starred=self.is_starred,
+            folder=self.folder,
+            uid=self.uid
+        )
+
+    @classmethod
+    def from_model(cls, message: EmailMessage) -> "MessageRecord":
+        """Copy a validated API model into a record"""
+        return cls(
+            id=message.id,
+            subject=message.subject,
+            sender=AddressRecord(message.sender.email, message.sender.name),
+            recipients=[AddressRecord(a.email, a.name) for a in message.recipients],
+            cc=[AddressRecord(a.email, a.name) for a in message.cc or []],
+            bcc=[AddressRecord(a.email, a.name) for a in message.bcc or []],
+            body=message.body,
+            html_body=message.html_body,
+            date=message.date,
+            attachments=list(message.attachments or []),
+            attachment_info=[
+                AttachmentRecord(a.filename, a.content_type, a.size) for a in message.attachment_info
+            ],
+            body_truncated=message.body_truncated,
+            is_read=message.is_read,
+            is_starred=message.is_starred,
+            folder=message.folder,
+            uid=message.uid
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict in the same shape as EmailMessage's JSON"""
+        return {
+            "id": self.id,
+            "subject": self.subject,
+            "sender": {"name": self.sender.name, "email": self.sender.email},
+            "recipients": [{"name": a.name, "email": a.email} for a in self.recipients],
+            "cc": [{"name": a.name, "email": a.email} for a in self.cc],
+            "bcc": [{"name": a.name, "email": a.email} for a in self.bcc],
+            "body": self.body,
+            "html_body": self.html_body,
+            "date": self.date.isoformat(),
+            "attachments": self.attachments,
+            "attachment_info": [
+                {"filename": a.filename, "content_type": a.content_type, "size": a.size}
+                for a in self.attachment_info
+            ],
+            "body_truncated": self.body_truncated,
+            "is_read": self.is_read,
+            "is_starred": self.is_starred,
+            "folder": self.folder,
+            "uid": self.uid,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MessageRecord":
+        """Rebuild a record from to_dict output (or EmailMessage JSON)"""
+        return cls(
+            id=data["id"],
+            subject=data["subject"],
+            sender=AddressRecord(data["sender"]["email"], data["sender"].get("name")),
+            recipients=[AddressRecord(a["email"], a.get("name")) for a in data["recipients"]],
+            cc=[AddressRecord(a["email"], a.get("name")) for a in data.get("cc") or []],
+            bcc=[AddressRecord(a["email"], a.get("name")) for a in data.get("bcc") or []],
+            body=data["body"],
+            html_body=data.get("html_body"),
+            date=datetime.fromisoformat(data["date"]),
+            attachments=data.get("attachments") or [],
+            attachment_info=[
+                AttachmentRecord(a.get("filename"), a["content_type"], a["size"])
+                for a in data.get("attachment_info") or []
+            ],
+            body_truncated=data.get("body_truncated", False),
+            is_read=data.get("is_read", False),
+            is_starred=data.get("is_starred", False),
+            folder=data.get("folder", "inbox"),
+            uid=data.get("uid")
+        )
@@ -0,0 +1,121 @@
+"""Registry of the mail accounts served by one deployment"""
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import logging
+
+from ..models.email_models import EmailConfig
+from .connection_pool import AsyncIMAPConnectionPool, IMAPConnectionPool, SMTPConnectionPool
+from .email_service import EmailService
+from .message_store import MessageStore
+
+logger = logging.getLogger(__name__)
+
+AnyPool = Union[IMAPConnectionPool, SMTPConnectionPool, AsyncIMAPConnectionPool]
+
+
+@dataclass
+class Account:
+    """A configured mailbox and the connection pools it owns
+
+    An account whose settings are invalid has no config and keeps the
+    reason in `error`, so it can be reported without failing the others.
+    """
+    name: str
+    config: Optional[EmailConfig]
+    password: str
+    max_concurrency: int = 4
+    watch_folders: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    pools: Dict[str, AnyPool] = field(default_factory=dict, repr=False)
+
+
+class AccountRegistry:
+    """Accounts by name, each with its own IMAP, asyncio IMAP and SMTP pools
+
+    Pools are created on first use. The first account is the default for
+    requests that do not name one. Idle connections are closed lazily when
+    a pool is next used, and by `evict_idle`, which the app runs
+    periodically so quiet accounts do not hold sessions open.
+    """
+
+    def __init__(self, accounts: List[Account], pool_size: int = 4, pool_idle_timeout: float = 300.0):
+        self.accounts: Dict[str, Account] = {account.name: account for account in accounts}
+        self.pool_size = pool_size
+        self.pool_idle_timeout = pool_idle_timeout
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[Account]:
+        return iter(list(self.accounts.values()))
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.accounts
+
+    @property
+    def default(self) -> Optional[Account]:
+        return next(iter(self.accounts.values()), None)
+
+    def get(self, name: Optional[str] = None) -> Account:
+        """Get an account by name, or the default one; KeyError if there is none"""
+        account = self.default if name is None else self.accounts.get(name)
+        if account is None:
+            raise KeyError(name)
+        return account
+
+    def _pool(self, account: Account, kind: str) -> AnyPool:
+        with self._lock:
+            pool = account.pools.get(kind)
+            if pool is None:
+                opener = EmailService(account.config, account.password)
+                pool_class, factory = {
+                    "imap": (IMAPConnectionPool, opener.open_imap_connection),
+                    "imap_async": (AsyncIMAPConnectionPool, opener.open_async_imap_connection),
+                    "smtp": (SMTPConnectionPool, opener.open_smtp_connection),
+                }[kind]
+                pool = account.pools[kind] = pool_class(
+                    factory,
+                    max_size=self.pool_size,
+                    idle_timeout=self.pool_idle_timeout
+                )
+            return pool
+
+    def service(self, account: Account, message_store: Optional[MessageStore] = None) -> EmailService:
+        """Create an email service that borrows connections from the account's pools"""
+        return EmailService(
+            account.config,
+            account.password,
+            imap_pool=self._pool(account, "imap"),
+            smtp_pool=self._pool(account, "smtp"),
+            async_imap_pool=self._pool(account, "imap_async"),
+            message_store=message_store,
+            account=account.name
+        )
+
+    def pools(self) -> List[Tuple[str, Account, AnyPool]]:
+        """(kind, account, pool) for every pool created so far"""
+        with self._lock:
+            return [(kind, account, pool) for account in self.accounts.values() for kind, pool in account.pools.items()]
+
+    async def evict_idle(self) -> int:
+        """Close every pool's connections that have been idle past the idle timeout"""
+        evicted = 0
+        for _, _, pool in self.pools():
+            if isinstance(pool, AsyncIMAPConnectionPool):
+                evicted += await pool.evict_idle()
+            else:
+                # Closing sessions talks to the server, so it runs off the loop
+                evicted += await asyncio.to_thread(pool.evict_idle)
+        return evicted
+
+    async def close(self) -> None:
+        """Close every account's pools"""
+        for kind, account, pool in self.pools():
+            if isinstance(pool, AsyncIMAPConnectionPool):
+                await pool.close()
+            else:
+                pool.close()
+            account.pools.pop(kind, None)
@@ -1,18 +1,32 @@
 """AI service for email classification and analysis"""
+import hashlib
+import json
 import re
-from typing import List
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 import logging
 from datetime import datetime
 
+import numpy as np
+
 from ..models.email_models import (
-    EmailMessage, 
     EmailClassification, 
     EmailAnalysis
 )
+from ..models.records import MessageRecord
+from .keyword_matcher import KeywordMatcher
+from .email_features import EmailFeatures
+from .analysis_cache import AnalysisCache
+from ..utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 
+class PriorityInputs(NamedTuple):
+    """What an email's priority depends on, apart from how recent it is"""
+    urgent_count: int
+    is_reply: bool
+
+
 class AIEmailService:
     """Service for AI-powered email analysis"""
     
@@ -33,60 +47,280 @@ class AIEmailService:
         "important", "deadline", "today", "now", "priority"
     ]
     
-    def __init__(self):
-        """Initialize AI service"""
+    # Emails younger than this count as recent, raising their priority
+    RECENT_SECONDS = 3600
+    
+    # Tag keywords, checked in order
+    TAG_KEYWORDS = {
+        "meeting": ["meeting", "schedule", "calendar"],
+        "action-required": ["deadline", "due", "submit"],
+        "payment": ["invoice", "payment", "pay"],
+        "needs-response": ["question", "?", "help", "assist"]
+    }
+    
+    # Sentiment keywords
+    POSITIVE_WORDS = [
+        "thank", "appreciate", "great", "excellent", "good", 
+        "happy", "pleased", "wonderful", "amazing", "love"
+    ]
+    NEGATIVE_WORDS = [
+        "unfortunately", "sorry", "apologize", "issue", "problem",
+        "concern", "disappointed", "frustrated", "urgent", "critical"
+    ]
+    
+    # Spam phrases
+    SPAM_KEYWORDS = [
+        "congratulations you've won",
+        "click here now",
+        "act now",
+        "limited time offer",
+        "100% free",
+        "no credit card",
+        "dear friend",
+        "nigerian prince"
+    ]
+    
+    _matcher: Optional[KeywordMatcher] = None
+    _batch_weights: Optional[Dict[str, np.ndarray]] = None
+    _rules_fingerprint: Optional[str] = None
+    
+    def __init__(self, cache: Optional[AnalysisCache] = None):
+        """Initialize AI service
+        
+        With a `cache`, results of analyze_email, classify_email and
+        detect_spam are reused for emails with the same content.
+        """
+        self.cache = cache
         logger.info("AI Email Service initialized")
     
-    def classify_email(self, email: EmailMessage) -> EmailClassification:
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """Get the keyword matcher shared by all analysis methods"""
+        if cls._matcher is None:
+            keywords = [k for words in cls.CATEGORIES.values() for k in words]
+            keywords += cls.URGENT_KEYWORDS
+            keywords += [k for words in cls.TAG_KEYWORDS.values() for k in words]
+            keywords += cls.POSITIVE_WORDS + cls.NEGATIVE_WORDS + cls.SPAM_KEYWORDS
+            cls._matcher = KeywordMatcher(keywords)
+        return cls._matcher
+    
+    @metrics.timed("features")
+    def extract_features(self, email: MessageRecord) -> EmailFeatures:
+        """Compute the text features shared by all analysis methods"""
+        return EmailFeatures.from_email(email, self.get_matcher())
+    
+    @classmethod
+    def rules_fingerprint(cls) -> str:
+        """Hash of the keyword rules, so cached results expire when they change"""
+        if cls._rules_fingerprint is None:
+            rules = [
+                cls.CATEGORIES, cls.URGENT_KEYWORDS, cls.TAG_KEYWORDS,
+                cls.POSITIVE_WORDS, cls.NEGATIVE_WORDS, cls.SPAM_KEYWORDS
+            ]
+            cls._rules_fingerprint = hashlib.sha256(json.dumps(rules).encode()).hexdigest()[:16]
+        return cls._rules_fingerprint
+    
+    def _cache_key(self, operation: str, email: MessageRecord) -> str:
+        """Hash of the email fields that analysis results depend on"""
+        digest = hashlib.sha256()
+        for part in (self.rules_fingerprint(), operation, email.subject, email.body, email.sender.email):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def _cached(
+        self, 
+        operation: str, 
+        email: MessageRecord, 
+        compute: Callable[[EmailFeatures], Any]
+    ) -> Any:
+        """Get a result from the cache, computing and storing it on a miss
+        
+        The cache holds results as JSON, together with the time-independent
+        priority inputs so priority can be re-evaluated for each email.
+        """
+        key = self._cache_key(operation, email)
+        entry = self.cache.get(key)
+        if entry is None:
+            features = self.extract_features(email)
+            result = compute(features)
+            self.cache.put(key, {
+                "result": result if isinstance(result, bool) else result.model_dump(mode="json"),
+                "urgent_count": features.count_present(self.URGENT_KEYWORDS),
+                "is_reply": self._is_reply(features)
+            })
+            return result
+        
+        if operation == "spam-check":
+            return entry["result"]
+        
+        priority = self.priority_level(entry["urgent_count"], entry["is_reply"], self._is_recent(email))
+        if operation == "classify":
+            classification = EmailClassification.model_validate(entry["result"])
+            classification.priority = priority
+            return classification
+        
+        analysis = EmailAnalysis.model_validate(entry["result"])
+        analysis.email_id = email.id
+        analysis.classification.priority = priority
+        analysis.action_required = "action-required" in analysis.classification.tags or priority == "high"
+        return analysis
+    
+    def classify_email(
+        self, 
+        email: MessageRecord, 
+        features: Optional[EmailFeatures] = None
+    ) -> EmailClassification:
         """Classify email into category and priority"""
-        # Combine subject and body for analysis
-        text = f"{email.subject} {email.body}".lower()
-        
-        # Determine category
-        category_scores = {}
-        for category, keywords in self.CATEGORIES.items():
-            score = sum(1 for keyword in keywords if keyword in text)
-            category_scores[category] = score
-        
-        # Get category with highest score
-        category = max(category_scores, key=category_scores.get)
-        max_score = category_scores[category]
-        
-        # If no clear category, mark as general
-        if max_score == 0:
-            category = "general"
-            confidence = 0.5
-        else:
-            # Calculate confidence based on score
-            total_keywords = sum(len(keywords) for keywords in self.CATEGORIES.values())
-            confidence = min(max_score / 10, 1.0)
-        
-        # Determine priority
-        priority = self._determine_priority(email, text)
+        if features is None and self.cache is not None:
+            return self._cached("classify", email, lambda f: self.classify_email(email, f))
+        if features is None:
+            features = self.extract_features(email)
+        
+        with metrics.time("classify"):
+            # Determine category
+            category_scores = {}
+            for category, keywords in self.CATEGORIES.items():
+                category_scores[category] = features.count_present(keywords)
+            
+            # Get category with highest score
+            category = max(category_scores, key=category_scores.get)
+            max_score = category_scores[category]
+            
+            # If no clear category, mark as general
+            if max_score == 0:
+                category = "general"
+                confidence = 0.5
+            else:
+                # Calculate confidence based on score
+                confidence = min(max_score / 10, 1.0)
+            
+            # Determine priority
+            priority = self._determine_priority(email, features)
+            
+            # Extract tags
+            tags = self._extract_tags(features)
+            
+            return EmailClassification(
+                category=category,
+                priority=priority,
+                confidence=confidence,
+                tags=tags
+            )
+    
+    @classmethod
+    def get_batch_weights(cls) -> Dict[str, np.ndarray]:
+        """Get keyword membership matrices used by batch classification"""
+        if cls._batch_weights is None:
+            vocabulary = cls.get_matcher().index
+            
+            def membership(groups: List[List[str]]) -> np.ndarray:
+                matrix = np.zeros((len(vocabulary), len(groups)), dtype=np.int64)
+                for column, keywords in enumerate(groups):
+                    for keyword in keywords:
+                        matrix[vocabulary[keyword], column] = 1
+                return matrix
+            
+            cls._batch_weights = {
+                "categories": membership(list(cls.CATEGORIES.values())),
+                "urgent": membership([cls.URGENT_KEYWORDS])[:, 0],
+                "tags": membership(list(cls.TAG_KEYWORDS.values()))
+            }
+        return cls._batch_weights
+    
+    def classify_batch(self, emails: List[MessageRecord]) -> List[EmailClassification]:
+        """Classify many emails at once with vectorized scoring
         
-        # Extract tags
-        tags = self._extract_tags(text)
+        Produces the same results as calling classify_email on each email.
+        """
+        return self.classify_batch_with_inputs(emails)[0]
+    
+    @metrics.timed("classify_batch")
+    def classify_batch_with_inputs(
+        self, 
+        emails: List[MessageRecord]
+    ) -> Tuple[List[EmailClassification], List[PriorityInputs]]:
+        """Classify many emails at once, also returning each one's priority inputs
+        
+        Stores that outlive the recency window keep the inputs and derive
+        priority again when they are read.
+        """
+        if not emails:
+            return [], []
+        
+        weights = self.get_batch_weights()
+        texts = [f"{email.subject.lower()} {email.body.lower()}" for email in emails]
+        
+        # Keyword presence matrix from sparse term counts
+        rows, columns, _ = self.get_matcher().term_counts(texts)
+        presence = np.zeros((len(emails), len(self.get_matcher().keywords)), dtype=np.int64)
+        presence[rows, columns] = 1
+        
+        # Category scores and confidence
+        category_names = np.array(list(self.CATEGORIES), dtype=object)
+        scores = presence @ weights["categories"]
+        best = scores.argmax(axis=1)
+        max_scores = scores[np.arange(len(emails)), best]
+        categories = np.where(max_scores == 0, "general", category_names[best])
+        confidences = np.where(max_scores == 0, 0.5, np.minimum(max_scores / 10, 1.0))
+        
+        # Priority from urgency, replies and recency
+        urgent_counts = presence @ weights["urgent"]
+        is_reply = np.array([t.startswith("re:") or t.startswith("fwd:") for t in texts])
+        is_recent = np.array([self._is_recent(email) for email in emails])
+        high = (urgent_counts >= 2) | ((urgent_counts >= 1) & is_recent)
+        medium = is_reply | (urgent_counts == 1)
+        priorities = np.where(high, "high", np.where(medium, "medium", "low"))
+        
+        # Tags, encoded as a bitmask per email and decoded through a lookup table
+        tag_names = list(self.TAG_KEYWORDS)
+        tag_hits = (presence @ weights["tags"]) > 0
+        tag_codes = tag_hits @ (1 << np.arange(len(tag_names)))
+        tag_table = [
+            [name for bit, name in enumerate(tag_names) if code & (1 << bit)]
+            for code in range(1 << len(tag_names))
+        ]
         
-        return EmailClassification(
-            category=category,
-            priority=priority,
-            confidence=confidence,
-            tags=tags
-        )
+        classifications = [
+            EmailClassification.model_construct(
+                category=category,
+                priority=priority,
+                confidence=confidence,
+                tags=list(tag_table[code])
+            )
+            for category, priority, confidence, code in zip(
+                categories.tolist(), priorities.tolist(), confidences.tolist(), tag_codes.tolist()
+            )
+        ]
+        inputs = [PriorityInputs(*pair) for pair in zip(urgent_counts.tolist(), is_reply.tolist())]
+        return classifications, inputs
     
-    def _determine_priority(self, email: EmailMessage, text: str) -> str:
+    def _determine_priority(self, email: MessageRecord, features: EmailFeatures) -> str:
         """Determine email priority"""
         # Check for urgent keywords
-        urgent_count = sum(1 for keyword in self.URGENT_KEYWORDS if keyword in text)
-        
-        # Check if sender is in subject (might be a reply)
-        is_reply = text.startswith("re:") or text.startswith("fwd:")
+        urgent_count = features.count_present(self.URGENT_KEYWORDS)
         
-        # Check recency
-        time_diff = datetime.now() - email.date
-        is_recent = time_diff.total_seconds() < 3600  # Less than 1 hour
-        
-        # Determine priority
+        return self.priority_level(urgent_count, self._is_reply(features), self._is_recent(email))
+    
+    def _is_reply(self, features: EmailFeatures) -> bool:
+        """Check if sender is in subject (might be a reply)"""
+        return features.text.startswith("re:") or features.text.startswith("fwd:")
+    
+    def _is_recent(self, email: MessageRecord) -> bool:
+        """Check recency"""
+        # Fetched mail carries the sender's UTC offset; hand-built emails may not
+        time_diff = datetime.now(email.date.tzinfo) - email.date
+        return time_diff.total_seconds() < self.RECENT_SECONDS
+    
+    def priority_inputs(self, email: MessageRecord, features: Optional[EmailFeatures] = None) -> PriorityInputs:
+        """Get the urgent keyword count and reply flag that priority is derived from"""
+        if features is None:
+            features = self.extract_features(email)
+        return PriorityInputs(features.count_present(self.URGENT_KEYWORDS), self._is_reply(features))
+    
+    @staticmethod
+    def priority_level(urgent_count: int, is_reply: bool, is_recent: bool) -> str:
+        """Determine priority from urgency, replies and recency"""
         if urgent_count >= 2 or (urgent_count >= 1 and is_recent):
             return "high"
         elif is_reply or urgent_count == 1:
@@ -94,32 +328,36 @@ class AIEmailService:
         else:
             return "low"
     
-    def _extract_tags(self, text: str) -> List[str]:
+    def _extract_tags(self, features: EmailFeatures) -> List[str]:
         """Extract relevant tags from email"""
         tags = []
         
         # Common action tags
-        if any(word in text for word in ["meeting", "schedule", "calendar"]):
-            tags.append("meeting")
-        if any(word in text for word in ["deadline", "due", "submit"]):
-            tags.append("action-required")
-        if any(word in text for word in ["invoice", "payment", "pay"]):
-            tags.append("payment")
-        if any(word in text for word in ["question", "?", "help", "assist"]):
-            tags.append("needs-response")
+        for tag, keywords in self.TAG_KEYWORDS.items():
+            if any(features.has(word) for word in keywords):
+                tags.append(tag)
         
         return tags
     
-    def analyze_email(self, email: EmailMessage) -> EmailAnalysis:
+    def analyze_email(
+        self, 
+        email: MessageRecord, 
+        features: Optional[EmailFeatures] = None
+    ) -> EmailAnalysis:
         """Perform complete email analysis"""
+        if features is None and self.cache is not None:
+            return self._cached("analyze", email, lambda f: self.analyze_email(email, f))
+        if features is None:
+            features = self.extract_features(email)
+        
         # Classify email
-        classification = self.classify_email(email)
+        classification = self.classify_email(email, features)
         
         # Generate summary
-        summary = self._generate_summary(email)
+        summary = self._generate_summary(email, features)
         
         # Analyze sentiment
-        sentiment = self._analyze_sentiment(email)
+        sentiment = self._analyze_sentiment(features)
         
         # Generate suggested response
         suggested_response = self._suggest_response(email, classification)
@@ -128,7 +366,7 @@ class AIEmailService:
         action_required = "action-required" in classification.tags or classification.priority == "high"
         
         # Extract action items
-        action_items = self._extract_action_items(email)
+        action_items = self._extract_action_items(features)
         
         return EmailAnalysis(
             email_id=email.id,
@@ -140,12 +378,10 @@ class AIEmailService:
             action_items=action_items
         )
     
-    def _generate_summary(self, email: EmailMessage) -> str:
+    def _generate_summary(self, email: MessageRecord, features: EmailFeatures) -> str:
         """Generate email summary"""
         # Simple extractive summary - first 2 sentences
-        body = email.body.strip()
-        sentences = re.split(r'[.!?]+', body)
-        summary_sentences = [s.strip() for s in sentences[:2] if s.strip()]
+        summary_sentences = [s.strip() for s in features.lead_sentences if s.strip()]
         
         if not summary_sentences:
             return f"Email from {email.sender.email} regarding: {email.subject}"
@@ -156,21 +392,11 @@ class AIEmailService:
         
         return summary
     
-    def _analyze_sentiment(self, email: EmailMessage) -> str:
+    @metrics.timed("sentiment")
+    def _analyze_sentiment(self, features: EmailFeatures) -> str:
         """Analyze email sentiment"""
-        text = f"{email.subject} {email.body}".lower()
-        
-        positive_words = [
-            "thank", "appreciate", "great", "excellent", "good", 
-            "happy", "pleased", "wonderful", "amazing", "love"
-        ]
-        negative_words = [
-            "unfortunately", "sorry", "apologize", "issue", "problem",
-            "concern", "disappointed", "frustrated", "urgent", "critical"
-        ]
-        
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
+        positive_count = features.count_present(self.POSITIVE_WORDS)
+        negative_count = features.count_present(self.NEGATIVE_WORDS)
         
         if positive_count > negative_count:
             return "positive"
@@ -181,7 +407,7 @@ class AIEmailService:
     
     def _suggest_response(
         self, 
-        email: EmailMessage, 
+        email: MessageRecord, 
         classification: EmailClassification
     ) -> str:
         """Suggest response based on email content"""
@@ -200,9 +426,10 @@ class AIEmailService:
         # Default response
         return f"Thank you for your email regarding '{email.subject}'. I'll review this and respond accordingly."
     
-    def _extract_action_items(self, email: EmailMessage) -> List[str]:
+    @metrics.timed("action_items")
+    def _extract_action_items(self, features: EmailFeatures) -> List[str]:
         """Extract action items from email"""
-        text = email.body.lower()
+        text = features.body
         action_items = []
         
         # Look for common action patterns
@@ -222,36 +449,33 @@ class AIEmailService:
         
         return action_items[:5]  # Return max 5 action items
     
-    def detect_spam(self, email: EmailMessage) -> bool:
+    def detect_spam(
+        self, 
+        email: MessageRecord, 
+        features: Optional[EmailFeatures] = None
+    ) -> bool:
         """Detect if email is likely spam"""
-        text = f"{email.subject} {email.body}".lower()
-        
-        spam_indicators = 0
-        
-        # Check for spam keywords
-        spam_keywords = [
-            "congratulations you've won",
-            "click here now",
-            "act now",
-            "limited time offer",
-            "100% free",
-            "no credit card",
-            "dear friend",
-            "nigerian prince"
-        ]
-        
-        spam_indicators += sum(1 for keyword in spam_keywords if keyword in text)
-        
-        # Check for excessive punctuation
-        if text.count("!") > 3 or text.count("?") > 3:
-            spam_indicators += 1
-        
-        # Check for all caps subject
-        if email.subject.isupper() and len(email.subject) > 10:
-            spam_indicators += 1
-        
-        # Check for suspicious links
-        if text.count("http") > 3:
-            spam_indicators += 1
-        
-        return spam_indicators >= 3
+        if features is None and self.cache is not None:
+            return self._cached("spam-check", email, lambda f: self.detect_spam(email, f))
+        if features is None:
+            features = self.extract_features(email)
+        
+        with metrics.time("spam_check"):
+            spam_indicators = 0
+            
+            # Check for spam keywords
+            spam_indicators += features.count_present(self.SPAM_KEYWORDS)
+            
+            # Check for excessive punctuation
+            if features.exclamation_count > 3 or features.question_count > 3:
+                spam_indicators += 1
+            
+            # Check for all caps subject
+            if features.subject_all_caps:
+                spam_indicators += 1
+            
+            # Check for suspicious links
+            if features.link_count > 3:
+                spam_indicators += 1
+            
+            return spam_indicators >= 3
@@ -0,0 +1,179 @@
+"""Content-addressed cache of AI analysis results"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCache:
+    """Bounded LRU cache of JSON-ready analysis results with optional TTL
+
+    Entries live in memory up to `max_entries`, least recently used first
+    out. With `disk_path`, entries are also written to a SQLite file, so
+    results survive restarts and memory evictions; disk hits are promoted
+    back into memory. The file keeps up to `max_disk_entries` rows, the
+    least recently written and expired ones going first. Entries older
+    than `ttl` seconds are treated as missing in both tiers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        max_disk_entries: int = 100000
+    ):
+        """Initialize an empty cache, opening the disk tier if configured"""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # The disk tier has its own lock, so memory hits never wait on a write
+        self._disk_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "expirations": 0,
+        }
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0
+        if disk_path:
+            if disk_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            if disk_path != ":memory:":
+                # Commits append to the log without waiting for a sync of the database
+                self._disk.execute("PRAGMA journal_mode=WAL")
+                self._disk.execute("PRAGMA synchronous=NORMAL")
+            self._disk.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+            self._disk.execute(
+                "DELETE FROM analysis_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            )
+            self._disk.commit()
+            self._disk_rows = self._disk.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+        row = None
+        with self._disk_lock:
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT data, expires_at FROM analysis_cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+
+        with self._lock:
+            if row is not None and (row[1] is None or row[1] > now):
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+                return value
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Cache a JSON-ready value"""
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._remember(key, expires_at, value)
+        with self._disk_lock:
+            if self._disk is not None:
+                # Replacing a row gives it a new rowid, so rowid order is write order
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO analysis_cache VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at)
+                )
+                self._disk_rows += 1
+                if self._disk_rows > self.max_disk_entries:
+                    self._trim_disk()
+                self._disk.commit()
+
+    def _trim_disk(self) -> None:
+        """Drop expired rows, then the oldest, to a tenth below the cap; caller holds the disk lock"""
+        removed = self._disk.execute(
+            "DELETE FROM analysis_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+            (time.time(),)
+        ).rowcount
+        rows = self._disk.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        excess = rows - (self.max_disk_entries - self.max_disk_entries // 10)
+        if excess > 0:
+            removed += self._disk.execute(
+                "DELETE FROM analysis_cache WHERE rowid IN "
+                "(SELECT rowid FROM analysis_cache ORDER BY rowid LIMIT ?)",
+                (excess,)
+            ).rowcount
+            rows -= excess
+        self._disk_rows = rows
+        with self._lock:
+            self._stats["disk_evictions"] += removed
+
+    def _remember(self, key: str, expires_at: Optional[float], value: Any) -> None:
+        """Add an entry to the memory tier; caller holds the lock"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop all entries from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM analysis_cache")
+                self._disk.commit()
+                self._disk_rows = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss, eviction and size counters"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["size"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        if self._disk is not None:
+            stats["disk_size"] = self._disk_rows
+            stats["max_disk_entries"] = self.max_disk_entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close the disk tier"""
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
@@ -0,0 +1,316 @@
+"""Minimal asyncio IMAP4rev1 client
+
+Speaks just the commands EmailService needs (LOGIN, SELECT, SEARCH, FETCH,
+IDLE, NOOP, LOGOUT and their UID forms) and returns data in the same shape
+as imaplib, so the parsing helpers in imap_utils work on both.
+"""
+import asyncio
+import re
+import ssl
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+from .imap_utils import SELECT_RESPONSES
+
+logger = logging.getLogger(__name__)
+
+LITERAL_PATTERN = re.compile(rb"\{(\d+)\}$")
+NUMBERED_PATTERN = re.compile(rb"(\d+) ([A-Za-z-]+)(?: (.*))?$", re.DOTALL)
+KEYWORD_PATTERN = re.compile(rb"([A-Za-z-]+)(?: (.*))?$", re.DOTALL)
+RESPONSE_CODE_PATTERN = re.compile(rb"\[([A-Za-z-]+)(?: ([^\]]*))?\]")
+
+# Longest response line accepted; a SEARCH reply over a large mailbox is
+# one line of every matching number, far beyond asyncio's 64 KiB default
+MAX_LINE = 10_000_000
+
+ResponsePart = Union[bytes, Tuple[bytes, bytes]]
+
+
+class AsyncIMAPError(Exception):
+    """Raised when the server rejects a command or the connection breaks"""
+
+
+def _quote(value: str) -> str:
+    """Quote a command argument"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class AsyncIMAPClient:
+    """IMAP connection driven by the event loop
+
+    Commands on one connection run one at a time; concurrency comes from
+    using many connections at once. Every command is bounded by `timeout`
+    seconds, and a connection whose command failed midway is marked
+    `broken` so pools can drop it.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        timeout: float = 30.0
+    ):
+        """Initialize client on an open stream"""
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.capabilities: Tuple[str, ...] = ()
+        self.untagged_responses: Dict[str, List[ResponsePart]] = {}
+        self.state = "NONAUTH"
+        self.broken = False
+        self.selected_folder: Optional[str] = None
+        self.on_skip: Optional[Callable[[], None]] = None
+        self._select_responses: Dict[str, List[ResponsePart]] = {}
+        self._tag = 0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(
+        cls,
+        host: str,
+        port: int,
+        use_ssl: bool = True,
+        timeout: float = 30.0
+    ) -> "AsyncIMAPClient":
+        """Open a connection and read the server greeting"""
+        ssl_context = ssl.create_default_context() if use_ssl else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl_context),
+            timeout
+        )
+        client = cls(reader, writer, timeout)
+        try:
+            greeting = await asyncio.wait_for(client._read_response(), timeout)
+            client._store_untagged(greeting)
+            if "PREAUTH" in client.untagged_responses:
+                client.state = "AUTH"
+            elif "OK" not in client.untagged_responses:
+                raise AsyncIMAPError(f"Unexpected greeting: {greeting[0]!r}")
+            if "CAPABILITY" in client.untagged_responses:
+                client._set_capabilities()
+            else:
+                await client.capability()
+        except BaseException:
+            client.abort()
+            raise
+        return client
+
+    # Protocol
+
+    async def _read_line(self) -> bytes:
+        """Read one line, in pieces if it is longer than the stream buffer"""
+        line = bytearray()
+        while True:
+            try:
+                line += await self.reader.readuntil(b"\n")
+                return bytes(line).rstrip(b"\r\n")
+            except asyncio.LimitOverrunError as e:
+                line += await self.reader.readexactly(e.consumed)
+            except asyncio.IncompleteReadError:
+                raise AsyncIMAPError("Connection closed by server")
+            if len(line) > MAX_LINE:
+                raise AsyncIMAPError(f"Response line longer than {MAX_LINE} bytes")
+
+    async def _read_response(self) -> List[ResponsePart]:
+        """Read one response line, with any literals it contains"""
+        parts: List[ResponsePart] = []
+        line = await self._read_line()
+        while True:
+            match = LITERAL_PATTERN.search(line)
+            if match is None:
+                parts.append(line)
+                return parts
+            literal = await self.reader.readexactly(int(match.group(1)))
+            parts.append((line, literal))
+            line = await self._read_line()
+
+    def _store_untagged(self, parts: List[ResponsePart]) -> None:
+        """File an untagged response under its type, as imaplib does"""
+        first = parts[0]
+        meta = first[0] if isinstance(first, tuple) else first
+        if not meta.startswith(b"* "):
+            return
+
+        numbered = NUMBERED_PATTERN.match(meta, 2)
+        if numbered:
+            key = numbered.group(2)
+            data = numbered.group(1) + (b" " + numbered.group(3) if numbered.group(3) else b"")
+        else:
+            keyword = KEYWORD_PATTERN.match(meta, 2)
+            if keyword is None:
+                return
+            key, data = keyword.group(1), keyword.group(2) or b""
+            code = RESPONSE_CODE_PATTERN.match(data)
+            if code:
+                self.untagged_responses.setdefault(code.group(1).decode().upper(), []).append(code.group(2))
+
+        first = (data, first[1]) if isinstance(first, tuple) else data
+        self.untagged_responses.setdefault(key.decode().upper(), []).extend([first] + parts[1:])
+
+    async def _command(self, name: str, *args: str) -> Tuple[str, bytes]:
+        """Send a command and wait for its tagged completion"""
+        async with self._lock:
+            if self.broken:
+                raise AsyncIMAPError("Connection is no longer usable")
+            try:
+                return await asyncio.wait_for(self._run(name, args), self.timeout)
+            except BaseException:
+                self.broken = True
+                raise
+
+    async def _run(self, name: str, args: Tuple[str, ...]) -> Tuple[str, bytes]:
+        self._tag += 1
+        tag = f"A{self._tag:04d}".encode()
+        self.untagged_responses = {}
+        self.writer.write(b" ".join([tag, name.encode(), *(a.encode() for a in args)]) + b"\r\n")
+        await self.writer.drain()
+
+        while True:
+            parts = await self._read_response()
+            first = parts[0][0] if isinstance(parts[0], tuple) else parts[0]
+            if first.startswith(tag + b" "):
+                status, _, text = first[len(tag) + 1:].partition(b" ")
+                status = status.decode().upper()
+                if status == "BAD":
+                    raise AsyncIMAPError(f"{name} command error: {text.decode(errors='replace')}")
+                return status, text
+            self._store_untagged(parts)
+
+    async def _simple(self, name: str, *args: str) -> Tuple[str, List[ResponsePart]]:
+        """Run a command whose NO reply is an error"""
+        typ, text = await self._command(name, *args)
+        if typ != "OK":
+            raise AsyncIMAPError(f"{name} failed: {text.decode(errors='replace')}")
+        return typ, [text]
+
+    def _set_capabilities(self) -> None:
+        capabilities = self.untagged_responses["CAPABILITY"][-1]
+        self.capabilities = tuple(capabilities.decode().upper().split())
+
+    # Commands
+
+    async def capability(self) -> Tuple[str, List[ResponsePart]]:
+        typ, data = await self._simple("CAPABILITY")
+        self._set_capabilities()
+        return typ, data
+
+    async def login(self, user: str, password: str) -> Tuple[str, List[ResponsePart]]:
+        typ, data = await self._simple("LOGIN", _quote(user), _quote(password))
+        self.state = "AUTH"
+        return typ, data
+
+    async def select(self, mailbox: str = "INBOX") -> Tuple[str, List[ResponsePart]]:
+        """Select a folder, skipping the round trip if it is already selected"""
+        if mailbox == self.selected_folder and self.state == "SELECTED":
+            if self.on_skip is not None:
+                self.on_skip()
+            self.untagged_responses = {k: list(v) for k, v in self._select_responses.items()}
+            return "OK", list(self.untagged_responses.get("EXISTS", [b"0"]))
+
+        self.selected_folder = None
+        typ, text = await self._command("SELECT", _quote(mailbox))
+        if typ != "OK":
+            self.state = "AUTH"
+            raise AsyncIMAPError(f"SELECT {mailbox} failed: {text.decode(errors='replace')}")
+        self.state = "SELECTED"
+        self.selected_folder = mailbox
+        self._select_responses = {
+            key: list(self.untagged_responses[key])
+            for key in SELECT_RESPONSES
+            if key in self.untagged_responses
+        }
+        return typ, list(self.untagged_responses.get("EXISTS", [b"0"]))
+
+    def response(self, code: str) -> Tuple[str, List[ResponsePart]]:
+        """Get untagged data of the last command, as imaplib's response()"""
+        return code, self.untagged_responses.get(code.upper(), [None])
+
+    async def search(self, charset: Optional[str], *criteria: str) -> Tuple[str, List[ResponsePart]]:
+        args = (("CHARSET", charset) if charset else ()) + criteria
+        typ, _ = await self._simple("SEARCH", *args)
+        return typ, self.untagged_responses.get("SEARCH", [b""])
+
+    async def fetch(self, message_set: str, items: str) -> Tuple[str, List[ResponsePart]]:
+        typ, _ = await self._simple("FETCH", message_set, items)
+        return typ, self.untagged_responses.get("FETCH", [None])
+
+    async def uid(self, command: str, *args: str) -> Tuple[str, List[ResponsePart]]:
+        command = command.upper()
+        typ, _ = await self._simple("UID", command, *(a for a in args if a is not None))
+        return typ, self.untagged_responses.get(command, [b""] if command == "SEARCH" else [None])
+
+    async def noop(self) -> Tuple[str, List[ResponsePart]]:
+        return await self._simple("NOOP")
+
+    async def idle(self, duration: float) -> Dict[str, List[ResponsePart]]:
+        """Wait in IDLE until the server reports a change or `duration` seconds pass
+
+        Returns the untagged responses received, such as EXISTS for new
+        mail; an empty result means nothing changed.
+        """
+        async with self._lock:
+            if self.broken:
+                raise AsyncIMAPError("Connection is no longer usable")
+            try:
+                return await self._idle(duration)
+            except BaseException:
+                self.broken = True
+                raise
+
+    async def _idle(self, duration: float) -> Dict[str, List[ResponsePart]]:
+        self._tag += 1
+        tag = f"A{self._tag:04d}".encode()
+        self.untagged_responses = {}
+        self.writer.write(tag + b" IDLE\r\n")
+        await self.writer.drain()
+
+        while True:
+            parts = await asyncio.wait_for(self._read_response(), self.timeout)
+            first = parts[0][0] if isinstance(parts[0], tuple) else parts[0]
+            if first.startswith(b"+"):
+                break
+            if first.startswith(tag + b" "):
+                raise AsyncIMAPError(f"IDLE failed: {first.decode(errors='replace')}")
+            self._store_untagged(parts)
+
+        # The read is not cancelled on timeout, so no response is cut in half.
+        # Whether a change arrived or time ran out, end IDLE and read up to
+        # the tagged completion
+        read = asyncio.ensure_future(self._read_response())
+        try:
+            await asyncio.wait({read}, timeout=duration)
+            self.writer.write(b"DONE\r\n")
+            await self.writer.drain()
+            while True:
+                parts = await asyncio.wait_for(read, self.timeout)
+                first = parts[0][0] if isinstance(parts[0], tuple) else parts[0]
+                if first.startswith(tag + b" "):
+                    status = first[len(tag) + 1:].partition(b" ")[0].decode().upper()
+                    if status != "OK":
+                        raise AsyncIMAPError(f"IDLE failed: {first.decode(errors='replace')}")
+                    return self.untagged_responses
+                self._store_untagged(parts)
+                read = asyncio.ensure_future(self._read_response())
+        except BaseException:
+            read.cancel()
+            raise
+
+    async def logout(self) -> None:
+        """Log out and close the connection"""
+        try:
+            if not self.broken:
+                await self._command("LOGOUT")
+        except Exception:
+            pass
+        finally:
+            self.state = "LOGOUT"
+            self.abort()
+
+    def abort(self) -> None:
+        """Close the connection without logging out"""
+        self.broken = True
+        try:
+            self.writer.close()
+        except RuntimeError:
+            # The loop that owned the connection is already closed
+            pass
@@ -0,0 +1,157 @@
+"""Batch email analysis on a process pool"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import logging
+
+from ..models.records import MessageRecord
+from .ai_service import AIEmailService
+from .scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("analyze", "classify", "spam-check")
+
+# AI service instance owned by each worker process
+_worker_service: Optional[AIEmailService] = None
+
+
+def _get_worker_service() -> AIEmailService:
+    """Get the AI service of the current worker process"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = AIEmailService()
+    return _worker_service
+
+
+def run_operation(service: AIEmailService, operation: str, email: MessageRecord) -> Dict[str, Any]:
+    """Run one AI operation on an email and return a JSON-ready result"""
+    if operation == "analyze":
+        return service.analyze_email(email).model_dump(mode="json")
+    if operation == "classify":
+        return service.classify_email(email).model_dump(mode="json")
+    if operation == "spam-check":
+        return {"is_spam": service.detect_spam(email), "email_id": email.id}
+    raise ValueError(f"Unknown batch operation: {operation}")
+
+
+def _process_chunk(
+    operation: str,
+    start: int,
+    emails: List[MessageRecord]
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """Process a chunk of emails inside a worker process"""
+    service = _get_worker_service()
+    if operation == "classify":
+        classifications = service.classify_batch(emails)
+        return [
+            (start + offset, classification.model_dump(mode="json"))
+            for offset, classification in enumerate(classifications)
+        ]
+    return [
+        (start + offset, run_operation(service, operation, email))
+        for offset, email in enumerate(emails)
+    ]
+
+
+class BatchAnalysisService:
+    """Spread AI analysis of many emails across worker processes
+
+    With a scheduler, each chunk runs in one of the requesting account's
+    slots, so accounts share the workers fairly.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 100,
+        scheduler: Optional[FairScheduler] = None
+    ):
+        """Initialize batch service; the process pool starts on first use"""
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.scheduler = scheduler
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, starting it if needed"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"Started batch analysis pool with {self._executor._max_workers} workers")
+        return self._executor
+
+    def _submit_chunks(
+        self,
+        emails: List[MessageRecord],
+        operation: str,
+        chunk_size: Optional[int],
+        account: str
+    ) -> List[asyncio.Future]:
+        """Submit emails to the pool in chunks"""
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown batch operation: {operation}")
+
+        size = chunk_size or self.chunk_size
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        if self.scheduler is None:
+            return [
+                loop.run_in_executor(executor, _process_chunk, operation, start, emails[start:start + size])
+                for start in range(0, len(emails), size)
+            ]
+
+        async def run_in_slot(start: int) -> List[Tuple[int, Dict[str, Any]]]:
+            async with self.scheduler.async_slot(account):
+                return await loop.run_in_executor(executor, _process_chunk, operation, start, emails[start:start + size])
+
+        return [asyncio.ensure_future(run_in_slot(start)) for start in range(0, len(emails), size)]
+
+    async def process(
+        self,
+        emails: List[MessageRecord],
+        operation: str = "analyze",
+        chunk_size: Optional[int] = None,
+        account: str = ""
+    ) -> List[Dict[str, Any]]:
+        """Process emails and return results in input order
+        
+        If a chunk fails, the chunks not yet started are cancelled.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(emails)
+        futures = self._submit_chunks(emails, operation, chunk_size, account)
+        try:
+            chunks = await asyncio.gather(*futures)
+        finally:
+            for future in futures:
+                future.cancel()
+        for chunk in chunks:
+            for index, result in chunk:
+                results[index] = result
+        return results
+
+    async def iter_process(
+        self,
+        emails: List[MessageRecord],
+        operation: str = "analyze",
+        chunk_size: Optional[int] = None,
+        account: str = ""
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, result) pairs as soon as each chunk finishes
+        
+        Chunks not yet started are cancelled if one fails or the caller
+        stops early, so they do not keep holding the account's slots.
+        """
+        futures = self._submit_chunks(emails, operation, chunk_size, account)
+        try:
+            for next_chunk in asyncio.as_completed(futures):
+                for index, result in await next_chunk:
+                    yield index, result
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
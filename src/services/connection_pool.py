@@ -0,0 +1,481 @@
+"""Pools of authenticated mail server connections shared across requests"""
+import asyncio
+import imaplib
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+import logging
+
+from .imap_utils import SELECT_RESPONSES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+def _new_stats() -> Dict[str, Any]:
+    return {
+        "acquires": 0,
+        "created": 0,
+        "reused": 0,
+        "discarded": 0,
+        "evicted_idle": 0,
+        "health_check_failures": 0,
+        "connect_failures": 0,
+        "timeouts": 0,
+        "wait_seconds_total": 0.0,
+        "wait_seconds_max": 0.0,
+    }
+
+
+def _add_rates(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Add reuse rate and average wait to a stats snapshot"""
+    acquires = stats["acquires"]
+    stats["reuse_rate"] = stats["reused"] / acquires if acquires else 0.0
+    stats["wait_seconds_avg"] = stats["wait_seconds_total"] / acquires if acquires else 0.0
+    return stats
+
+
+class _PoolEntry(Generic[T]):
+    """Connection held by a pool, with usage bookkeeping"""
+
+    def __init__(self, connection: T):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class ConnectionPool(Generic[T]):
+    """Thread-safe pool of reusable connections
+
+    Idle connections are reused most-recently-used first, checked with
+    `check_connection` when they have been idle longer than `check_after`
+    seconds, and closed once idle longer than `idle_timeout` seconds.
+    Subclasses implement `check_connection` and `close_connection`.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        check_after: float = 5.0,
+        acquire_timeout: float = 30.0,
+        name: str = "pool"
+    ):
+        """Initialize an empty pool; connections are opened on demand"""
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+        self.name = name
+        self._idle: List[_PoolEntry[T]] = []
+        self._in_use: Dict[int, _PoolEntry[T]] = {}
+        self._opening = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = _new_stats()
+
+    # Hooks
+
+    def check_connection(self, connection: T) -> bool:
+        """Return whether an idle connection is still usable"""
+        return True
+
+    def close_connection(self, connection: T) -> None:
+        """Close a connection that leaves the pool"""
+
+    def reset_connection(self, connection: T) -> None:
+        """Prepare a released connection for its next user"""
+
+    # Pool operations
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _evict_expired(self, now: float) -> List[_PoolEntry[T]]:
+        """Remove idle entries past the idle timeout; caller holds the lock"""
+        expired = [e for e in self._idle if now - e.last_used > self.idle_timeout]
+        if expired:
+            self._idle = [e for e in self._idle if now - e.last_used <= self.idle_timeout]
+            self._stats["evicted_idle"] += len(expired)
+        return expired
+
+    def acquire(self, timeout: Optional[float] = None) -> T:
+        """Get a healthy connection, opening one if the pool has room"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            entry = None
+            expired: List[_PoolEntry[T]] = []
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError(f"{self.name} is closed")
+                while True:
+                    expired = self._evict_expired(time.monotonic())
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._in_use[id(entry.connection)] = entry
+                        break
+                    if self._size() < self.max_size:
+                        self._opening += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(f"Timed out waiting for a {self.name} connection")
+                    self._condition.wait(remaining)
+
+            for stale in expired:
+                self._safe_close(stale.connection)
+
+            if entry is None:
+                try:
+                    connection = self.factory()
+                except Exception:
+                    with self._condition:
+                        self._opening -= 1
+                        self._stats["connect_failures"] += 1
+                        self._condition.notify()
+                    raise
+                entry = _PoolEntry(connection)
+                with self._condition:
+                    self._opening -= 1
+                    self._in_use[id(connection)] = entry
+                    self._stats["created"] += 1
+            elif time.monotonic() - entry.last_used > self.check_after and not self._healthy(entry):
+                continue
+            else:
+                with self._condition:
+                    self._stats["reused"] += 1
+
+            entry.uses += 1
+            waited = time.monotonic() - start
+            with self._condition:
+                self._stats["acquires"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            return entry.connection
+
+    def _healthy(self, entry: _PoolEntry[T]) -> bool:
+        """Check an idle connection; drop it from the pool if it failed"""
+        try:
+            healthy = self.check_connection(entry.connection)
+        except Exception:
+            healthy = False
+        if not healthy:
+            logger.info(f"Dropping unhealthy {self.name} connection")
+            with self._condition:
+                self._in_use.pop(id(entry.connection), None)
+                self._stats["health_check_failures"] += 1
+                self._condition.notify()
+            self._safe_close(entry.connection)
+        return healthy
+
+    def release(self, connection: T, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if discard is set"""
+        if not discard:
+            try:
+                self.reset_connection(connection)
+            except Exception:
+                discard = True
+
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None:
+                return
+            if discard or self._closed:
+                self._stats["discarded"] += 1
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._condition.notify()
+
+        if discard or self._closed:
+            self._safe_close(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[T]:
+        """Context manager that acquires and releases a connection"""
+        connection = self.acquire()
+        try:
+            yield connection
+        except Exception:
+            self.release(connection, discard=True)
+            raise
+        else:
+            self.release(connection)
+
+    def evict_idle(self) -> int:
+        """Close idle connections past the idle timeout"""
+        with self._condition:
+            expired = self._evict_expired(time.monotonic())
+        for entry in expired:
+            self._safe_close(entry.connection)
+        return len(expired)
+
+    def close(self) -> None:
+        """Close all idle connections; in-use ones are closed on release"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for entry in idle:
+            self._safe_close(entry.connection)
+
+    def _safe_close(self, connection: T) -> None:
+        try:
+            self.close_connection(connection)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, reuse rate and acquire wait statistics"""
+        with self._condition:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["max_size"] = self.max_size
+            stats["size"] = self._size()
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+        return _add_rates(stats)
+
+
+class PooledIMAPConnection:
+    """imaplib connection wrapper that remembers the selected folder
+
+    A SELECT of the folder that is already selected is answered from the
+    previous SELECT's responses instead of going to the server. All other
+    attributes are delegated to the wrapped connection.
+    """
+
+    def __init__(self, connection: imaplib.IMAP4, on_skip: Optional[Callable[[], None]] = None):
+        self.connection = connection
+        self.selected_folder: Optional[str] = None
+        self.selected_readonly = False
+        self._select_result: Optional[Tuple[str, list]] = None
+        self._select_responses: Dict[str, list] = {}
+        self._on_skip = on_skip
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
+
+    def select(self, mailbox: str = "INBOX", readonly: bool = False) -> Tuple[str, list]:
+        """Select a folder, skipping the round trip if it is already selected"""
+        if (
+            mailbox == self.selected_folder
+            and readonly == self.selected_readonly
+            and self._select_result is not None
+            and self.connection.state == "SELECTED"
+        ):
+            if self._on_skip is not None:
+                self._on_skip()
+            for key, value in self._select_responses.items():
+                self.connection.untagged_responses[key] = list(value)
+            return self._select_result
+
+        self.selected_folder = None
+        result = self.connection.select(mailbox, readonly)
+        if result[0] == "OK":
+            self.selected_folder = mailbox
+            self.selected_readonly = readonly
+            self._select_result = result
+            self._select_responses = {
+                key: list(self.connection.untagged_responses[key])
+                for key in SELECT_RESPONSES
+                if key in self.connection.untagged_responses
+            }
+        return result
+
+    def forget_selection(self) -> None:
+        """Force the next select to go to the server"""
+        self.selected_folder = None
+        self._select_result = None
+
+
+class IMAPConnectionPool(ConnectionPool[PooledIMAPConnection]):
+    """Pool of logged-in IMAP connections with NOOP health checks"""
+
+    def __init__(self, factory: Callable[[], imaplib.IMAP4], **kwargs):
+        super().__init__(lambda: PooledIMAPConnection(factory(), self._record_skip), name="IMAP", **kwargs)
+        self._stats["skipped_selects"] = 0
+
+    def _record_skip(self) -> None:
+        with self._condition:
+            self._stats["skipped_selects"] += 1
+
+    def check_connection(self, connection: PooledIMAPConnection) -> bool:
+        typ, _ = connection.connection.noop()
+        return typ == "OK"
+
+    def close_connection(self, connection: PooledIMAPConnection) -> None:
+        connection.connection.logout()
+
+
+class SMTPConnectionPool(ConnectionPool[smtplib.SMTP]):
+    """Pool of logged-in SMTP sessions, reset with RSET between users"""
+
+    def __init__(self, factory: Callable[[], smtplib.SMTP], **kwargs):
+        super().__init__(factory, name="SMTP", **kwargs)
+
+    def check_connection(self, connection: smtplib.SMTP) -> bool:
+        code, _ = connection.noop()
+        return code == 250
+
+    def reset_connection(self, connection: smtplib.SMTP) -> None:
+        connection.rset()
+
+    def close_connection(self, connection: smtplib.SMTP) -> None:
+        connection.quit()
+
+
+class AsyncIMAPConnectionPool:
+    """Pool of logged-in AsyncIMAPClient connections for the event loop
+
+    Behaves like IMAPConnectionPool, but waits without blocking the loop.
+    Connections belong to the loop that opened them, so the pool starts
+    over if it is used from a different loop.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        check_after: float = 5.0,
+        acquire_timeout: float = 30.0
+    ):
+        """Initialize an empty pool; connections are opened on demand"""
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PoolEntry] = []
+        self._in_use: Dict[int, _PoolEntry] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+        self._stats = _new_stats()
+        self._stats["skipped_selects"] = 0
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            for entry in self._idle:
+                entry.connection.abort()
+            self._idle = []
+            self._in_use = {}
+            self._slots = asyncio.Semaphore(self.max_size)
+            self._loop = loop
+
+    def _record_skip(self) -> None:
+        self._stats["skipped_selects"] += 1
+
+    async def acquire(self, timeout: Optional[float] = None) -> Any:
+        """Get a healthy connection, waiting for a free slot if needed"""
+        if self._closed:
+            raise RuntimeError("Async IMAP pool is closed")
+        self._bind_loop()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise PoolTimeoutError("Timed out waiting for an async IMAP connection")
+
+        try:
+            entry = await self._take_idle()
+            if entry is None:
+                try:
+                    connection = await self.factory()
+                except Exception:
+                    self._stats["connect_failures"] += 1
+                    raise
+                connection.on_skip = self._record_skip
+                entry = _PoolEntry(connection)
+                self._stats["created"] += 1
+            else:
+                self._stats["reused"] += 1
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._in_use[id(entry.connection)] = entry
+        entry.uses += 1
+        waited = time.monotonic() - start
+        self._stats["acquires"] += 1
+        self._stats["wait_seconds_total"] += waited
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        return entry.connection
+
+    async def _take_idle(self) -> Optional[_PoolEntry]:
+        """Pop the most recently used idle connection that is still healthy"""
+        while self._idle:
+            entry = self._idle.pop()
+            idle_for = time.monotonic() - entry.last_used
+            if idle_for > self.idle_timeout:
+                self._stats["evicted_idle"] += 1
+                await entry.connection.logout()
+                continue
+            if idle_for > self.check_after:
+                try:
+                    await entry.connection.noop()
+                except Exception:
+                    logger.info("Dropping unhealthy async IMAP connection")
+                    self._stats["health_check_failures"] += 1
+                    entry.connection.abort()
+                    continue
+            return entry
+        return None
+
+    async def evict_idle(self) -> int:
+        """Log out idle connections past the idle timeout, if the pool is bound to the running loop"""
+        if self._loop is not asyncio.get_running_loop():
+            return 0
+        now = time.monotonic()
+        expired = [e for e in self._idle if now - e.last_used > self.idle_timeout]
+        if expired:
+            self._idle = [e for e in self._idle if e not in expired]
+            self._stats["evicted_idle"] += len(expired)
+        for entry in expired:
+            await entry.connection.logout()
+        return len(expired)
+
+    async def release(self, connection: Any, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if discard is set"""
+        entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            return
+        self._slots.release()
+        if discard or connection.broken or self._closed:
+            self._stats["discarded"] += 1
+            await connection.logout()
+        else:
+            entry.last_used = time.monotonic()
+            self._idle.append(entry)
+
+    async def close(self) -> None:
+        """Log out idle connections; in-use ones are closed on release"""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for entry in idle:
+            await entry.connection.logout()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, reuse rate and acquire wait statistics"""
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["max_size"] = self.max_size
+        stats["size"] = len(self._idle) + len(self._in_use)
+        stats["idle"] = len(self._idle)
+        stats["in_use"] = len(self._in_use)
+        return _add_rates(stats)
@@ -0,0 +1,50 @@
+"""Per-message features shared by the analysis stages"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from ..models.records import MessageRecord
+from .keyword_matcher import KeywordMatcher
+
+SENTENCE_PATTERN = re.compile(r'[.!?]+')
+
+# Number of leading body sentences kept for summaries
+LEAD_SENTENCES = 2
+
+
+@dataclass
+class EmailFeatures:
+    """Text features computed once per email and reused by every analysis"""
+    text: str
+    body: str
+    keyword_hits: Dict[str, int] = field(default_factory=dict)
+    exclamation_count: int = 0
+    question_count: int = 0
+    link_count: int = 0
+    subject_all_caps: bool = False
+    lead_sentences: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_email(cls, email: MessageRecord, matcher: KeywordMatcher) -> "EmailFeatures":
+        """Extract features from an email"""
+        body = email.body.lower()
+        text = f"{email.subject.lower()} {body}"
+
+        return cls(
+            text=text,
+            body=body,
+            keyword_hits=matcher.count(text),
+            exclamation_count=text.count("!"),
+            question_count=text.count("?"),
+            link_count=text.count("http"),
+            subject_all_caps=email.subject.isupper() and len(email.subject) > 10,
+            lead_sentences=SENTENCE_PATTERN.split(email.body.strip(), maxsplit=LEAD_SENTENCES)[:LEAD_SENTENCES]
+        )
+
+    def has(self, keyword: str) -> bool:
+        """Check whether keyword occurs in the text"""
+        return keyword in self.keyword_hits
+
+    def count_present(self, keywords: List[str]) -> int:
+        """Count how many of the keywords occur in the text"""
+        return sum(1 for keyword in keywords if keyword in self.keyword_hits)
@@ -1,47 +1,183 @@
 """Email service for IMAP/SMTP operations"""
+import asyncio
 import imaplib
 import smtplib
 import email
+import re
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
+from email.parser import BytesHeaderParser
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Collection, Dict, Iterator, List, Optional, Tuple, Union
 import logging
 
-from ..models.email_models import EmailMessage, EmailAddress, EmailConfig
+from ..models.email_models import (
+    EmailConfig, 
+    EmailSummary, 
+    FlagChange, 
+    SyncResult, 
+    OutgoingEmail, 
+    RecipientStatus, 
+    BulkSendResult
+)
+from ..models.records import AddressRecord, MessageRecord
+from .imap_utils import (
+    FetchResponse, 
+    body_structure, 
+    chunked, 
+    has_attachments, 
+    parse_fetch_response, 
+    to_sequence_set
+)
+from .sync_state import SyncState, SyncStateStore
+from .connection_pool import AsyncIMAPConnectionPool, IMAPConnectionPool, SMTPConnectionPool
+from .async_imap import AsyncIMAPClient
+from .message_store import MessageStore
+from .mime_parser import decode_partial, decode_text, parse_message
+from ..utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Data items requested for full messages; FLAGS come back in the same round
+# trip, and PEEK leaves the \Seen flag untouched so is_read stays accurate
+FULL_FETCH_ITEMS = "(UID FLAGS BODY.PEEK[])"
+
+# Headers requested for list-view summaries
+SUMMARY_HEADER_FIELDS = "FROM TO SUBJECT DATE"
+
+# Data items requested to match messages against the message store
+STORE_CHECK_ITEMS = "(UID FLAGS)"
+
+# Bytes of body text fetched to build a summary preview
+PREVIEW_FETCH_BYTES = 2048
+
 
 class EmailService:
     """Service for managing email operations"""
     
-    def __init__(self, config: EmailConfig, password: str):
-        """Initialize email service with configuration"""
+    def __init__(
+        self, 
+        config: EmailConfig, 
+        password: str, 
+        imap_pool: Optional[IMAPConnectionPool] = None,
+        smtp_pool: Optional[SMTPConnectionPool] = None,
+        async_imap_pool: Optional[AsyncIMAPConnectionPool] = None,
+        message_store: Optional[MessageStore] = None,
+        account: Optional[str] = None
+    ):
+        """Initialize email service with configuration
+        
+        When a pool is given, connections are borrowed from it and returned
+        to it on disconnect instead of logging out. With a `message_store`,
+        full messages already stored locally are not downloaded again.
+        Stored messages and sync state are kept under `account`, which
+        defaults to the email address.
+        """
         self.config = config
+        self.account = account or config.email_address
         self.password = password
+        self.imap_pool = imap_pool
+        self.smtp_pool = smtp_pool
+        self.async_imap_pool = async_imap_pool
+        self.message_store = message_store
+        self.selected_uidvalidity: Optional[int] = None
         self.imap_connection = None
         self.smtp_connection = None
+        self.async_imap_connection: Optional[AsyncIMAPClient] = None
+        self._imap_failed = False
+        self._smtp_failed = False
+    
+    @metrics.timed("imap_connect")
+    def open_imap_connection(self) -> imaplib.IMAP4:
+        """Open and log in a new IMAP connection"""
+        if self.config.use_ssl:
+            connection = imaplib.IMAP4_SSL(
+                self.config.imap_server, 
+                self.config.imap_port, 
+                timeout=self.config.imap_timeout
+            )
+        else:
+            connection = imaplib.IMAP4(
+                self.config.imap_server, 
+                self.config.imap_port, 
+                timeout=self.config.imap_timeout
+            )
+        
+        connection.login(
+            self.config.email_address, 
+            self.password
+        )
+        return connection
     
     def connect_imap(self) -> None:
         """Connect to IMAP server"""
         try:
-            if self.config.use_ssl:
-                self.imap_connection = imaplib.IMAP4_SSL(
-                    self.config.imap_server, 
-                    self.config.imap_port
-                )
+            if self.imap_pool is not None:
+                self.imap_connection = self.imap_pool.acquire()
             else:
-                self.imap_connection = imaplib.IMAP4(
-                    self.config.imap_server, 
-                    self.config.imap_port
-                )
-            
-            self.imap_connection.login(
-                self.config.email_address, 
-                self.password
+                self.imap_connection = self.open_imap_connection()
+            self._imap_failed = False
+            logger.info("Successfully connected to IMAP server")
+        except Exception as e:
+            logger.error(f"Failed to connect to IMAP: {e}")
+            raise
+    
+    def open_smtp_connection(self) -> smtplib.SMTP:
+        """Open and log in a new SMTP connection"""
+        connection = smtplib.SMTP(
+            self.config.smtp_server, 
+            self.config.smtp_port
+        )
+        if self.config.smtp_starttls:
+            connection.starttls()
+        connection.login(
+            self.config.email_address, 
+            self.password
+        )
+        return connection
+    
+    def _acquire_smtp(self) -> smtplib.SMTP:
+        """Borrow an SMTP session from the pool, or open a new one"""
+        if self.smtp_pool is not None:
+            return self.smtp_pool.acquire()
+        return self.open_smtp_connection()
+    
+    def _release_smtp(self, connection: smtplib.SMTP, failed: bool = False) -> None:
+        """Return an SMTP session to the pool, or quit it"""
+        if self.smtp_pool is not None:
+            self.smtp_pool.release(connection, discard=failed)
+            return
+        try:
+            connection.quit()
+        except Exception:
+            pass
+    
+    async def open_async_imap_connection(self) -> AsyncIMAPClient:
+        """Open and log in a new asyncio IMAP connection"""
+        with metrics.time("imap_connect"):
+            connection = await AsyncIMAPClient.connect(
+                self.config.imap_server, 
+                self.config.imap_port, 
+                use_ssl=self.config.use_ssl, 
+                timeout=self.config.imap_timeout
             )
+            try:
+                await connection.login(self.config.email_address, self.password)
+            except BaseException:
+                connection.abort()
+                raise
+        return connection
+    
+    async def connect_imap_async(self) -> None:
+        """Connect to IMAP server without blocking the event loop"""
+        try:
+            if self.async_imap_pool is not None:
+                self.async_imap_connection = await self.async_imap_pool.acquire()
+            else:
+                self.async_imap_connection = await self.open_async_imap_connection()
             logger.info("Successfully connected to IMAP server")
         except Exception as e:
             logger.error(f"Failed to connect to IMAP: {e}")
@@ -50,15 +186,8 @@ class EmailService:
     def connect_smtp(self) -> None:
         """Connect to SMTP server"""
         try:
-            self.smtp_connection = smtplib.SMTP(
-                self.config.smtp_server, 
-                self.config.smtp_port
-            )
-            self.smtp_connection.starttls()
-            self.smtp_connection.login(
-                self.config.email_address, 
-                self.password
-            )
+            self.smtp_connection = self._acquire_smtp()
+            self._smtp_failed = False
             logger.info("Successfully connected to SMTP server")
         except Exception as e:
             logger.error(f"Failed to connect to SMTP: {e}")
@@ -66,51 +195,605 @@ class EmailService:
     
     def disconnect(self) -> None:
         """Disconnect from email servers"""
-        if self.imap_connection:
+        if self.imap_connection and self.imap_pool is not None:
+            self.imap_pool.release(self.imap_connection, discard=self._imap_failed)
+            self.imap_connection = None
+        elif self.imap_connection:
             try:
                 self.imap_connection.logout()
             except Exception:
                 pass
         if self.smtp_connection:
-            try:
-                self.smtp_connection.quit()
-            except Exception:
-                pass
+            self._release_smtp(self.smtp_connection, failed=self._smtp_failed)
+            self.smtp_connection = None
+    
+    async def disconnect_async(self) -> None:
+        """Disconnect from email servers without blocking the event loop"""
+        if self.async_imap_connection:
+            if self.async_imap_pool is not None:
+                await self.async_imap_pool.release(self.async_imap_connection)
+            else:
+                await self.async_imap_connection.logout()
+            self.async_imap_connection = None
+        if self.imap_connection or self.smtp_connection:
+            await asyncio.to_thread(self.disconnect)
     
     def fetch_emails(
         self, 
         folder: str = "INBOX", 
         limit: int = 50,
         unread_only: bool = False
-    ) -> List[EmailMessage]:
+    ) -> List[MessageRecord]:
         """Fetch emails from specified folder"""
+        return list(self.iter_emails(folder, limit, unread_only))
+    
+    def iter_emails(
+        self, 
+        folder: str = "INBOX", 
+        limit: int = 50,
+        unread_only: bool = False
+    ) -> Iterator[MessageRecord]:
+        """Fetch emails from specified folder, yielding each one once parsed
+        
+        Only one FETCH chunk of raw messages is held at a time, so memory
+        stays flat however large `limit` is.
+        """
         if not self.imap_connection:
             self.connect_imap()
         
         try:
-            self.imap_connection.select(folder)
-            
-            # Search criteria
+            ids = self._search(folder, limit, unread_only)
+            if self.message_store is not None and self.selected_uidvalidity is not None:
+                yield from self._iter_messages_stored(ids, folder, self.selected_uidvalidity)
+            else:
+                yield from self._iter_messages(ids, folder)
+        except Exception as e:
+            logger.error(f"Failed to fetch emails: {e}")
+            self._imap_failed = True
+            raise
+    
+    def iter_fetched_chunks(
+        self, 
+        folder: str = "INBOX", 
+        limit: int = 50,
+        unread_only: bool = False
+    ) -> Iterator[List[Union[MessageRecord, FetchResponse]]]:
+        """Download emails chunk by chunk without parsing them
+        
+        Each chunk lists, in the same order as iter_emails, messages found
+        in the message store and raw FETCH responses still to be parsed
+        with _parse_fetch_response, so parsing can happen elsewhere.
+        """
+        if not self.imap_connection:
+            self.connect_imap()
+        
+        try:
+            ids = self._search(folder, limit, unread_only)
+            uidvalidity = self.selected_uidvalidity
+            use_store = self.message_store is not None and uidvalidity is not None
+            for chunk in chunked(ids, self.config.fetch_chunk_size):
+                if not use_store:
+                    with metrics.time("imap_fetch"):
+                        _, data = self.imap_connection.fetch(to_sequence_set(chunk), FULL_FETCH_ITEMS)
+                    responses = self._responses_by_id(data)
+                    yield [responses[i.decode()] for i in chunk if i.decode() in responses]
+                    continue
+                
+                with metrics.time("imap_fetch"):
+                    _, flag_data = self.imap_connection.fetch(to_sequence_set(chunk), STORE_CHECK_ITEMS)
+                found, missing = self._split_stored(flag_data, folder, uidvalidity)
+                if missing:
+                    with metrics.time("imap_fetch"):
+                        _, data = self.imap_connection.uid("FETCH", to_sequence_set(missing), FULL_FETCH_ITEMS)
+                    found.update(self._responses_by_id(data))
+                yield [found[i.decode()] for i in chunk if i.decode() in found]
+        except Exception as e:
+            logger.error(f"Failed to fetch emails: {e}")
+            self._imap_failed = True
+            raise
+    
+    async def fetch_emails_async(
+        self, 
+        folder: str = "INBOX", 
+        limit: int = 50,
+        unread_only: bool = False
+    ) -> List[MessageRecord]:
+        """Fetch emails from specified folder on the event loop
+        
+        Same results as fetch_emails, but network waits yield to other
+        requests instead of blocking the worker. MIME parsing and message
+        store lookups run on worker threads, so they do not hold up the
+        loop either.
+        """
+        if not self.async_imap_connection:
+            await self.connect_imap_async()
+        
+        connection = self.async_imap_connection
+        try:
+            with metrics.time("imap_select"):
+                await connection.select(folder)
+            uidvalidity = _response_int(connection, "UIDVALIDITY")
+            self.selected_uidvalidity = uidvalidity
+            use_store = self.message_store is not None and uidvalidity is not None
             search_criteria = "UNSEEN" if unread_only else "ALL"
-            _, message_numbers = self.imap_connection.search(None, search_criteria)
+            with metrics.time("imap_search"):
+                _, message_numbers = await connection.search(None, search_criteria)
             
             emails = []
-            for num in message_numbers[0].split()[-limit:]:
-                _, msg_data = self.imap_connection.fetch(num, "(RFC822)")
-                email_body = msg_data[0][1]
-                email_message = email.message_from_bytes(email_body)
+            for chunk in chunked(message_numbers[0].split()[-limit:], self.config.fetch_chunk_size):
+                if not use_store:
+                    with metrics.time("imap_fetch"):
+                        _, data = await connection.fetch(to_sequence_set(chunk), FULL_FETCH_ITEMS)
+                    emails.extend(await asyncio.to_thread(self._collect_messages, data, chunk, folder))
+                    continue
                 
-                # Parse email
-                parsed_email = self._parse_email(email_message, num.decode(), folder)
-                emails.append(parsed_email)
-            
+                with metrics.time("imap_fetch"):
+                    _, flag_data = await connection.fetch(to_sequence_set(chunk), STORE_CHECK_ITEMS)
+                found, missing = await asyncio.to_thread(self._split_stored, flag_data, folder, uidvalidity)
+                if missing:
+                    with metrics.time("imap_fetch"):
+                        _, data = await connection.uid("FETCH", to_sequence_set(missing), FULL_FETCH_ITEMS)
+                    fetched = await asyncio.to_thread(self._collect_and_store, data, missing, folder, uidvalidity)
+                    found.update((message.id, message) for message in fetched)
+                emails.extend(found[i.decode()] for i in chunk if i.decode() in found)
             return emails
         except Exception as e:
             logger.error(f"Failed to fetch emails: {e}")
+            connection.broken = True
+            raise
+    
+    async def watch_async(
+        self, 
+        folder: str = "INBOX", 
+        idle_timeout: float = 1500.0
+    ) -> AsyncIterator[List[MessageRecord]]:
+        """Yield each batch of messages that arrives in a folder
+        
+        Waits in IMAP IDLE between batches, so nothing is sent while the
+        folder is quiet, and fetches only the new UIDs when the server
+        reports new mail. IDLE is renewed every `idle_timeout` seconds, as
+        servers drop IDLE sessions after 30 minutes. The watch holds its
+        connection for as long as it runs, so use a service without an
+        async pool.
+        """
+        if not self.async_imap_connection:
+            await self.connect_imap_async()
+        
+        connection = self.async_imap_connection
+        try:
+            if "IDLE" not in connection.capabilities:
+                raise ValueError("Server does not support IDLE")
+            with metrics.time("imap_select"):
+                await connection.select(folder)
+            uidvalidity = _response_int(connection, "UIDVALIDITY")
+            self.selected_uidvalidity = uidvalidity
+            uidnext = _response_int(connection, "UIDNEXT")
+            if uidnext is not None:
+                last_uid = uidnext - 1
+            else:
+                _, uid_data = await connection.uid("SEARCH", None, "ALL")
+                last_uid = max((int(u) for u in uid_data[0].split()), default=0)
+            
+            while True:
+                changes = await connection.idle(idle_timeout)
+                if "EXISTS" not in changes:
+                    continue
+                with metrics.time("imap_search"):
+                    _, uid_data = await connection.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+                new_uids = [u for u in uid_data[0].split() if int(u) > last_uid]
+                if not new_uids:
+                    continue
+                with metrics.time("imap_fetch"):
+                    _, data = await connection.uid("FETCH", to_sequence_set(new_uids), FULL_FETCH_ITEMS)
+                messages = await asyncio.to_thread(self._collect_and_store, data, new_uids, folder, uidvalidity)
+                last_uid = max(int(u) for u in new_uids)
+                yield messages
+        except Exception as e:
+            logger.error(f"Failed to watch {folder}: {e}")
+            connection.broken = True
             raise
     
-    def _parse_email(self, email_message, email_id: str, folder: str = "inbox") -> EmailMessage:
-        """Parse email message to EmailMessage model"""
+    def fetch_summaries(
+        self, 
+        folder: str = "INBOX", 
+        limit: int = 50,
+        unread_only: bool = False,
+        preview_length: int = 200
+    ) -> List[EmailSummary]:
+        """Fetch lightweight summaries without downloading full messages
+        
+        Only the list-view headers, flags, size, BODYSTRUCTURE and the first
+        bytes of the body text are requested.
+        """
+        if not self.imap_connection:
+            self.connect_imap()
+        
+        try:
+            items = (
+                f"(UID FLAGS RFC822.SIZE BODYSTRUCTURE "
+                f"BODY.PEEK[HEADER.FIELDS ({SUMMARY_HEADER_FIELDS})] "
+                f"BODY.PEEK[TEXT]<0.{PREVIEW_FETCH_BYTES}>)"
+            )
+            summaries = []
+            for chunk in chunked(self._search(folder, limit, unread_only), self.config.fetch_chunk_size):
+                with metrics.time("imap_fetch"):
+                    _, data = self.imap_connection.fetch(to_sequence_set(chunk), items)
+                responses = {
+                    r.sequence: r for r in parse_fetch_response(data)
+                    if r.literal("BODY[HEADER") is not None
+                }
+                for message_id in chunk:
+                    response = responses.get(message_id.decode())
+                    if response is not None:
+                        summaries.append(self._parse_summary(response, folder, preview_length))
+            return summaries
+        except Exception as e:
+            logger.error(f"Failed to fetch email summaries: {e}")
+            self._imap_failed = True
+            raise
+    
+    def fetch_email_by_uid(self, uid: int, folder: str = "INBOX") -> Optional[MessageRecord]:
+        """Fetch one full message by UID"""
+        if not self.imap_connection:
+            self.connect_imap()
+        
+        # Only a single numeric UID, never a set such as `1:*`
+        uid = str(int(uid))
+        try:
+            uidvalidity = self._select(folder)
+            use_store = self.message_store is not None and uidvalidity is not None
+            if use_store:
+                with metrics.time("imap_fetch"):
+                    _, flag_data = self.imap_connection.uid("FETCH", uid, STORE_CHECK_ITEMS)
+                found, missing = self._split_stored(flag_data, folder, uidvalidity)
+                if found or not missing:
+                    return next(iter(found.values()), None)
+            
+            emails = self._fetch_messages([uid.encode()], folder, by_uid=True)
+            if use_store:
+                self.message_store.put_many(self.account, folder, uidvalidity, emails)
+            return emails[0] if emails else None
+        except Exception as e:
+            logger.error(f"Failed to fetch email {uid}: {e}")
+            self._imap_failed = True
+            raise
+    
+    @metrics.timed("imap_select")
+    def _select(self, folder: str) -> Optional[int]:
+        """Select folder and return its UIDVALIDITY"""
+        self.imap_connection.select(folder)
+        self.selected_uidvalidity = _response_int(self.imap_connection, "UIDVALIDITY")
+        return self.selected_uidvalidity
+    
+    def _search(self, folder: str, limit: int, unread_only: bool) -> List[bytes]:
+        """Select folder and return the newest matching message numbers"""
+        self._select(folder)
+        
+        # Search criteria
+        search_criteria = "UNSEEN" if unread_only else "ALL"
+        with metrics.time("imap_search"):
+            _, message_numbers = self.imap_connection.search(None, search_criteria)
+        
+        return message_numbers[0].split()[-limit:]
+    
+    def sync_emails(
+        self, 
+        state_store: SyncStateStore, 
+        folder: str = "INBOX", 
+        initial_limit: int = 500,
+        known_uids: Optional[Collection[str]] = None
+    ) -> SyncResult:
+        """Fetch only messages and flag changes that are new since the last sync
+        
+        Sync state (UIDVALIDITY, highest seen UID and, when the server
+        supports CONDSTORE, HIGHESTMODSEQ) is kept per account and folder in
+        `state_store`. The first sync, or one after UIDVALIDITY changed,
+        fetches the newest `initial_limit` messages. UIDs in `known_uids`
+        that are no longer in the folder are reported as expunged.
+        
+        Without CONDSTORE the server cannot say which flags changed, so the
+        flags of every seen message are fetched and compared with the read
+        and starred state saved by the last sync; only differences are
+        reported.
+        """
+        if not self.imap_connection:
+            self.connect_imap()
+        
+        try:
+            condstore = "CONDSTORE" in self.imap_connection.capabilities
+            if condstore and "ENABLE" in self.imap_connection.capabilities:
+                self.imap_connection.enable("CONDSTORE")
+            
+            uidvalidity = self._select(folder)
+            if uidvalidity is None:
+                raise ValueError(f"Server did not report UIDVALIDITY for {folder}")
+            highest_modseq = None
+            if condstore:
+                _, modseq_data = self.imap_connection.response("HIGHESTMODSEQ")
+                if modseq_data and modseq_data[-1]:
+                    highest_modseq = int(modseq_data[-1])
+            
+            account = self.account
+            state = state_store.get(account, folder)
+            full_resync = state is None or state.uidvalidity != uidvalidity
+            if full_resync:
+                if state is not None:
+                    logger.info(f"UIDVALIDITY of {folder} changed, resyncing")
+                state = SyncState(account, folder, uidvalidity)
+                state_store.clear_flags(account, folder)
+            
+            # New messages: UIDs above the highest one already seen
+            with metrics.time("imap_search"):
+                _, uid_data = self.imap_connection.uid("SEARCH", None, f"UID {state.highest_uid + 1}:*")
+            new_uids = [u for u in uid_data[0].split() if int(u) > state.highest_uid]
+            if full_resync:
+                new_uids = new_uids[-initial_limit:]
+            new_messages = self._fetch_messages(new_uids, folder, by_uid=True)
+            if self.message_store is not None:
+                self.message_store.put_many(account, folder, uidvalidity, new_messages)
+            
+            # Flag changes on messages seen before
+            flag_changes = []
+            if not full_resync and state.highest_uid:
+                flag_changes = self._fetch_flag_changes(
+                    f"1:{state.highest_uid}", 
+                    state.highest_modseq if condstore else None
+                )
+                if not condstore:
+                    flag_changes = self._changed_flags(state_store, account, folder, flag_changes)
+            if not condstore and new_messages:
+                state_store.update_flags(
+                    account, folder, 
+                    {m.uid: _flag_state(m.is_read, m.is_starred) for m in new_messages if m.uid is not None}
+                )
+            
+            # Messages the caller knows of that were expunged since
+            expunged = []
+            if known_uids and not full_resync and state.highest_uid:
+                with metrics.time("imap_search"):
+                    _, uid_data = self.imap_connection.uid("SEARCH", None, f"UID 1:{state.highest_uid}")
+                remaining = {u.decode() for u in uid_data[0].split()}
+                expunged = sorted((uid for uid in known_uids if uid not in remaining), key=int)
+                if expunged and self.message_store is not None:
+                    self.message_store.delete(account, folder, expunged)
+            
+            if new_uids:
+                state.highest_uid = max(state.highest_uid, max(int(u) for u in new_uids))
+            state.highest_modseq = highest_modseq
+            state_store.save(state)
+            
+            return SyncResult(
+                folder=folder,
+                uidvalidity=uidvalidity,
+                highest_uid=state.highest_uid,
+                highest_modseq=highest_modseq,
+                full_resync=full_resync,
+                new_messages=[message.to_model() for message in new_messages],
+                flag_changes=flag_changes,
+                expunged=expunged
+            )
+        except Exception as e:
+            logger.error(f"Failed to sync emails: {e}")
+            self._imap_failed = True
+            raise
+    
+    def _changed_flags(
+        self, 
+        state_store: SyncStateStore, 
+        account: str, 
+        folder: str, 
+        current: List[FlagChange]
+    ) -> List[FlagChange]:
+        """Keep the flags that differ from the saved state, and save the new state
+        
+        Messages without a saved state, such as those older than the first
+        sync fetched, only have theirs saved.
+        """
+        saved = state_store.get_flags(account, folder)
+        updates = {
+            change.uid: _flag_state(change.is_read, change.is_starred) for change in current 
+            if saved.get(change.uid) != _flag_state(change.is_read, change.is_starred)
+        }
+        present = {change.uid for change in current}
+        state_store.update_flags(account, folder, updates, removed=[uid for uid in saved if uid not in present])
+        return [change for change in current if change.uid in updates and change.uid in saved]
+    
+    def _fetch_flag_changes(self, uid_set: str, changed_since: Optional[int]) -> List[FlagChange]:
+        """Fetch flags for a UID set, only those changed since a MODSEQ when given
+        
+        Without CONDSTORE every message's current flags are returned.
+        """
+        with metrics.time("imap_fetch"):
+            if changed_since is not None:
+                _, data = self.imap_connection.uid("FETCH", uid_set, f"(UID FLAGS) (CHANGEDSINCE {changed_since})")
+            else:
+                _, data = self.imap_connection.uid("FETCH", uid_set, "(UID FLAGS)")
+        
+        changes = []
+        for response in parse_fetch_response(data):
+            if response.uid is None:
+                continue
+            flags = response.flags
+            changes.append(FlagChange(
+                uid=response.uid,
+                flags=flags,
+                is_read="\\Seen" in flags,
+                is_starred="\\Flagged" in flags
+            ))
+        return changes
+    
+    def _fetch_messages(
+        self, 
+        ids: List[bytes], 
+        folder: str, 
+        by_uid: bool = False
+    ) -> List[MessageRecord]:
+        """Fetch full messages with one FETCH command per chunk of ids"""
+        return list(self._iter_messages(ids, folder, by_uid))
+    
+    def _iter_messages(
+        self, 
+        ids: List[bytes], 
+        folder: str, 
+        by_uid: bool = False
+    ) -> Iterator[MessageRecord]:
+        """Fetch full messages chunk by chunk, yielding each as it is parsed"""
+        for chunk in chunked(ids, self.config.fetch_chunk_size):
+            message_set = to_sequence_set(chunk)
+            with metrics.time("imap_fetch"):
+                if by_uid:
+                    _, data = self.imap_connection.uid("FETCH", message_set, FULL_FETCH_ITEMS)
+                else:
+                    _, data = self.imap_connection.fetch(message_set, FULL_FETCH_ITEMS)
+            yield from self._iter_collected(data, chunk, folder, by_uid)
+    
+    def _iter_messages_stored(
+        self, 
+        ids: List[bytes], 
+        folder: str, 
+        uidvalidity: int
+    ) -> Iterator[MessageRecord]:
+        """Fetch messages by number, downloading only those not in the message store"""
+        for chunk in chunked(ids, self.config.fetch_chunk_size):
+            with metrics.time("imap_fetch"):
+                _, flag_data = self.imap_connection.fetch(to_sequence_set(chunk), STORE_CHECK_ITEMS)
+            found, missing = self._split_stored(flag_data, folder, uidvalidity)
+            if missing:
+                fetched = self._fetch_messages(missing, folder, by_uid=True)
+                self.message_store.put_many(self.account, folder, uidvalidity, fetched)
+                found.update((message.id, message) for message in fetched)
+            yield from (found[i.decode()] for i in chunk if i.decode() in found)
+    
+    def _split_stored(
+        self, 
+        flag_data: list, 
+        folder: str, 
+        uidvalidity: int
+    ) -> Tuple[Dict[str, MessageRecord], List[bytes]]:
+        """Split (UID FLAGS) FETCH data into stored messages and UIDs to download
+        
+        Stored messages are keyed by their current sequence number and
+        carry the current flags.
+        """
+        responses = [r for r in parse_fetch_response(flag_data) if r.uid is not None]
+        stored = self.message_store.get_many(
+            self.account, 
+            folder, 
+            uidvalidity, 
+            [r.uid for r in responses]
+        )
+        
+        found = {}
+        missing = []
+        for response in responses:
+            message = stored.get(response.uid)
+            if message is None:
+                missing.append(response.uid.encode())
+                continue
+            found[response.sequence] = replace(
+                message,
+                id=response.sequence,
+                is_read="\\Seen" in response.flags,
+                is_starred="\\Flagged" in response.flags
+            )
+        return found, missing
+    
+    def _collect_and_store(
+        self, 
+        data: list, 
+        uids: List[bytes], 
+        folder: str, 
+        uidvalidity: Optional[int]
+    ) -> List[MessageRecord]:
+        """Parse full-message UID FETCH data and add the messages to the message store"""
+        messages = self._collect_messages(data, uids, folder, by_uid=True)
+        if self.message_store is not None and uidvalidity is not None:
+            self.message_store.put_many(self.account, folder, uidvalidity, messages)
+        return messages
+    
+    def _collect_messages(
+        self, 
+        data: list, 
+        ids: List[bytes], 
+        folder: str, 
+        by_uid: bool = False
+    ) -> List[MessageRecord]:
+        """Parse full-message FETCH data in the order the ids were requested"""
+        return list(self._iter_collected(data, ids, folder, by_uid))
+    
+    def _iter_collected(
+        self, 
+        data: list, 
+        ids: List[bytes], 
+        folder: str, 
+        by_uid: bool = False
+    ) -> Iterator[MessageRecord]:
+        """Parse full-message FETCH data lazily, in the order the ids were requested"""
+        responses = self._responses_by_id(data, by_uid)
+        for message_id in ids:
+            response = responses.get(message_id.decode())
+            if response is not None:
+                yield self._parse_fetch_response(response, folder)
+    
+    def _responses_by_id(self, data: list, by_uid: bool = False) -> Dict[str, FetchResponse]:
+        """Index full-message FETCH responses, which may arrive in any order, by number or UID"""
+        return {
+            response.uid if by_uid else response.sequence: response
+            for response in parse_fetch_response(data)
+            if response.literal("BODY[]") is not None
+        }
+    
+    def _parse_fetch_response(self, response: FetchResponse, folder: str) -> MessageRecord:
+        """Parse a full-message FETCH response into a MessageRecord"""
+        return self._parse_email(
+            response.literal("BODY[]"), 
+            response.sequence, 
+            folder, 
+            uid=response.uid, 
+            flags=response.flags
+        )
+    
+    @metrics.timed("mime_parse")
+    def _parse_email(
+        self, 
+        raw: bytes, 
+        email_id: str, 
+        folder: str = "inbox", 
+        uid: Optional[str] = None, 
+        flags: Optional[List[str]] = None
+    ) -> MessageRecord:
+        """Parse raw RFC822 bytes to a MessageRecord
+        
+        Text bodies are capped at max_body_bytes each; attachments are
+        described by name, type and size without decoding them.
+        """
+        metrics.count("messages", "mime_parse")
+        metrics.count("bytes", "mime_parse", len(raw))
+        parsed = parse_message(raw, self.config.max_body_bytes)
+        subject, sender, recipients, email_date = self._parse_headers(parsed.headers)
+        
+        return MessageRecord(
+            id=email_id,
+            subject=subject,
+            sender=sender,
+            recipients=recipients,
+            body=parsed.body,
+            html_body=parsed.html_body,
+            date=email_date,
+            attachments=[a.filename for a in parsed.attachments if a.filename],
+            attachment_info=parsed.attachments,
+            body_truncated=parsed.truncated,
+            folder=folder,
+            uid=uid,
+            is_read="\\Seen" in (flags or []),
+            is_starred="\\Flagged" in (flags or [])
+        )
+    
+    def _parse_headers(
+        self, 
+        email_message
+    ) -> Tuple[str, AddressRecord, List[AddressRecord], datetime]:
+        """Parse subject, sender, recipients and date headers"""
         # Decode subject
         subject, encoding = decode_header(email_message["Subject"])[0]
         if isinstance(subject, bytes):
@@ -121,8 +804,7 @@ class EmailService:
         sender = self._parse_email_address(sender_str)
         
         # Parse recipients
-        to_str = email_message.get("To", "")
-        recipients = [self._parse_email_address(addr) for addr in to_str.split(",")]
+        recipients = self._parse_address_list(email_message.get("To", ""))
         
         # Parse date
         date_str = email_message.get("Date", "")
@@ -131,37 +813,47 @@ class EmailService:
         except Exception:
             email_date = datetime.now()
         
-        # Get body
-        body = ""
-        html_body = None
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                content_type = part.get_content_type()
-                if content_type == "text/plain":
-                    body = part.get_payload(decode=True).decode()
-                elif content_type == "text/html":
-                    html_body = part.get_payload(decode=True).decode()
-        else:
-            body = email_message.get_payload(decode=True).decode()
+        return subject, sender, recipients, email_date
+    
+    def _parse_summary(
+        self, 
+        response: FetchResponse, 
+        folder: str, 
+        preview_length: int
+    ) -> EmailSummary:
+        """Parse a summary FETCH response into an EmailSummary"""
+        headers = email.message_from_bytes(response.literal("BODY[HEADER"))
+        subject, sender, recipients, email_date = self._parse_headers(headers)
+        structure = body_structure(response)
+        flags = response.flags
         
-        return EmailMessage(
-            id=email_id,
+        return EmailSummary(
+            id=response.sequence,
+            uid=response.uid,
             subject=subject,
-            sender=sender,
-            recipients=recipients,
-            body=body,
-            html_body=html_body,
+            sender=sender.to_model(),
+            recipients=[recipient.to_model() for recipient in recipients],
             date=email_date,
+            preview=extract_preview(response.literal("BODY[TEXT]") or b"", structure, preview_length),
+            size=response.size,
+            has_attachments=has_attachments(structure),
+            is_read="\\Seen" in flags,
+            is_starred="\\Flagged" in flags,
             folder=folder
         )
     
-    def _parse_email_address(self, address_str: str) -> EmailAddress:
+    def _parse_email_address(self, address_str: str) -> AddressRecord:
         """Parse email address string"""
-        try:
-            name, email_addr = email.utils.parseaddr(address_str)
-            return EmailAddress(name=name if name else None, email=email_addr)
-        except Exception:
-            return EmailAddress(email=address_str)
+        name, email_addr = email.utils.parseaddr(address_str)
+        return AddressRecord(email=email_addr or address_str.strip(), name=name or None)
+    
+    def _parse_address_list(self, header: str) -> List[AddressRecord]:
+        """Parse an address list header, dropping group names and entries without an address"""
+        return [
+            AddressRecord(email=email_addr, name=name or None)
+            for name, email_addr in email.utils.getaddresses([header])
+            if "@" in email_addr
+        ]
     
     def send_email(
         self,
@@ -177,26 +869,219 @@ class EmailService:
             self.connect_smtp()
         
         try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = self.config.email_address
-            msg["To"] = ", ".join(to)
-            
-            if cc:
-                msg["Cc"] = ", ".join(cc)
-            if bcc:
-                msg["Bcc"] = ", ".join(bcc)
-            
-            # Add body
-            msg.attach(MIMEText(body, "plain"))
-            if html:
-                msg.attach(MIMEText(html, "html"))
+            msg = self._build_message(to, subject, body, html, cc, bcc)
             
             # Send
             recipients = to + (cc or []) + (bcc or [])
-            self.smtp_connection.send_message(msg, to_addrs=recipients)
+            with metrics.time("smtp_send"):
+                self.smtp_connection.send_message(msg, to_addrs=recipients)
+            metrics.count("messages", "smtp_send")
             logger.info(f"Successfully sent email to {to}")
             return True
         except Exception as e:
             logger.error(f"Failed to send email: {e}")
+            self._smtp_failed = _smtp_session_broken(e)
             return False
+    
+    def _build_message(
+        self,
+        to: List[str],
+        subject: str,
+        body: str,
+        html: Optional[str] = None,
+        cc: Optional[List[str]] = None,
+        bcc: Optional[List[str]] = None
+    ) -> MIMEMultipart:
+        """Build a MIME message from its parts"""
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.config.email_address
+        msg["To"] = ", ".join(to)
+        
+        if cc:
+            msg["Cc"] = ", ".join(cc)
+        if bcc:
+            msg["Bcc"] = ", ".join(bcc)
+        
+        # Add body
+        msg.attach(MIMEText(body, "plain"))
+        if html:
+            msg.attach(MIMEText(html, "html"))
+        
+        return msg
+    
+    def send_bulk(
+        self,
+        messages: List[OutgoingEmail],
+        max_sessions: Optional[int] = None
+    ) -> BulkSendResult:
+        """Send many emails over a few long-lived SMTP sessions
+        
+        Messages are spread over up to `max_sessions` sessions (by default
+        the SMTP pool size) that each send their share back to back. A
+        failure affects only the recipients of that message.
+        """
+        if not messages:
+            return BulkSendResult()
+        
+        sessions = max_sessions or (self.smtp_pool.max_size if self.smtp_pool is not None else 1)
+        if self.smtp_pool is not None:
+            sessions = min(sessions, self.smtp_pool.max_size)
+        sessions = max(1, min(sessions, len(messages)))
+        
+        shares = [range(start, len(messages), sessions) for start in range(sessions)]
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            share_statuses = list(executor.map(lambda share: self._send_share(messages, share), shares))
+        
+        statuses = sorted(
+            (status for share in share_statuses for status in share),
+            key=lambda status: status.message_index
+        )
+        sent = sum(1 for status in statuses if status.status == "sent")
+        logger.info(f"Bulk send delivered to {sent} of {len(statuses)} recipients")
+        return BulkSendResult(
+            sent=sent,
+            failed=len(statuses) - sent,
+            sessions=sessions,
+            recipients=statuses
+        )
+    
+    def _send_share(self, messages: List[OutgoingEmail], indexes: range) -> List[RecipientStatus]:
+        """Send a subset of a bulk send over one SMTP session"""
+        statuses: List[RecipientStatus] = []
+        connection = None
+        session_error: Optional[str] = None
+        
+        for index in indexes:
+            message = messages[index]
+            recipients = message.to + (message.cc or []) + (message.bcc or [])
+            failures = {}
+            
+            # A pooled session may have been dropped by the server since its
+            # health check, so a disconnect gets one retry on a new session
+            for attempt in range(2):
+                if connection is None and session_error is None:
+                    try:
+                        connection = self._acquire_smtp()
+                    except Exception as e:
+                        logger.error(f"Failed to open SMTP session for bulk send: {e}")
+                        session_error = str(e)
+                if session_error is not None:
+                    failures = {r: ("failed", None, session_error) for r in recipients}
+                    break
+                try:
+                    msg = self._build_message(
+                        message.to, message.subject, message.body, message.html, message.cc, message.bcc
+                    )
+                    with metrics.time("smtp_send"):
+                        refused = connection.send_message(msg, to_addrs=recipients)
+                    metrics.count("messages", "smtp_send")
+                    failures = {r: ("refused", code, error) for r, (code, error) in refused.items()}
+                    break
+                except smtplib.SMTPRecipientsRefused as e:
+                    failures = {r: ("refused", code, error) for r, (code, error) in e.recipients.items()}
+                    break
+                except smtplib.SMTPResponseException as e:
+                    failures = {r: ("failed", e.smtp_code, e.smtp_error) for r in recipients}
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to send bulk message {index}: {e}")
+                    failures = {r: ("failed", None, str(e)) for r in recipients}
+                    if connection is not None:
+                        self._release_smtp(connection, failed=True)
+                        connection = None
+                    if attempt or not isinstance(e, smtplib.SMTPServerDisconnected):
+                        break
+            
+            for recipient in recipients:
+                status, code, error = failures.get(recipient, ("sent", None, None))
+                statuses.append(RecipientStatus(
+                    message_index=index, 
+                    recipient=recipient, 
+                    status=status, 
+                    code=code, 
+                    error=_smtp_text(error) if error is not None else None
+                ))
+        
+        if connection is not None:
+            self._release_smtp(connection)
+        return statuses
+
+
+def _response_int(connection, code: str) -> Optional[int]:
+    """Read a numeric untagged response, such as UIDVALIDITY, after SELECT"""
+    _, data = connection.response(code)
+    if not data or not data[-1]:
+        return None
+    return int(data[-1])
+
+
+def _flag_state(is_read: bool, is_starred: bool) -> int:
+    """Read and starred state as saved between syncs without CONDSTORE"""
+    return int(is_read) | int(is_starred) << 1
+
+
+def _smtp_session_broken(error: Exception) -> bool:
+    """Whether an SMTP error left the session unusable"""
+    # Reply errors are raised after smtplib has already sent RSET
+    return not isinstance(error, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+
+
+def _smtp_text(value) -> str:
+    """Decode an SMTP reply text"""
+    return value.decode(errors="replace") if isinstance(value, bytes) else str(value)
+
+
+def _first_text_part(text: bytes) -> Tuple[bytes, Optional[str], str, str]:
+    """Find the first text part in the start of a multipart body
+    
+    Returns the part content, transfer encoding, charset and subtype.
+    """
+    lines = text.split(b"\n")
+    i = 0
+    while i < len(lines):
+        if not lines[i].startswith(b"--"):
+            i += 1
+            continue
+        
+        # Part headers run until the first blank line
+        end = i + 1
+        while end < len(lines) and lines[end].strip():
+            end += 1
+        headers = BytesHeaderParser().parsebytes(b"\n".join(lines[i + 1:end]))
+        content_type = headers.get_content_type()
+        if content_type.startswith("text/"):
+            body_end = end + 1
+            while body_end < len(lines) and not lines[body_end].startswith(b"--"):
+                body_end += 1
+            return (
+                b"\n".join(lines[end + 1:body_end]),
+                headers.get("Content-Transfer-Encoding"),
+                headers.get_content_charset() or "utf-8",
+                headers.get_content_subtype()
+            )
+        i = end + 1
+    
+    return b"", None, "utf-8", "plain"
+
+
+def extract_preview(text: bytes, structure: Optional[list], length: int) -> str:
+    """Build a plain-text preview from the first bytes of a message body"""
+    if structure and isinstance(structure[0], list):
+        text, transfer_encoding, charset, subtype = _first_text_part(text)
+    else:
+        transfer_encoding, charset, subtype = None, "utf-8", "plain"
+        if structure:
+            subtype = (structure[1] or "plain").lower()
+            params = structure[2] or []
+            for key, value in zip(params[::2], params[1::2]):
+                if str(key).lower() == "charset":
+                    charset = value
+            transfer_encoding = structure[5]
+    
+    preview = decode_text(decode_partial(text, transfer_encoding), charset)
+    
+    if subtype == "html":
+        preview = re.sub(r"<[^>]*>?", " ", preview)
+    preview = " ".join(preview.split())
+    return preview[:length]
@@ -0,0 +1,160 @@
+"""Push delivery of new mail: IMAP IDLE watches feeding analysis and subscribers"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+
+from ..models.email_models import EmailAnalysis
+from ..models.records import MessageRecord
+from .ai_service import AIEmailService
+from .email_service import EmailService
+from .mailbox_summary import MailboxSummary
+from .search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MailEvent:
+    """New message with its analysis, as published to subscribers"""
+    account: str
+    folder: str
+    email: MessageRecord
+    analysis: EmailAnalysis
+
+
+class EventBroker:
+    """Fans events out to subscriber queues on the event loop
+
+    A subscriber that falls behind loses its oldest events instead of
+    holding up the watcher.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.dropped = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a new subscriber and return its queue"""
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Any) -> None:
+        """Queue an event for every subscriber"""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+
+class IdleWatcher:
+    """Watches folders of one account over IMAP IDLE and publishes analyzed new mail
+
+    Each folder gets its own task and IMAP connection, made by
+    `service_factory`. A watch that fails is reopened after a delay that
+    doubles up to `max_retry_delay` while failures continue. New messages
+    are also counted in `summary` and added to `index`, if given.
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[], EmailService],
+        folders: List[str],
+        ai_service: AIEmailService,
+        broker: EventBroker,
+        idle_timeout: float = 1500.0,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+        summary: Optional[MailboxSummary] = None,
+        index: Optional[SearchIndex] = None
+    ):
+        self.service_factory = service_factory
+        self.folders = folders
+        self.ai_service = ai_service
+        self.broker = broker
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.summary = summary
+        self.index = index
+        self._tasks: List[asyncio.Task] = []
+        self._services: Dict[str, EmailService] = {}
+        self._stopping = False
+        self._stats = {"messages": 0, "batches": 0, "reconnects": 0}
+
+    def start(self) -> None:
+        """Start one watch task per folder on the running loop"""
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._watch(folder)) for folder in self.folders]
+        logger.info(f"Watching {', '.join(self.folders)} for new mail")
+
+    async def stop(self) -> None:
+        """Cancel the watches and close their connections"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        # asyncio.wait_for can swallow a cancellation that lands as a reply
+        # arrives, so also close the connections to end any wait in IDLE
+        for service in self._services.values():
+            if service.async_imap_connection is not None:
+                service.async_imap_connection.abort()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Messages published, reconnects and subscriber counts"""
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["folders"] = len(self.folders)
+        stats["subscribers"] = self.broker.subscribers
+        stats["events_dropped"] = self.broker.dropped
+        return stats
+
+    async def _watch(self, folder: str) -> None:
+        delay = self.retry_delay
+        while not self._stopping:
+            service = self._services[folder] = self.service_factory()
+            try:
+                async for messages in service.watch_async(folder, self.idle_timeout):
+                    delay = self.retry_delay
+                    await self._publish(service.account, folder, service.selected_uidvalidity, messages)
+            except Exception as e:
+                if self._stopping:
+                    return
+                logger.warning(f"Watch of {folder} failed, retrying in {delay:.0f}s: {e}")
+            finally:
+                self._services.pop(folder, None)
+                await service.disconnect_async()
+            self._stats["reconnects"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def _publish(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: Optional[int],
+        messages: List[MessageRecord]
+    ) -> None:
+        """Analyze a batch off the event loop and publish one event per message"""
+        analyses = await asyncio.to_thread(lambda: [self.ai_service.analyze_email(m) for m in messages])
+        if self.summary is not None or self.index is not None:
+            inputs = await asyncio.to_thread(lambda: [self.ai_service.priority_inputs(m) for m in messages])
+        if self.summary is not None:
+            await asyncio.to_thread(self.summary.add_many, account, folder, uidvalidity, messages, analyses, inputs)
+        if self.index is not None:
+            classifications = [analysis.classification for analysis in analyses]
+            await asyncio.to_thread(self.index.add_many, account, folder, uidvalidity, messages, classifications, inputs)
+        for message, analysis in zip(messages, analyses):
+            self.broker.publish(MailEvent(account, folder, message, analysis))
+        self._stats["messages"] += len(messages)
+        self._stats["batches"] += 1
@@ -0,0 +1,200 @@
+"""Helpers for building IMAP commands and parsing FETCH responses"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+RESPONSE_START = re.compile(rb"^(\d+) \(")
+LITERAL_SUFFIX = re.compile(rb" ?\{\d+\}$")
+UID_PATTERN = re.compile(rb"\bUID (\d+)")
+FLAGS_PATTERN = re.compile(rb"\bFLAGS \(([^)]*)\)")
+MODSEQ_PATTERN = re.compile(rb"\bMODSEQ \((\d+)\)")
+SIZE_PATTERN = re.compile(rb"\bRFC822\.SIZE (\d+)")
+
+# Untagged SELECT responses replayed when a redundant SELECT is skipped
+SELECT_RESPONSES = ("FLAGS", "EXISTS", "RECENT", "UIDVALIDITY", "UIDNEXT", "HIGHESTMODSEQ", "UNSEEN")
+
+
+@dataclass
+class FetchResponse:
+    """One message's data from a FETCH response
+
+    `attributes` holds the non-literal part of the response, `literals`
+    maps each literal data item (e.g. ``RFC822`` or ``BODY[TEXT]<0>``) to
+    its bytes.
+    """
+    sequence: str
+    attributes: bytes = b""
+    literals: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def uid(self) -> Optional[str]:
+        match = UID_PATTERN.search(self.attributes)
+        return match.group(1).decode() if match else None
+
+    @property
+    def flags(self) -> List[str]:
+        match = FLAGS_PATTERN.search(self.attributes)
+        return match.group(1).decode().split() if match else []
+
+    @property
+    def modseq(self) -> Optional[int]:
+        match = MODSEQ_PATTERN.search(self.attributes)
+        return int(match.group(1)) if match else None
+
+    @property
+    def size(self) -> Optional[int]:
+        match = SIZE_PATTERN.search(self.attributes)
+        return int(match.group(1)) if match else None
+
+    def literal(self, prefix: str) -> Optional[bytes]:
+        """Get the first literal whose item name starts with prefix"""
+        for name, value in self.literals.items():
+            if name.startswith(prefix):
+                return value
+        return None
+
+
+def to_sequence_set(ids: Iterable[Union[bytes, str, int]]) -> str:
+    """Compress message numbers or UIDs into an IMAP set such as `1:200,205`"""
+    numbers = sorted({int(i) for i in ids})
+    ranges: List[str] = []
+    start = previous = None
+    for number in numbers:
+        if previous is not None and number == previous + 1:
+            previous = number
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == previous else f"{start}:{previous}")
+        start = previous = number
+    if start is not None:
+        ranges.append(str(start) if start == previous else f"{start}:{previous}")
+    return ",".join(ranges)
+
+
+def chunked(items: Sequence, size: int) -> Iterable[Sequence]:
+    """Split a sequence into chunks of at most size items"""
+    for start in range(0, len(items), max(size, 1)):
+        yield items[start:start + size]
+
+
+def _literal_item_name(meta: bytes) -> str:
+    """Name of the data item a literal belongs to, e.g. `BODY[HEADER.FIELDS (FROM)]`"""
+    text = LITERAL_SUFFIX.sub(b"", meta).decode(errors="replace")
+    depth = 0
+    for i in range(len(text) - 1, -1, -1):
+        char = text[i]
+        if char == "]":
+            depth += 1
+        elif char == "[":
+            depth -= 1
+        elif depth == 0 and char in " (":
+            return text[i + 1:]
+    return text
+
+
+def parse_fetch_response(data: List[Union[bytes, tuple, None]]) -> List[FetchResponse]:
+    """Demultiplex imaplib FETCH data into one FetchResponse per message"""
+    responses: List[FetchResponse] = []
+    current: Optional[FetchResponse] = None
+
+    for item in data:
+        if item is None:
+            continue
+        meta = item[0] if isinstance(item, tuple) else item
+        start = RESPONSE_START.match(meta)
+        if start or current is None:
+            current = FetchResponse(sequence=start.group(1).decode() if start else "")
+            responses.append(current)
+
+        if isinstance(item, tuple):
+            current.literals[_literal_item_name(meta)] = item[1]
+            current.attributes += LITERAL_SUFFIX.sub(b"", meta) + b" "
+        else:
+            current.attributes += meta
+
+    return responses
+
+
+def parse_imap_list(data: bytes, start: int = 0) -> Tuple[Any, int]:
+    """Parse one IMAP value (list, quoted string, NIL, number or atom) at start
+
+    Returns the value and the index just after it. Lists become Python
+    lists, NIL becomes None and numbers become ints. Raises ValueError if
+    a list or quoted string is not closed before the end of the data.
+    """
+    i = start
+    while i < len(data) and data[i:i + 1] == b" ":
+        i += 1
+    char = data[i:i + 1]
+
+    if char == b"(":
+        items = []
+        i += 1
+        while True:
+            while data[i:i + 1] == b" ":
+                i += 1
+            if i >= len(data):
+                raise ValueError("Unterminated list in IMAP data")
+            if data[i:i + 1] == b")":
+                return items, i + 1
+            value, i = parse_imap_list(data, i)
+            items.append(value)
+
+    if char == b'"':
+        value = bytearray()
+        i += 1
+        while data[i:i + 1] != b'"':
+            if data[i:i + 1] == b"\\":
+                i += 1
+            if i >= len(data):
+                raise ValueError("Unterminated string in IMAP data")
+            value += data[i:i + 1]
+            i += 1
+        return value.decode(errors="replace"), i + 1
+
+    end = i
+    while end < len(data) and data[end:end + 1] not in (b" ", b")", b"("):
+        end += 1
+    atom = data[i:end].decode(errors="replace")
+    if atom.upper() == "NIL":
+        return None, end
+    if atom.isdigit():
+        return int(atom), end
+    return atom, end
+
+
+def body_structure(response: FetchResponse) -> Optional[list]:
+    """Get the parsed BODYSTRUCTURE of a FETCH response; None if missing or malformed"""
+    marker = response.attributes.find(b"BODYSTRUCTURE (")
+    if marker == -1:
+        return None
+    try:
+        value, _ = parse_imap_list(response.attributes, marker + len(b"BODYSTRUCTURE "))
+    except ValueError:
+        return None
+    return value
+
+
+def iter_body_parts(structure: list) -> Iterable[list]:
+    """Yield the leaf (non-multipart) parts of a BODYSTRUCTURE"""
+    if structure and isinstance(structure[0], list):
+        # Sub-parts come first, followed by the subtype and extension data
+        for part in structure:
+            if not isinstance(part, list):
+                break
+            yield from iter_body_parts(part)
+    else:
+        yield structure
+
+
+def has_attachments(structure: Optional[list]) -> bool:
+    """Whether a BODYSTRUCTURE contains attachment parts"""
+    if not structure:
+        return False
+    for part in iter_body_parts(structure):
+        if not isinstance(part[0], str) or part[0].lower() != "text":
+            return True
+        for item in part[7:]:
+            if isinstance(item, list) and item and isinstance(item[0], str) and item[0].lower() == "attachment":
+                return True
+    return False
@@ -0,0 +1,92 @@
+"""Multi-keyword matcher for scanning email text in a single pass"""
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple
+import logging
+
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - depends on the environment
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """Find every occurrence of a fixed keyword vocabulary in a text.
+
+    Matching has the same substring semantics as ``keyword in text``: a
+    keyword is reported wherever it occurs, including inside other words
+    and overlapping other keywords. When ``pyahocorasick`` is installed the
+    vocabulary is compiled into an Aho-Corasick automaton and the text is
+    scanned once; otherwise each keyword is counted with ``str.count``.
+    The two backends agree on which keywords are present; counts can only
+    differ for keywords that overlap themselves.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """Compile matcher for the given keywords"""
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self.index: Dict[str, int] = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._automaton = None
+
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for index, keyword in enumerate(self.keywords):
+                automaton.add_word(keyword, index)
+            automaton.make_automaton()
+            self._automaton = automaton
+        else:
+            logger.debug("pyahocorasick not installed, using fallback keyword scan")
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self.keywords
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Count occurrences of each keyword found in text"""
+        if not text:
+            return {}
+
+        if self._automaton is not None:
+            indexes = map(itemgetter(1), self._automaton.iter(text))
+            return dict(Counter(map(self.keywords.__getitem__, indexes)))
+
+        hits = {}
+        for keyword in self.keywords:
+            occurrences = text.count(keyword)
+            if occurrences:
+                hits[keyword] = occurrences
+        return hits
+
+    def term_counts(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Count keywords in many texts as a sparse (COO) matrix
+
+        Returns row (text) indexes, column (keyword) indexes and counts.
+        """
+        if self._automaton is None:
+            rows, columns, counts = [], [], []
+            for row, text in enumerate(texts):
+                for keyword, occurrences in self.count(text).items():
+                    rows.append(row)
+                    columns.append(self.index[keyword])
+                    counts.append(occurrences)
+            return (
+                np.asarray(rows, dtype=np.int64),
+                np.asarray(columns, dtype=np.int64),
+                np.asarray(counts, dtype=np.int64)
+            )
+
+        # Scan all texts in one pass; keywords never contain the separator,
+        # so no match can span two texts
+        joined = "\0".join(texts)
+        starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+        hits = np.fromiter(
+            chain.from_iterable(self._automaton.iter(joined)), dtype=np.int64
+        ).reshape(-1, 2)
+
+        rows = np.searchsorted(starts, hits[:, 0], side="right") - 1
+        cells, counts = np.unique(rows * len(self.keywords) + hits[:, 1], return_counts=True)
+        return cells // len(self.keywords), cells % len(self.keywords), counts
@@ -0,0 +1,349 @@
+"""Running triage counts of synced mail"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+from ..models.email_models import DomainCount, EmailAnalysis, FacetCount, TriageSummary
+from ..models.records import MessageRecord
+from .ai_service import AIEmailService, PriorityInputs
+from .search_index import recent_cutoff, utc_date
+
+logger = logging.getLogger(__name__)
+
+# Facets of a summarized message, in `messages` column order
+FACETS = ("category", "urgent", "is_reply", "sentiment", "domain", "is_read", "date")
+
+_Facets = Tuple[str, int, int, str, str, int, str]
+
+
+def _facets(email: MessageRecord, analysis: EmailAnalysis, inputs: PriorityInputs) -> _Facets:
+    domain = email.sender.email.rpartition("@")[2].lower() or "unknown"
+    return (
+        analysis.classification.category,
+        # Priority only tells apart none, one and several urgent keywords
+        min(inputs.urgent_count, 2),
+        int(inputs.is_reply),
+        analysis.sentiment or "unknown",
+        domain,
+        int(email.is_read),
+        utc_date(email.date)
+    )
+
+
+class MailboxSummary:
+    """SQLite store of counts by category, priority, sentiment, sender domain and read state
+
+    Each message's facets are kept by account, folder and UID, and every
+    change to a message (added, read state changed, deleted) adjusts the
+    aggregate counts by one. Reading a summary only touches the aggregates:
+    one row per combination of category, priority inputs, sentiment and
+    read state, and one per sender domain, however many messages there are.
+    Adding a folder's messages under a new UIDVALIDITY drops its older
+    counts.
+
+    Priority depends on how recent a message is, so the counts keep its
+    inputs (urgent keywords and reply flag) and priority is derived when
+    summarizing; only messages with one urgent keyword from the last hour
+    are read individually, to count them as high rather than medium.
+    """
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the summary database"""
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(messages)")]
+        if columns and "urgent" not in columns:
+            # Counts that froze priority are dropped; messages are counted again as they are fetched
+            logger.info("Rebuilding mailbox summary without stored priorities")
+            self._connection.executescript(
+                "DROP TABLE messages; DROP TABLE IF EXISTS counts; "
+                "DROP TABLE IF EXISTS domains; DROP TABLE IF EXISTS folders;"
+            )
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS folders (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uidvalidity INTEGER NOT NULL,
+                PRIMARY KEY (account, folder)
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uid INTEGER NOT NULL,
+                uidvalidity INTEGER,
+                category TEXT NOT NULL,
+                urgent INTEGER NOT NULL,
+                is_reply INTEGER NOT NULL,
+                sentiment TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                is_read INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                PRIMARY KEY (account, folder, uid)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS messages_urgent ON messages (account, urgent, date);
+            CREATE TABLE IF NOT EXISTS counts (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                category TEXT NOT NULL,
+                urgent INTEGER NOT NULL,
+                is_reply INTEGER NOT NULL,
+                sentiment TEXT NOT NULL,
+                is_read INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (account, folder, category, urgent, is_reply, sentiment, is_read)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS domains (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                unread INTEGER NOT NULL,
+                PRIMARY KEY (account, folder, domain)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._connection.commit()
+
+    def _count(self, account: str, folder: str, facets: _Facets, step: int) -> None:
+        """Add `step` to the counts a message contributes to; caller holds the lock inside a transaction"""
+        category, urgent, is_reply, sentiment, domain, is_read, _ = facets
+        self._connection.execute(
+            "INSERT INTO counts VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET count = count + excluded.count",
+            (account, folder, category, urgent, is_reply, sentiment, is_read, step)
+        )
+        self._connection.execute(
+            "INSERT INTO domains VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET total = total + excluded.total, unread = unread + excluded.unread",
+            (account, folder, domain, step, 0 if is_read else step)
+        )
+        if step < 0:
+            self._connection.execute(
+                "DELETE FROM counts WHERE account = ? AND folder = ? AND category = ? "
+                "AND urgent = ? AND is_reply = ? AND sentiment = ? AND is_read = ? AND count <= 0",
+                (account, folder, category, urgent, is_reply, sentiment, is_read)
+            )
+            self._connection.execute(
+                "DELETE FROM domains WHERE account = ? AND folder = ? AND domain = ? AND total <= 0",
+                (account, folder, domain)
+            )
+
+    def _stored(self, account: str, folder: str, uid: str) -> Optional[_Facets]:
+        return self._connection.execute(
+            f"SELECT {', '.join(FACETS)} FROM messages WHERE account = ? AND folder = ? AND uid = ?",
+            (account, folder, int(uid))
+        ).fetchone()
+
+    def add_many(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: Optional[int],
+        emails: Sequence[MessageRecord],
+        analyses: Sequence[EmailAnalysis],
+        priority_inputs: Sequence[PriorityInputs]
+    ) -> int:
+        """Count analyzed messages that have a UID, replacing earlier entries"""
+        added = 0
+        with self._lock, self._connection:
+            if uidvalidity is not None:
+                self._check_uidvalidity(account, folder, uidvalidity)
+
+            for email, analysis, inputs in zip(emails, analyses, priority_inputs):
+                if email.uid is None:
+                    continue
+                old = self._stored(account, folder, email.uid)
+                if old is not None:
+                    self._count(account, folder, old, -1)
+                facets = _facets(email, analysis, inputs)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (account, folder, int(email.uid), uidvalidity, *facets)
+                )
+                self._count(account, folder, facets, 1)
+                added += 1
+        return added
+
+    def _check_uidvalidity(self, account: str, folder: str, uidvalidity: int) -> None:
+        """Record a folder's UIDVALIDITY, dropping its counts if it changed"""
+        row = self._connection.execute(
+            "SELECT uidvalidity FROM folders WHERE account = ? AND folder = ?",
+            (account, folder)
+        ).fetchone()
+        if row is not None and row[0] == uidvalidity:
+            return
+        if row is not None:
+            removed = self._connection.execute(
+                "DELETE FROM messages WHERE account = ? AND folder = ?",
+                (account, folder)
+            ).rowcount
+            for table in ("counts", "domains"):
+                self._connection.execute(f"DELETE FROM {table} WHERE account = ? AND folder = ?", (account, folder))
+            logger.info(f"UIDVALIDITY of {folder} changed, dropped {removed} summarized messages")
+        self._connection.execute(
+            "INSERT OR REPLACE INTO folders VALUES (?, ?, ?)",
+            (account, folder, uidvalidity)
+        )
+
+    def new_emails(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: Optional[int],
+        emails: Sequence[MessageRecord]
+    ) -> List[MessageRecord]:
+        """Filter emails down to those with a UID that are not summarized yet
+
+        Messages summarized under another UIDVALIDITY count as new.
+        """
+        emails = [email for email in emails if email.uid is not None]
+        known = set()
+        with self._lock:
+            for start in range(0, len(emails), 500):
+                batch = [int(email.uid) for email in emails[start:start + 500]]
+                placeholders = ",".join("?" * len(batch))
+                known.update(
+                    str(row[0]) for row in self._connection.execute(
+                        f"SELECT uid FROM messages WHERE account = ? AND folder = ? "
+                        f"AND uidvalidity IS ? AND uid IN ({placeholders})",
+                        (account, folder, uidvalidity, *batch)
+                    )
+                )
+        return [email for email in emails if email.uid not in known]
+
+    def set_read(self, account: str, folder: str, changes: Iterable[Tuple[str, bool]]) -> int:
+        """Apply (uid, is_read) changes to summarized messages, returning how many changed"""
+        changed = 0
+        with self._lock, self._connection:
+            for uid, is_read in changes:
+                old = self._stored(account, folder, uid)
+                if old is None or bool(old[5]) == is_read:
+                    continue
+                self._count(account, folder, old, -1)
+                self._count(account, folder, (*old[:5], int(is_read), old[6]), 1)
+                self._connection.execute(
+                    "UPDATE messages SET is_read = ? WHERE account = ? AND folder = ? AND uid = ?",
+                    (int(is_read), account, folder, int(uid))
+                )
+                changed += 1
+        return changed
+
+    def delete(self, account: str, folder: str, uids: Iterable[str]) -> None:
+        """Remove messages, e.g. after they were expunged"""
+        with self._lock, self._connection:
+            for uid in uids:
+                old = self._stored(account, folder, uid)
+                if old is None:
+                    continue
+                self._count(account, folder, old, -1)
+                self._connection.execute(
+                    "DELETE FROM messages WHERE account = ? AND folder = ? AND uid = ?",
+                    (account, folder, int(uid))
+                )
+
+    def uids(self, account: str, folder: str) -> List[str]:
+        """UIDs of a folder's summarized messages"""
+        with self._lock:
+            return [
+                str(row[0]) for row in self._connection.execute(
+                    "SELECT uid FROM messages WHERE account = ? AND folder = ?",
+                    (account, folder)
+                )
+            ]
+
+    def summary(
+        self,
+        account: str,
+        folder: Optional[str] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        unread_only: bool = False,
+        domains: int = 10
+    ) -> TriageSummary:
+        """Counts of an account's messages, or one folder's, from the aggregates
+
+        Category, priority, sentiment and unread filters narrow every count
+        except the sender domains, which only the folder narrows.
+        """
+        conditions = ["account = ?"]
+        params: list = [account]
+        for column, value in (("folder", folder), ("category", category), ("sentiment", sentiment)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if unread_only:
+            conditions.append("is_read = 0")
+        where = " AND ".join(conditions)
+
+        domain_sql = (
+            "SELECT domain, SUM(total), SUM(unread) FROM domains WHERE account = ?"
+            + (" AND folder = ?" if folder is not None else "")
+            + f" GROUP BY domain ORDER BY SUM({'unread' if unread_only else 'total'}) DESC, domain LIMIT ?"
+        )
+        domain_params = [account] + ([folder] if folder is not None else []) + [domains]
+
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT category, urgent, is_reply, sentiment, is_read, SUM(count) FROM counts WHERE {where} "
+                f"GROUP BY category, urgent, is_reply, sentiment, is_read",
+                params
+            ).fetchall()
+            recent_rows = self._connection.execute(
+                f"SELECT category, sentiment, is_read, COUNT(*) FROM messages WHERE {where} "
+                f"AND urgent = 1 AND date >= ? GROUP BY category, sentiment, is_read",
+                params + [recent_cutoff()]
+            ).fetchall()
+            domain_rows = self._connection.execute(domain_sql, domain_params).fetchall() if domains else []
+
+        grouped: Dict[Tuple[str, str, str, int], int] = {}
+        for row_category, urgent, is_reply, row_sentiment, is_read, count in rows:
+            key = (row_category, AIEmailService.priority_level(urgent, bool(is_reply), False), row_sentiment, is_read)
+            grouped[key] = grouped.get(key, 0) + count
+        # A single urgent keyword makes a message high priority only while it is recent
+        for row_category, row_sentiment, is_read, count in recent_rows:
+            grouped[(row_category, "medium", row_sentiment, is_read)] -= count
+            key = (row_category, "high", row_sentiment, is_read)
+            grouped[key] = grouped.get(key, 0) + count
+
+        summary = TriageSummary(account=account, folder=folder, by_read_state={"read": 0, "unread": 0})
+        by_facet: Dict[str, Dict[str, FacetCount]] = {
+            "category": summary.by_category,
+            "priority": summary.by_priority,
+            "sentiment": summary.by_sentiment,
+        }
+        for (row_category, row_priority, row_sentiment, is_read), count in grouped.items():
+            if not count or (priority is not None and row_priority != priority):
+                continue
+            unread = 0 if is_read else count
+            summary.total += count
+            summary.unread += unread
+            summary.by_read_state["read" if is_read else "unread"] += count
+            for facet, value in (("category", row_category), ("priority", row_priority), ("sentiment", row_sentiment)):
+                counts = by_facet[facet].setdefault(value, FacetCount())
+                counts.total += count
+                counts.unread += unread
+        summary.top_sender_domains = [
+            DomainCount(domain=domain, total=total, unread=unread)
+            for domain, total, unread in domain_rows
+            if not unread_only or unread
+        ]
+        return summary
+
+    def count(self) -> int:
+        """Number of summarized messages"""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,185 @@
+"""Local store of parsed messages so repeat fetches skip IMAP downloads"""
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List
+import logging
+
+from ..models.records import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class MessageStore:
+    """SQLite store of parsed message records
+
+    Messages are stored as zlib-compressed JSON keyed by account, folder,
+    UIDVALIDITY and UID. File databases use WAL mode with one connection
+    per thread, so reads run concurrently with each other and with a
+    writer. Storing messages under a new UIDVALIDITY drops the folder's
+    messages from the old one, since their UIDs no longer identify them.
+    """
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the message database"""
+        self.path = path
+        self._memory = path == ":memory:"
+        if not self._memory:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "invalidated": 0}
+        with self._write_lock:
+            self._connection().executescript(
+                """
+                CREATE TABLE IF NOT EXISTS folders (
+                    account TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    uidvalidity INTEGER NOT NULL,
+                    PRIMARY KEY (account, folder)
+                );
+                CREATE TABLE IF NOT EXISTS messages (
+                    account TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    uidvalidity INTEGER NOT NULL,
+                    uid INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (account, folder, uidvalidity, uid)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self._memory and self._connections:
+                # Every connection to :memory: would be a separate database
+                connection = self._connections[0]
+            else:
+                connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+                if not self._memory:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute("PRAGMA synchronous=NORMAL")
+                self._connections.append(connection)
+            self._local.connection = connection
+        return connection
+
+    def _read_lock(self):
+        # The shared in-memory connection must not be used by two threads at once
+        return self._write_lock if self._memory else nullcontext()
+
+    def get_many(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: int,
+        uids: Iterable[str]
+    ) -> Dict[str, MessageRecord]:
+        """Get stored messages by UID; UIDs not in the store are left out"""
+        uids = [int(uid) for uid in uids]
+        found: Dict[str, MessageRecord] = {}
+        # Stay well below SQLite's bound parameter limit
+        for start in range(0, len(uids), 500):
+            batch = uids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._read_lock():
+                rows = self._connection().execute(
+                    f"SELECT uid, data FROM messages WHERE account = ? AND folder = ? "
+                    f"AND uidvalidity = ? AND uid IN ({placeholders})",
+                    (account, folder, uidvalidity, *batch)
+                ).fetchall()
+            for uid, data in rows:
+                found[str(uid)] = MessageRecord.from_dict(json.loads(zlib.decompress(data)))
+
+        with self._stats_lock:
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(uids) - len(found)
+        return found
+
+    def put_many(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: int,
+        messages: Iterable[MessageRecord]
+    ) -> int:
+        """Store messages that have a UID, replacing older copies"""
+        rows = [
+            (account, folder, uidvalidity, int(message.uid), zlib.compress(json.dumps(message.to_dict()).encode()))
+            for message in messages
+            if message.uid is not None
+        ]
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                self._check_uidvalidity(connection, account, folder, uidvalidity)
+                connection.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+        with self._stats_lock:
+            self._stats["stored"] += len(rows)
+        return len(rows)
+
+    def invalidate(self, account: str, folder: str, uidvalidity: int) -> None:
+        """Drop a folder's messages stored under any other UIDVALIDITY"""
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                self._check_uidvalidity(connection, account, folder, uidvalidity)
+
+    def _check_uidvalidity(
+        self,
+        connection: sqlite3.Connection,
+        account: str,
+        folder: str,
+        uidvalidity: int
+    ) -> None:
+        """Record a folder's UIDVALIDITY, dropping messages if it changed"""
+        row = connection.execute(
+            "SELECT uidvalidity FROM folders WHERE account = ? AND folder = ?",
+            (account, folder)
+        ).fetchone()
+        if row is not None and row[0] == uidvalidity:
+            return
+        if row is not None:
+            removed = connection.execute(
+                "DELETE FROM messages WHERE account = ? AND folder = ? AND uidvalidity = ?",
+                (account, folder, row[0])
+            ).rowcount
+            logger.info(f"UIDVALIDITY of {folder} changed, dropped {removed} stored messages")
+            with self._stats_lock:
+                self._stats["invalidated"] += removed
+        connection.execute(
+            "INSERT OR REPLACE INTO folders VALUES (?, ?, ?)",
+            (account, folder, uidvalidity)
+        )
+
+    def delete(self, account: str, folder: str, uids: Iterable[str]) -> None:
+        """Remove messages, e.g. after they were expunged"""
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    "DELETE FROM messages WHERE account = ? AND folder = ? AND uid = ?",
+                    [(account, folder, int(uid)) for uid in uids]
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and write counters"""
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close all connections"""
+        with self._write_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._local = threading.local()
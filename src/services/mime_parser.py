@@ -0,0 +1,208 @@
+"""Single-pass MIME parsing that decodes text parts and skips attachment payloads"""
+import binascii
+import codecs
+import quopri
+import re
+from dataclasses import dataclass, field
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesHeaderParser
+from typing import Iterator, List, Optional, Set, Tuple
+
+from ..models.records import AttachmentRecord
+
+# Multiparts nested deeper than this are recorded as opaque attachments
+MAX_DEPTH = 20
+
+TEXT_TYPES = ("text/plain", "text/html")
+
+
+@dataclass
+class ParsedMessage:
+    """Headers, capped text bodies and attachment metadata of a message"""
+    headers: Message
+    body: str = ""
+    html_body: Optional[str] = None
+    attachments: List[AttachmentRecord] = field(default_factory=list)
+    truncated: bool = False
+
+
+def decode_partial(data: bytes, transfer_encoding: Optional[str]) -> bytes:
+    """Decode a possibly truncated transfer-encoded body"""
+    transfer_encoding = (transfer_encoding or "").strip().lower()
+    if transfer_encoding == "base64":
+        compact = re.sub(rb"[^A-Za-z0-9+/=]", b"", data)
+        try:
+            return binascii.a2b_base64(compact[:len(compact) // 4 * 4])
+        except binascii.Error:
+            return b""
+    if transfer_encoding == "quoted-printable":
+        return quopri.decodestring(data)
+    return data
+
+
+def decode_text(data: bytes, charset: Optional[str], final: bool = True) -> str:
+    """Decode text in its declared charset, falling back to UTF-8
+
+    With final=False a multi-byte character cut off at the end is dropped
+    instead of becoming a replacement character.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    return decoder.decode(data, final=final)
+
+
+def parse_message(raw: bytes, max_text_bytes: int) -> ParsedMessage:
+    """Parse a full RFC822 message without materializing attachments
+
+    Only headers are parsed into Message objects. Part boundaries are
+    located in place, the first inline text/plain and text/html parts are
+    decoded up to max_text_bytes each, and every other leaf part is
+    recorded as an attachment with its name, type and decoded size.
+    """
+    headers, body_start = _split_headers(raw, 0, len(raw))
+    parsed = ParsedMessage(headers=headers)
+    if headers.get_content_maintype() == "text" and headers.get_content_disposition() != "attachment":
+        # Single-part messages keep their text, HTML included, as the body
+        parsed.body, parsed.truncated = _decode_text_part(raw, body_start, len(raw), headers, max_text_bytes)
+        return parsed
+    _walk(raw, body_start, len(raw), headers, parsed, set(), max_text_bytes, 0)
+    return parsed
+
+
+def _split_headers(raw: bytes, start: int, end: int) -> Tuple[Message, int]:
+    """Parse the headers of the part at start, returning them and where its body starts"""
+    for blank_line in (b"\r\n", b"\n"):
+        if raw.startswith(blank_line, start, end):
+            return BytesHeaderParser().parsebytes(b""), start + len(blank_line)
+
+    separators = [
+        (position, len(separator))
+        for separator in (b"\r\n\r\n", b"\n\n")
+        for position in (raw.find(separator, start, end),)
+        if position != -1
+    ]
+    if not separators:
+        return BytesHeaderParser().parsebytes(raw[start:end]), end
+    position, length = min(separators)
+    return BytesHeaderParser().parsebytes(raw[start:position + length]), position + length
+
+
+def _iter_parts(raw: bytes, boundary: bytes, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """Yield the (start, end) offsets of each part of a multipart body"""
+    delimiter = b"\n--" + boundary
+    # The body may open with a delimiter, right after the header's blank line
+    position = start - 1
+    part_start = None
+    while True:
+        found = raw.find(delimiter, position, end)
+        if found == -1:
+            break
+        after = found + len(delimiter)
+        suffix = raw[after:after + 2]
+        if suffix[:1] and suffix[:1] not in b"-\r\n \t":
+            # A longer boundary that merely starts with this one
+            position = after
+            continue
+        if part_start is not None:
+            # The line break before a delimiter belongs to the delimiter
+            part_end = found - 1 if raw[found - 1:found] == b"\r" else found
+            yield part_start, max(part_end, part_start)
+            part_start = None
+        if suffix == b"--":
+            return
+        line_end = raw.find(b"\n", after, end)
+        if line_end == -1:
+            return
+        part_start = line_end + 1
+        position = line_end
+
+    if part_start is not None:
+        # Unterminated multipart: the last part runs to the end
+        yield part_start, end
+
+
+def _walk(
+    raw: bytes,
+    start: int,
+    end: int,
+    headers: Message,
+    parsed: ParsedMessage,
+    seen: Set[str],
+    max_text_bytes: int,
+    depth: int
+) -> None:
+    """Collect text and attachment metadata from a part and its sub-parts"""
+    content_type = headers.get_content_type()
+    boundary = headers.get_boundary()
+    if headers.get_content_maintype() == "multipart" and boundary and depth < MAX_DEPTH:
+        for part_start, part_end in _iter_parts(raw, boundary.encode("ascii", "surrogateescape"), start, end):
+            part_headers, body_start = _split_headers(raw, part_start, part_end)
+            _walk(raw, body_start, part_end, part_headers, parsed, seen, max_text_bytes, depth + 1)
+        return
+
+    filename = _filename(headers)
+    if content_type in TEXT_TYPES and filename is None and headers.get_content_disposition() != "attachment":
+        if content_type not in seen:
+            seen.add(content_type)
+            text, truncated = _decode_text_part(raw, start, end, headers, max_text_bytes)
+            if content_type == "text/plain":
+                parsed.body = text
+            else:
+                parsed.html_body = text
+            parsed.truncated = parsed.truncated or truncated
+        return
+
+    parsed.attachments.append(AttachmentRecord(
+        filename=filename,
+        content_type=content_type,
+        size=_decoded_size(raw, start, end, headers.get("Content-Transfer-Encoding"))
+    ))
+
+
+def _decode_text_part(
+    raw: bytes,
+    start: int,
+    end: int,
+    headers: Message,
+    max_bytes: int
+) -> Tuple[str, bool]:
+    """Decode at most max_bytes of a text part, reporting whether it was cut short"""
+    transfer_encoding = (headers.get("Content-Transfer-Encoding") or "").strip().lower()
+    # Encoded bytes needed for max_bytes decoded ones, with room for line breaks
+    if transfer_encoding == "base64":
+        limit = max_bytes * 3 // 2 + 4
+    elif transfer_encoding == "quoted-printable":
+        limit = max_bytes * 3
+    else:
+        limit = max_bytes
+
+    truncated = end - start > limit
+    decoded = decode_partial(raw[start:min(end, start + limit)], transfer_encoding)
+    if len(decoded) > max_bytes:
+        decoded = decoded[:max_bytes]
+        truncated = True
+    return decode_text(decoded, headers.get_content_charset(), final=not truncated), truncated
+
+
+def _decoded_size(raw: bytes, start: int, end: int, transfer_encoding: Optional[str]) -> int:
+    """Payload size after base64 decoding, or the raw size for other encodings"""
+    if (transfer_encoding or "").strip().lower() != "base64":
+        return end - start
+    length = end - start - sum(raw.count(char, start, end) for char in (b"\r", b"\n", b" ", b"\t"))
+    tail = raw[max(start, end - 8):end].rstrip()
+    padding = len(tail) - len(tail.rstrip(b"="))
+    return max(length * 3 // 4 - padding, 0)
+
+
+def _filename(headers: Message) -> Optional[str]:
+    """Attachment filename, with RFC 2231 and encoded-word forms decoded"""
+    filename = headers.get_filename()
+    if filename is None:
+        return None
+    try:
+        return str(make_header(decode_header(filename)))
+    except (LookupError, UnicodeDecodeError, ValueError):
+        return filename
@@ -0,0 +1,327 @@
+"""Pipelined fetch, parse and analysis of a folder
+
+Three stages run at the same time:
+
+- fetch: downloads raw messages chunk by chunk on its own thread
+- parse: MIME-parses and analyzes each chunk on a worker pool
+- emit: yields the results to the caller in folder order
+
+The stages are joined by bounded queues, so the network keeps fetching
+while earlier chunks are parsed. When the caller falls behind, parsing
+pauses and then fetching pauses, so no more than about
+2 * queue_size + 2 chunks are held at once.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import logging
+
+from ..models.email_models import EmailAnalysis, EmailConfig
+from ..models.records import MessageRecord
+from .batch_service import _get_worker_service
+from .email_service import EmailService
+from .imap_utils import FetchResponse
+from .scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch", "parse", "emit")
+QUEUES = ("fetched", "parsed")
+
+# Seconds between checks for a cancelled run while a stage waits on a queue
+POLL_INTERVAL = 0.1
+
+PipelineResult = Tuple[MessageRecord, Optional[EmailAnalysis]]
+
+
+@dataclass
+class StageStats:
+    """Work done by one stage
+
+    `busy_seconds` is time spent working and `blocked_seconds` time spent
+    waiting for input or for room in the next queue.
+    """
+    items: int = 0
+    chunks: int = 0
+    bytes: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+
+@dataclass
+class QueueStats:
+    """Occupancy of the queue between two stages, in chunks"""
+    capacity: int = 0
+    depth: int = 0
+    depth_max: int = 0
+
+
+class PipelineStats:
+    """Stage throughput and queue depths, accumulated over pipeline runs"""
+
+    def __init__(self):
+        self.runs = 0
+        self.stages = {name: StageStats() for name in STAGES}
+        self.queues = {name: QueueStats() for name in QUEUES}
+        self._lock = threading.Lock()
+
+    def start_run(self) -> None:
+        with self._lock:
+            self.runs += 1
+
+    def record(
+        self,
+        stage: str,
+        items: int = 0,
+        chunks: int = 0,
+        size: int = 0,
+        busy: float = 0.0,
+        blocked: float = 0.0
+    ) -> None:
+        with self._lock:
+            stats = self.stages[stage]
+            stats.items += items
+            stats.chunks += chunks
+            stats.bytes += size
+            stats.busy_seconds += busy
+            stats.blocked_seconds += blocked
+
+    def record_depth(self, name: str, depth: int, capacity: int) -> None:
+        with self._lock:
+            stats = self.queues[name]
+            stats.capacity = capacity
+            stats.depth = depth
+            stats.depth_max = max(stats.depth_max, depth)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage counts and items per busy second, and per-queue depths"""
+        with self._lock:
+            stages = {}
+            for name, stage in self.stages.items():
+                stages[name] = dict(vars(stage))
+                stages[name]["items_per_second"] = stage.items / stage.busy_seconds if stage.busy_seconds else 0.0
+            return {
+                "runs": self.runs,
+                "stages": stages,
+                "queues": {name: dict(vars(q)) for name, q in self.queues.items()},
+            }
+
+
+class _Failed:
+    """Error raised by an upstream stage, passed down in place of a chunk"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_DONE = object()
+
+
+def _process_chunk(
+    config: EmailConfig,
+    folder: str,
+    entries: List[Union[MessageRecord, FetchResponse]],
+    analyze: bool
+) -> Tuple[List[Tuple[MessageRecord, Optional[EmailAnalysis], bool]], float]:
+    """Parse and analyze one fetched chunk inside a worker
+
+    Returns (message, analysis, newly parsed) per entry and the seconds
+    spent.
+    """
+    started = time.perf_counter()
+    parser = EmailService(config, password="")
+    ai_service = _get_worker_service() if analyze else None
+    results = []
+    for entry in entries:
+        parsed = isinstance(entry, FetchResponse)
+        message = parser._parse_fetch_response(entry, folder) if parsed else entry
+        results.append((message, ai_service.analyze_email(message) if analyze else None, parsed))
+    return results, time.perf_counter() - started
+
+
+class FetchPipeline:
+    """Fetches, parses and analyzes a folder with the stages overlapping
+
+    `executor` runs the parse stage; a process pool keeps parsing and
+    analysis off the GIL. Newly parsed messages are added to the
+    service's message store, if it has one. With schedulers, each chunk
+    is downloaded in a fetch slot and parsed in an analysis slot of
+    `account`.
+    """
+
+    def __init__(
+        self,
+        service: EmailService,
+        executor: Executor,
+        stats: Optional[PipelineStats] = None,
+        queue_size: int = 4,
+        account: str = "",
+        fetch_scheduler: Optional[FairScheduler] = None,
+        analysis_scheduler: Optional[FairScheduler] = None
+    ):
+        self.service = service
+        self.executor = executor
+        self.stats = stats or PipelineStats()
+        self.queue_size = queue_size
+        self.account = account
+        self.fetch_scheduler = fetch_scheduler
+        self.analysis_scheduler = analysis_scheduler
+
+    def run(
+        self,
+        folder: str = "INBOX",
+        limit: int = 50,
+        unread_only: bool = False,
+        analyze: bool = True
+    ) -> Iterator[PipelineResult]:
+        """Yield (message, analysis) pairs in the same order as fetch_emails
+
+        The analysis is None when `analyze` is False. Closing the iterator
+        early stops the other stages.
+        """
+        fetched: queue.Queue = queue.Queue(self.queue_size)
+        parsed: queue.Queue = queue.Queue(self.queue_size)
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._fetch, args=(fetched, stop, folder, limit, unread_only), daemon=True),
+            threading.Thread(target=self._parse, args=(fetched, parsed, stop, folder, analyze), daemon=True),
+        ]
+        self.stats.start_run()
+        for thread in threads:
+            thread.start()
+        try:
+            yield from self._emit(parsed, stop, folder)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            # Chunks still queued when the caller stopped early are not needed
+            while not parsed.empty():
+                pending = parsed.get_nowait()
+                if hasattr(pending, "cancel"):
+                    pending.cancel()
+
+    def _put(self, target: queue.Queue, name: str, item: Any, stop: threading.Event) -> float:
+        """Put an item on a bounded queue, returning the seconds spent waiting for room"""
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=POLL_INTERVAL)
+            except queue.Full:
+                continue
+            self.stats.record_depth(name, target.qsize(), target.maxsize)
+            break
+        return time.perf_counter() - started
+
+    def _get(self, source: queue.Queue, name: str, stop: threading.Event) -> Tuple[Any, float]:
+        """Take an item from a queue, returning it and the seconds spent waiting"""
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                item = source.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            self.stats.record_depth(name, source.qsize(), source.maxsize)
+            return item, time.perf_counter() - started
+        return _DONE, time.perf_counter() - started
+
+    def _acquire(self, scheduler: Optional[FairScheduler], stop: threading.Event) -> bool:
+        """Wait for a slot of the account; False if the run stopped first"""
+        if scheduler is None:
+            return True
+        while not stop.is_set():
+            if scheduler.acquire(self.account, timeout=POLL_INTERVAL):
+                return True
+        return False
+
+    def _release(self, scheduler: Optional[FairScheduler]) -> None:
+        if scheduler is not None:
+            scheduler.release(self.account)
+
+    def _fetch(
+        self,
+        fetched: queue.Queue,
+        stop: threading.Event,
+        folder: str,
+        limit: int,
+        unread_only: bool
+    ) -> None:
+        """Fetch stage: download chunks until done, stopped or failed"""
+        chunks = self.service.iter_fetched_chunks(folder, limit, unread_only)
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                if not self._acquire(self.fetch_scheduler, stop):
+                    break
+                granted = time.perf_counter()
+                try:
+                    chunk = next(chunks, None)
+                finally:
+                    self._release(self.fetch_scheduler)
+                busy = time.perf_counter() - granted
+                if chunk is None:
+                    break
+                size = sum(len(e.literal("BODY[]")) for e in chunk if isinstance(e, FetchResponse))
+                blocked = granted - started + self._put(fetched, "fetched", chunk, stop)
+                self.stats.record("fetch", len(chunk), 1, size, busy, blocked)
+        except Exception as e:
+            self._put(fetched, "fetched", _Failed(e), stop)
+            return
+        finally:
+            chunks.close()
+        self._put(fetched, "fetched", _DONE, stop)
+
+    def _parse(
+        self,
+        fetched: queue.Queue,
+        parsed: queue.Queue,
+        stop: threading.Event,
+        folder: str,
+        analyze: bool
+    ) -> None:
+        """Parse stage: hand each chunk to the worker pool, in order"""
+        config = self.service.config
+        while True:
+            chunk, waited = self._get(fetched, "fetched", stop)
+            if chunk is _DONE or isinstance(chunk, _Failed):
+                self._put(parsed, "parsed", chunk, stop)
+                return
+            started = time.perf_counter()
+            if not self._acquire(self.analysis_scheduler, stop):
+                return
+            waited += time.perf_counter() - started
+            try:
+                future = self.executor.submit(_process_chunk, config, folder, chunk, analyze)
+            except Exception as e:
+                self._release(self.analysis_scheduler)
+                self._put(parsed, "parsed", _Failed(e), stop)
+                return
+            # The slot is held until the worker is done with the chunk
+            future.add_done_callback(lambda _: self._release(self.analysis_scheduler))
+            blocked = self._put(parsed, "parsed", future, stop)
+            self.stats.record("parse", blocked=waited + blocked)
+
+    def _emit(self, parsed: queue.Queue, stop: threading.Event, folder: str) -> Iterator[PipelineResult]:
+        """Emit stage: wait for each chunk's results and yield them"""
+        store = self.service.message_store
+        while True:
+            started = time.perf_counter()
+            future, _ = self._get(parsed, "parsed", stop)
+            if future is _DONE:
+                return
+            if isinstance(future, _Failed):
+                raise future.error
+            results, worker_seconds = future.result()
+            ready = time.perf_counter()
+            self.stats.record("parse", len(results), 1, busy=worker_seconds)
+
+            uidvalidity = self.service.selected_uidvalidity
+            new = [message for message, _, was_parsed in results if was_parsed]
+            if store is not None and uidvalidity is not None and new:
+                store.put_many(self.service.account, folder, uidvalidity, new)
+            self.stats.record("emit", len(results), 1, busy=time.perf_counter() - ready, blocked=ready - started)
+            for message, analysis, _ in results:
+                yield message, analysis
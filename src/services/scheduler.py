@@ -0,0 +1,159 @@
+"""Fair sharing of fetch and analysis capacity between accounts"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Waiter:
+    """A pending request for a slot"""
+
+    __slots__ = ("account", "granted", "notify", "queued_at")
+
+    def __init__(self, account: str, notify: Callable[[], None]):
+        self.account = account
+        self.granted = False
+        self.notify = notify
+        self.queued_at = time.perf_counter()
+
+
+class FairScheduler:
+    """Hands out a fixed number of work slots to accounts in turn
+
+    Accounts waiting for a slot are served round-robin, one slot per turn,
+    so an account with a large backlog alternates with the others instead
+    of queueing ahead of them. No account holds more than its own limit
+    at once, even when slots are free. Slots can be taken from threads
+    with slot() and from the event loop with async_slot().
+    """
+
+    def __init__(self, capacity: int, limits: Optional[Dict[str, int]] = None, default_limit: Optional[int] = None):
+        """Initialize a scheduler with `capacity` slots shared by all accounts"""
+        self.capacity = capacity
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit or capacity
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._running: Dict[str, int] = {}
+        # Accounts with waiters, in the order they get their next turn
+        self._waiting: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _limit(self, account: str) -> int:
+        return min(self.limits.get(account, self.default_limit), self.capacity)
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._lock:
+            self._waiting.setdefault(waiter.account, deque()).append(waiter)
+            self._grant()
+
+    def _grant(self) -> None:
+        """Give free slots to waiting accounts in turn; called with the lock held"""
+        while self._in_use < self.capacity:
+            account = next(
+                (a for a in self._waiting if self._running.get(a, 0) < self._limit(a)),
+                None
+            )
+            if account is None:
+                return
+            waiters = self._waiting[account]
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(account)
+            else:
+                del self._waiting[account]
+
+            self._in_use += 1
+            self._running[account] = self._running.get(account, 0) + 1
+            stats = self._stats.setdefault(account, {"granted": 0, "wait_seconds_total": 0.0})
+            stats["granted"] += 1
+            stats["wait_seconds_total"] += time.perf_counter() - waiter.queued_at
+            waiter.granted = True
+            waiter.notify()
+
+    def _withdraw(self, waiter: _Waiter) -> None:
+        """Give up a request that timed out or was cancelled, releasing its slot if granted meanwhile"""
+        with self._lock:
+            if not waiter.granted:
+                waiters = self._waiting.get(waiter.account)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiting[waiter.account]
+                return
+        self.release(waiter.account)
+
+    def acquire(self, account: str, timeout: Optional[float] = None) -> bool:
+        """Wait for a slot for an account; False if `timeout` passed first"""
+        event = threading.Event()
+        waiter = _Waiter(account, event.set)
+        self._enqueue(waiter)
+        if event.wait(timeout):
+            return True
+        self._withdraw(waiter)
+        return False
+
+    async def acquire_async(self, account: str) -> None:
+        """Wait for a slot for an account without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify() -> None:
+            # Slots are granted from whichever thread releases one
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = _Waiter(account, notify)
+        self._enqueue(waiter)
+        try:
+            await future
+        except BaseException:
+            self._withdraw(waiter)
+            raise
+
+    def release(self, account: str) -> None:
+        """Return a slot and hand it to the next account in turn"""
+        with self._lock:
+            self._in_use -= 1
+            self._running[account] -= 1
+            self._grant()
+
+    @contextmanager
+    def slot(self, account: str):
+        """Hold a slot for an account for the duration of a block"""
+        self.acquire(account)
+        try:
+            yield
+        finally:
+            self.release(account)
+
+    @asynccontextmanager
+    async def async_slot(self, account: str):
+        """Hold a slot for an account for the duration of an async block"""
+        await self.acquire_async(account)
+        try:
+            yield
+        finally:
+            self.release(account)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Running, waiting and granted slots and total wait per account"""
+        with self._lock:
+            accounts = set(self._stats) | set(self._waiting) | set(self._running)
+            return {
+                account: {
+                    "running": self._running.get(account, 0),
+                    "waiting": len(self._waiting.get(account, ())),
+                    "limit": self._limit(account),
+                    **self._stats.get(account, {"granted": 0, "wait_seconds_total": 0.0}),
+                }
+                for account in sorted(accounts)
+            }
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
@@ -0,0 +1,376 @@
+"""Persisted full-text index over fetched mail"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+import logging
+
+from ..models.email_models import EmailClassification, SearchHit
+from ..models.records import MessageRecord
+from .ai_service import AIEmailService, PriorityInputs
+
+logger = logging.getLogger(__name__)
+
+# Fields that can be searched on their own, e.g. `subject:invoice`
+SEARCH_FIELDS = ("subject", "body", "sender", "tags", "category")
+
+# Relevance weight of each field, in SEARCH_FIELDS order
+FIELD_WEIGHTS = (5.0, 1.0, 3.0, 2.0, 2.0)
+
+OPERATORS = ("AND", "OR", "NOT")
+
+# Priority from the stored inputs, as AIEmailService.priority_level; the
+# parameter is the earliest date that still counts as recent
+PRIORITY_SQL = (
+    "CASE WHEN d.urgent_count >= 2 OR (d.urgent_count >= 1 AND d.date >= ?) THEN 'high' "
+    "WHEN d.is_reply OR d.urgent_count = 1 THEN 'medium' ELSE 'low' END"
+)
+
+
+def utc_date(date: datetime) -> str:
+    """Format a date in UTC with a fixed width, so stored dates sort as text
+
+    Dates without an offset are taken as local time, as they are when
+    priority recency is checked.
+    """
+    return date.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def recent_cutoff() -> str:
+    """Earliest stored date that still counts as recent for priority"""
+    return utc_date(datetime.now(timezone.utc) - timedelta(seconds=AIEmailService.RECENT_SECONDS))
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for search queries that cannot be parsed"""
+
+
+def _tokenize(query: str) -> List[str]:
+    """Split a query into words, quoted phrases and parentheses"""
+    tokens = []
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char.isspace():
+            i += 1
+        elif char in "()":
+            tokens.append(char)
+            i += 1
+        elif char == '"':
+            end = query.find('"', i + 1)
+            if end == -1:
+                raise QuerySyntaxError("Unterminated phrase")
+            tokens.append(query[i:end + 1])
+            i = end + 1
+        else:
+            end = i
+            while end < len(query) and not query[end].isspace() and query[end] not in '()"':
+                end += 1
+            # Keep `field:"a phrase"` together
+            if query[end - 1] == ":" and end < len(query) and query[end] == '"':
+                close = query.find('"', end + 1)
+                if close == -1:
+                    raise QuerySyntaxError("Unterminated phrase")
+                end = close + 1
+            tokens.append(query[i:end])
+            i = end
+    return tokens
+
+
+def _term(token: str) -> str:
+    """Translate a word or phrase into a quoted FTS5 string"""
+    prefix = token.endswith("*") and not token.startswith('"')
+    text = token[:-1] if prefix else token
+    if text.startswith('"'):
+        text = text[1:-1]
+    if not text.strip():
+        raise QuerySyntaxError("Empty search term")
+    quoted = '"' + text.replace('"', '""') + '"'
+    return quoted + " *" if prefix else quoted
+
+
+def parse_query(query: str) -> str:
+    """Translate a user query into an FTS5 MATCH expression
+
+    Supports words, "quoted phrases", prefix* matches, AND / OR / NOT,
+    -negation, parentheses and field filters such as `subject:invoice`.
+    Adjacent terms must all match.
+    """
+    parts: List[str] = []
+    operand_before = False
+
+    for token in _tokenize(query):
+        negate = False
+        if token in OPERATORS:
+            if token == "NOT" and parts and parts[-1] == "AND":
+                parts.pop()
+            elif not operand_before:
+                raise QuerySyntaxError(f"{token} needs a term before it")
+            parts.append(token)
+            operand_before = False
+            continue
+        if token == ")":
+            parts.append(token)
+            operand_before = True
+            continue
+        if token.startswith("-") and len(token) > 1:
+            if not operand_before:
+                raise QuerySyntaxError("Negated terms need a term before them")
+            negate = True
+            token = token[1:]
+
+        if operand_before:
+            parts.append("NOT" if negate else "AND")
+        if token == "(":
+            parts.append(token)
+            operand_before = False
+            continue
+
+        field, separator, value = token.partition(":")
+        if separator and field.lower() in SEARCH_FIELDS and value:
+            parts.append(f"{field.lower()} : {_term(value)}")
+        else:
+            parts.append(_term(token))
+        operand_before = True
+
+    if not parts:
+        raise QuerySyntaxError("Empty query")
+    if not operand_before:
+        raise QuerySyntaxError("Query ends with an operator")
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """SQLite FTS5 inverted index of messages with their classification
+
+    Documents are keyed by account, folder and UID, so indexing a message
+    again replaces its entry. Indexing a folder under a new UIDVALIDITY
+    drops the folder's older documents. Priority depends on how recent a
+    message is, so documents keep its inputs and priority is derived when
+    searching.
+    """
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the index database"""
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(documents)")]
+        if columns and "urgent_count" not in columns:
+            # Indexes that froze priority are dropped; messages are indexed again as they are fetched
+            logger.info("Rebuilding search index without stored priorities")
+            self._connection.executescript(
+                "DROP TABLE documents; DROP TABLE documents_text; DROP TABLE IF EXISTS folders;"
+            )
+        self._connection.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS folders (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uidvalidity INTEGER NOT NULL,
+                PRIMARY KEY (account, folder)
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uid INTEGER NOT NULL,
+                uidvalidity INTEGER,
+                date TEXT,
+                category TEXT,
+                urgent_count INTEGER NOT NULL,
+                is_reply INTEGER NOT NULL,
+                UNIQUE (account, folder, uid)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_text USING fts5(
+                {", ".join(SEARCH_FIELDS)},
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        self._connection.commit()
+
+    def add_many(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: Optional[int],
+        emails: Sequence[MessageRecord],
+        classifications: Sequence[EmailClassification],
+        priority_inputs: Sequence[PriorityInputs]
+    ) -> int:
+        """Index messages that have a UID, replacing earlier entries"""
+        indexed = 0
+        with self._lock, self._connection:
+            if uidvalidity is not None:
+                self._check_uidvalidity(account, folder, uidvalidity)
+
+            for email, classification, inputs in zip(emails, classifications, priority_inputs):
+                if email.uid is None:
+                    continue
+                row = self._connection.execute(
+                    "SELECT id FROM documents WHERE account = ? AND folder = ? AND uid = ?",
+                    (account, folder, int(email.uid))
+                ).fetchone()
+                if row is not None:
+                    self._delete_ids([row[0]])
+                cursor = self._connection.execute(
+                    "INSERT INTO documents (account, folder, uid, uidvalidity, date, category, urgent_count, is_reply) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        account, folder, int(email.uid), uidvalidity, utc_date(email.date),
+                        classification.category, inputs.urgent_count, int(inputs.is_reply)
+                    )
+                )
+                sender = f"{email.sender.name or ''} {email.sender.email}".strip()
+                self._connection.execute(
+                    "INSERT INTO documents_text (rowid, subject, body, sender, tags, category) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        cursor.lastrowid, email.subject, email.body, sender,
+                        " ".join(classification.tags), classification.category
+                    )
+                )
+                indexed += 1
+        return indexed
+
+    def _check_uidvalidity(self, account: str, folder: str, uidvalidity: int) -> None:
+        """Record a folder's UIDVALIDITY, dropping its documents if it changed"""
+        row = self._connection.execute(
+            "SELECT uidvalidity FROM folders WHERE account = ? AND folder = ?",
+            (account, folder)
+        ).fetchone()
+        if row is not None and row[0] == uidvalidity:
+            return
+        if row is not None:
+            removed = [
+                r[0] for r in self._connection.execute(
+                    "SELECT id FROM documents WHERE account = ? AND folder = ?",
+                    (account, folder)
+                )
+            ]
+            logger.info(f"UIDVALIDITY of {folder} changed, dropping {len(removed)} indexed messages")
+            self._delete_ids(removed)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO folders VALUES (?, ?, ?)",
+            (account, folder, uidvalidity)
+        )
+
+    def _delete_ids(self, ids: List[int]) -> None:
+        """Remove documents; caller holds the lock inside a transaction"""
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            self._connection.execute(f"DELETE FROM documents_text WHERE rowid IN ({placeholders})", batch)
+            self._connection.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", batch)
+
+    def new_emails(
+        self,
+        account: str,
+        folder: str,
+        uidvalidity: Optional[int],
+        emails: Sequence[MessageRecord]
+    ) -> List[MessageRecord]:
+        """Filter emails down to those with a UID that are not indexed yet
+
+        Messages indexed under another UIDVALIDITY count as not indexed.
+        """
+        emails = [email for email in emails if email.uid is not None]
+        indexed = set()
+        with self._lock:
+            for start in range(0, len(emails), 500):
+                batch = [int(email.uid) for email in emails[start:start + 500]]
+                placeholders = ",".join("?" * len(batch))
+                indexed.update(
+                    str(row[0]) for row in self._connection.execute(
+                        f"SELECT uid FROM documents WHERE account = ? AND folder = ? "
+                        f"AND uidvalidity IS ? AND uid IN ({placeholders})",
+                        (account, folder, uidvalidity, *batch)
+                    )
+                )
+        return [email for email in emails if email.uid not in indexed]
+
+    def delete(self, account: str, folder: str, uids: Sequence[str]) -> None:
+        """Remove messages, e.g. after they were expunged"""
+        with self._lock, self._connection:
+            ids = [
+                row[0] for uid in uids
+                for row in self._connection.execute(
+                    "SELECT id FROM documents WHERE account = ? AND folder = ? AND uid = ?",
+                    (account, folder, int(uid))
+                )
+            ]
+            self._delete_ids(ids)
+
+    def search(
+        self,
+        query: str,
+        account: Optional[str] = None,
+        folder: Optional[str] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        order: str = "relevance",
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[SearchHit]:
+        """Find messages matching a query, best matches (or newest) first
+
+        Raises QuerySyntaxError for malformed queries.
+        """
+        cutoff = recent_cutoff()
+        conditions = ["documents_text MATCH ?"]
+        params: list = [cutoff, parse_query(query)]
+        for column, value in (("account", account), ("folder", folder), ("category", category)):
+            if value is not None:
+                conditions.append(f"d.{column} = ?")
+                params.append(value)
+        if priority is not None:
+            conditions.append(f"{PRIORITY_SQL} = ?")
+            params += [cutoff, priority]
+
+        score = f"bm25(documents_text, {', '.join(map(str, FIELD_WEIGHTS))})"
+        order_by = "d.date DESC" if order == "date" else score
+        sql = (
+            f"SELECT d.uid, d.folder, d.date, d.category, {PRIORITY_SQL}, "
+            f"documents_text.subject, documents_text.sender, documents_text.tags, "
+            f"snippet(documents_text, 1, '[', ']', '...', 12), {score} "
+            f"FROM documents_text JOIN documents d ON d.id = documents_text.rowid "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {order_by} LIMIT ? OFFSET ?"
+        )
+        params += [limit, offset]
+
+        try:
+            with self._lock:
+                rows = self._connection.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise QuerySyntaxError(str(e)) from e
+
+        return [
+            SearchHit(
+                uid=str(uid),
+                folder=folder_name,
+                date=date,
+                category=category_name,
+                priority=priority_name,
+                subject=subject,
+                sender=sender,
+                tags=tags.split(),
+                snippet=snippet,
+                score=-rank
+            )
+            for uid, folder_name, date, category_name, priority_name, subject, sender, tags, snippet, rank in rows
+        ]
+
+    def count(self) -> int:
+        """Number of indexed messages"""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._connection.close()
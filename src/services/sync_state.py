@@ -0,0 +1,133 @@
+"""Persisted per-folder mailbox sync state"""
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncState:
+    """Where the last sync of an account's folder stopped"""
+    account: str
+    folder: str
+    uidvalidity: int
+    highest_uid: int = 0
+    highest_modseq: Optional[int] = None
+
+
+class SyncStateStore:
+    """SQLite-backed store of SyncState records keyed by account and folder
+
+    For servers without CONDSTORE it also keeps the read and starred state
+    of each message seen, so a sync can tell which of them changed.
+    """
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the sync state database"""
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uidvalidity INTEGER NOT NULL,
+                highest_uid INTEGER NOT NULL,
+                highest_modseq INTEGER,
+                PRIMARY KEY (account, folder)
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS flag_state (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uid INTEGER NOT NULL,
+                state INTEGER NOT NULL,
+                PRIMARY KEY (account, folder, uid)
+            ) WITHOUT ROWID
+            """
+        )
+        self._connection.commit()
+
+    def get(self, account: str, folder: str) -> Optional[SyncState]:
+        """Get the saved state of a folder, if any"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT uidvalidity, highest_uid, highest_modseq FROM sync_state "
+                "WHERE account = ? AND folder = ?",
+                (account, folder)
+            ).fetchone()
+        if row is None:
+            return None
+        return SyncState(account, folder, row[0], row[1], row[2])
+
+    def save(self, state: SyncState) -> None:
+        """Save the state of a folder"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                (state.account, state.folder, state.uidvalidity, state.highest_uid, state.highest_modseq)
+            )
+            self._connection.commit()
+
+    def delete(self, account: str, folder: str) -> None:
+        """Forget the state of a folder so the next sync starts over"""
+        with self._lock:
+            for table in ("sync_state", "flag_state"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE account = ? AND folder = ?",
+                    (account, folder)
+                )
+            self._connection.commit()
+
+    def get_flags(self, account: str, folder: str) -> Dict[str, int]:
+        """Get the saved flag state of a folder's messages by UID"""
+        with self._lock:
+            return {
+                str(uid): state for uid, state in self._connection.execute(
+                    "SELECT uid, state FROM flag_state WHERE account = ? AND folder = ?",
+                    (account, folder)
+                )
+            }
+
+    def update_flags(
+        self,
+        account: str,
+        folder: str,
+        states: Dict[str, int],
+        removed: Iterable[str] = ()
+    ) -> None:
+        """Save the flag state of some messages and forget others"""
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO flag_state VALUES (?, ?, ?, ?)",
+                [(account, folder, int(uid), state) for uid, state in states.items()]
+            )
+            self._connection.executemany(
+                "DELETE FROM flag_state WHERE account = ? AND folder = ? AND uid = ?",
+                [(account, folder, int(uid)) for uid in removed]
+            )
+            self._connection.commit()
+
+    def clear_flags(self, account: str, folder: str) -> None:
+        """Forget the flag state of a folder, e.g. after its UIDVALIDITY changed"""
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM flag_state WHERE account = ? AND folder = ?",
+                (account, folder)
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._connection.close()
@@ -1,6 +1,7 @@
 """Configuration management utilities"""
 import os
-from typing import Optional
+import re
+from typing import List, Optional
 from dotenv import load_dotenv
 
 from ..models.email_models import EmailConfig
@@ -9,21 +10,154 @@ from ..models.email_models import EmailConfig
 load_dotenv()
 
 
-def get_email_config() -> EmailConfig:
-    """Get email configuration from environment variables"""
+# Name of the account configured by EMAIL_ADDRESS and EMAIL_PASSWORD
+DEFAULT_ACCOUNT = "default"
+
+
+def get_account_names() -> List[str]:
+    """Get names of the configured accounts: "default" if EMAIL_ADDRESS is set, then ACCOUNTS"""
+    names = [DEFAULT_ACCOUNT] if os.getenv("EMAIL_ADDRESS") else []
+    for name in os.getenv("ACCOUNTS", "").split(","):
+        if name.strip() and name.strip() not in names:
+            names.append(name.strip())
+    return names
+
+
+def _account_setting(account: str, key: str, default: str = "", inherit: bool = True) -> str:
+    """Get ACCOUNT_<NAME>_<KEY> for a named account, falling back to <KEY> if inherit is set"""
+    if account == DEFAULT_ACCOUNT:
+        return os.getenv(key, default)
+    fallback = os.getenv(key, default) if inherit else default
+    return os.getenv(f"ACCOUNT_{re.sub(r'[^A-Z0-9]', '_', account.upper())}_{key}", fallback)
+
+
+def get_email_config(account: str = DEFAULT_ACCOUNT) -> EmailConfig:
+    """Get email configuration of an account from environment variables"""
     return EmailConfig(
-        email_address=os.getenv("EMAIL_ADDRESS", ""),
-        imap_server=os.getenv("IMAP_SERVER", "imap.gmail.com"),
-        smtp_server=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
-        imap_port=int(os.getenv("IMAP_PORT", "993")),
-        smtp_port=int(os.getenv("SMTP_PORT", "587")),
-        use_ssl=os.getenv("USE_SSL", "true").lower() == "true"
+        email_address=_account_setting(account, "EMAIL_ADDRESS", inherit=False),
+        imap_server=_account_setting(account, "IMAP_SERVER", "imap.gmail.com"),
+        smtp_server=_account_setting(account, "SMTP_SERVER", "smtp.gmail.com"),
+        imap_port=int(_account_setting(account, "IMAP_PORT", "993")),
+        smtp_port=int(_account_setting(account, "SMTP_PORT", "587")),
+        use_ssl=_account_setting(account, "USE_SSL", "true").lower() == "true",
+        smtp_starttls=_account_setting(account, "SMTP_STARTTLS", "true").lower() == "true",
+        fetch_chunk_size=int(_account_setting(account, "FETCH_CHUNK_SIZE", "200")),
+        imap_timeout=float(_account_setting(account, "IMAP_TIMEOUT", "30")),
+        max_body_bytes=int(_account_setting(account, "MAX_BODY_BYTES", "1000000"))
     )
 
 
-def get_email_password() -> str:
-    """Get email password from environment variables"""
-    return os.getenv("EMAIL_PASSWORD", "")
+def get_email_password(account: str = DEFAULT_ACCOUNT) -> str:
+    """Get email password of an account from environment variables"""
+    return _account_setting(account, "EMAIL_PASSWORD", inherit=False)
+
+
+def get_account_max_concurrency(account: str = DEFAULT_ACCOUNT) -> int:
+    """Get how many fetch or analysis slots one account may hold at once"""
+    return int(_account_setting(account, "MAX_CONCURRENCY", "4"))
+
+
+def get_fetch_slots() -> int:
+    """Get number of mailbox operations run at once across all accounts"""
+    return int(os.getenv("FETCH_SLOTS", "8"))
+
+
+def get_analysis_slots() -> int:
+    """Get number of analysis chunks run at once across all accounts"""
+    return int(os.getenv("ANALYSIS_SLOTS", "") or os.getenv("BATCH_WORKERS", "") or os.cpu_count() or 1)
+
+
+def get_batch_workers() -> Optional[int]:
+    """Get number of worker processes for batch analysis (None uses CPU count)"""
+    workers = os.getenv("BATCH_WORKERS")
+    return int(workers) if workers else None
+
+
+def get_batch_chunk_size() -> int:
+    """Get default number of emails sent to a worker process at a time"""
+    return int(os.getenv("BATCH_CHUNK_SIZE", "100"))
+
+
+def get_pipeline_queue_size() -> int:
+    """Get number of fetched chunks buffered between fetch pipeline stages"""
+    return int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+
+def get_pool_size() -> int:
+    """Get maximum number of pooled connections per mail server"""
+    return int(os.getenv("POOL_SIZE", "4"))
+
+
+def get_pool_idle_timeout() -> float:
+    """Get seconds after which idle pooled connections are closed"""
+    return float(os.getenv("POOL_IDLE_TIMEOUT", "300"))
+
+
+def get_sync_state_path() -> str:
+    """Get path of the database holding mailbox sync state"""
+    return os.getenv("SYNC_STATE_PATH", "data/sync_state.db")
+
+
+def get_message_store_path() -> Optional[str]:
+    """Get path of the local message store; empty disables it"""
+    return os.getenv("MESSAGE_STORE_PATH", "data/messages.db") or None
+
+
+def get_search_index_path() -> Optional[str]:
+    """Get path of the full-text search index; empty disables it"""
+    return os.getenv("SEARCH_INDEX_PATH", "data/search_index.db") or None
+
+
+def get_summary_path() -> Optional[str]:
+    """Get path of the mailbox triage summary; empty disables it"""
+    return os.getenv("SUMMARY_PATH", "data/summary.db") or None
+
+
+def get_analysis_cache_size() -> int:
+    """Get number of analysis results kept in memory; 0 disables the cache"""
+    return int(os.getenv("ANALYSIS_CACHE_SIZE", "10000"))
+
+
+def get_analysis_cache_ttl() -> Optional[float]:
+    """Get seconds analysis results stay cached; empty keeps them until evicted"""
+    value = os.getenv("ANALYSIS_CACHE_TTL", "")
+    return float(value) if value else None
+
+
+def get_analysis_cache_path() -> Optional[str]:
+    """Get path of the on-disk analysis cache tier; empty keeps it in memory only"""
+    return os.getenv("ANALYSIS_CACHE_PATH", "") or None
+
+
+def get_analysis_cache_disk_size() -> int:
+    """Get number of analysis results kept in the on-disk tier"""
+    return int(os.getenv("ANALYSIS_CACHE_DISK_SIZE", "100000"))
+
+
+def get_watch_folders(account: str = DEFAULT_ACCOUNT) -> List[str]:
+    """Get folders of an account watched over IMAP IDLE for new mail; empty disables the watcher"""
+    folders = _account_setting(account, "WATCH_FOLDERS")
+    return [folder.strip() for folder in folders.split(",") if folder.strip()]
+
+
+def get_idle_timeout() -> float:
+    """Get seconds after which an IMAP IDLE is renewed"""
+    return float(os.getenv("IDLE_TIMEOUT", "1500"))
+
+
+def get_metrics_enabled() -> bool:
+    """Get whether stage timings and counters are recorded and served on /metrics"""
+    return os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+
+def get_admin_token() -> Optional[str]:
+    """Get token required by admin endpoints such as profiling; empty disables them"""
+    return os.getenv("ADMIN_TOKEN", "") or None
+
+
+def get_profile_dir() -> str:
+    """Get directory where request profiles are written"""
+    return os.getenv("PROFILE_DIR", "data/profiles")
 
 
 def get_api_key(service: str) -> Optional[str]:
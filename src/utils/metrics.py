@@ -0,0 +1,181 @@
+"""Per-stage latency histograms and counters in the Prometheus text format
+
+Services time their stages with `metrics.time("stage")` or the
+`metrics.timed("stage")` decorator and count what they process with
+`metrics.count`. Both are a flag check when metrics are disabled.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .config import get_metrics_enabled
+
+PREFIX = "email_assistant"
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Stats keys that are current values rather than running totals
+GAUGE_STATS = {
+    "size", "idle", "in_use", "max_size", "max_entries", "folders", "subscribers",
+    "capacity", "depth", "depth_max", "items_per_second", "running", "waiting", "limit",
+    "hit_rate", "reuse_rate", "wait_seconds_avg", "wait_seconds_max"
+}
+
+_NULL_TIMER = nullcontext()
+
+
+class _Histogram:
+    """Cumulative-bucket histogram of observed values"""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class _StageTimer:
+    """Context manager that observes its own duration"""
+
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Registry of stage latency histograms and processing counters"""
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._stages: Dict[str, _Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def time(self, stage: str):
+        """Context manager timing one run of a stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of a function as a stage"""
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration of a stage"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+
+    def count(self, name: str, stage: str, value: float = 1) -> None:
+        """Add to a counter such as messages or bytes processed by a stage"""
+        if not self.enabled:
+            return
+        key = (name, stage)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        """Drop all recorded values"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def stage_counts(self) -> Dict[str, int]:
+        """Number of observations per stage"""
+        with self._lock:
+            return {stage: sum(h.counts) for stage, h in self._stages.items()}
+
+    def render(self, stats: Iterable[Tuple[str, Dict[str, str], Dict[str, Any]]] = ()) -> str:
+        """Render everything in the Prometheus text exposition format
+
+        `stats` adds component statistics such as pool or cache stats(), as
+        (component, labels, stats) entries.
+        """
+        with self._lock:
+            stages = {stage: (list(h.counts), h.sum) for stage, h in self._stages.items()}
+            counters = dict(self._counters)
+
+        lines: List[str] = []
+        name = f"{PREFIX}_stage_seconds"
+        lines.append(f"# HELP {name} Time spent per processing stage")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, (counts, total) in sorted(stages.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels({'stage': stage, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{name}_sum{_labels({'stage': stage})} {_number(total)}")
+            lines.append(f"{name}_count{_labels({'stage': stage})} {cumulative}")
+
+        families: Dict[str, Tuple[str, List[str]]] = {}
+        for (counter, stage), value in sorted(counters.items()):
+            family = f"{PREFIX}_{counter}_total"
+            families.setdefault(family, ("counter", []))[1].append(f"{family}{_labels({'stage': stage})} {_number(value)}")
+
+        for component, labels, values in stats:
+            for key, value in values.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                kind = "gauge" if key in GAUGE_STATS else "counter"
+                family = f"{PREFIX}_{component}_{key}"
+                if kind == "counter" and not family.endswith("_total"):
+                    family += "_total"
+                families.setdefault(family, (kind, []))[1].append(f"{family}{_labels(labels)} {_number(value)}")
+
+        for family, (kind, samples) in families.items():
+            lines.append(f"# TYPE {family} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics(enabled=get_metrics_enabled())
+
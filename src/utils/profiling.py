@@ -0,0 +1,263 @@
+"""On-demand profiling of live requests
+
+An admin arms the profiler for the next N requests to chosen routes. Each
+of those requests is captured either with cProfile (written as a .pstats
+file) or with a sampling profiler (written as collapsed stacks for flame
+graphs). Only one request is captured at a time; other requests run
+normally meanwhile.
+
+cProfile sees the event loop thread only, so work a route hands to the
+thread pool is missed, and other requests running on the loop at the same
+time are included. The sampler, the default, sees every thread but keeps
+only stacks that pass through this package.
+"""
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Frames from files under this directory are attributed to the application
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("cprofile", "sampling")
+
+# Functions listed per capture in the status
+TOP_FUNCTIONS = 15
+
+
+@dataclass
+class ProfileCapture:
+    """One captured request"""
+    id: str
+    path: str
+    mode: str
+    started_at: str
+    duration_seconds: float
+    file: str
+    top: List[Tuple[str, float]] = field(default_factory=list)
+
+
+def _frame_label(filename: str, name: str) -> str:
+    module = os.path.splitext(os.path.relpath(filename, PACKAGE_ROOT))[0].replace(os.sep, ".")
+    return f"{module}:{name}"
+
+
+class _Sampler(threading.Thread):
+    """Background thread collecting the stacks of all other threads"""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                in_package = False
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename.startswith(PACKAGE_ROOT):
+                        in_package = True
+                        stack.append(_frame_label(code.co_filename, code.co_qualname))
+                    else:
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+                    frame = frame.f_back
+                if in_package:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+class RequestProfiler:
+    """Captures profiles of the next requests to armed routes"""
+
+    def __init__(self, directory: str, max_captures: int = 20, sample_interval: float = 0.005):
+        """Initialize a disarmed profiler writing captures to a directory"""
+        self.directory = directory
+        self.max_captures = max_captures
+        self.sample_interval = sample_interval
+        self.routes: List[str] = []
+        self.mode = "sampling"
+        self.remaining = 0
+        self.captures: List[ProfileCapture] = []
+        self._active = False
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def arm(self, routes: List[str], count: int, mode: str = "sampling") -> None:
+        """Profile the next `count` requests whose path ends with one of `routes`"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self._lock:
+            self.routes = ["/" + route.strip("/") for route in routes]
+            self.mode = mode
+            self.remaining = count
+        logger.info(f"Profiling the next {count} requests to {', '.join(self.routes)} with {mode}")
+
+    def disarm(self) -> None:
+        """Stop profiling further requests"""
+        with self._lock:
+            self.remaining = 0
+
+    def status(self) -> Dict:
+        """Armed routes, requests left to capture and the captures kept"""
+        with self._lock:
+            return {
+                "routes": list(self.routes),
+                "mode": self.mode,
+                "remaining": self.remaining,
+                "captures": list(self.captures),
+            }
+
+    def get_capture(self, capture_id: str) -> Optional[ProfileCapture]:
+        with self._lock:
+            return next((c for c in self.captures if c.id == capture_id), None)
+
+    def claim(self, path: str) -> Optional[str]:
+        """Reserve a capture for a request, returning the mode, or None to run it unprofiled"""
+        if not self.remaining:
+            return None
+        path = path.rstrip("/")
+        with self._lock:
+            if self._active or not self.remaining:
+                return None
+            if not any(path == route or path.endswith(route) for route in self.routes):
+                return None
+            self.remaining -= 1
+            self._active = True
+            return self.mode
+
+    def start(self, mode: str):
+        """Start collecting for a claimed request"""
+        if mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        sampler = _Sampler(self.sample_interval)
+        sampler.start()
+        return sampler
+
+    def stop(self, mode: str, collector) -> None:
+        """Stop collecting; cProfile must be stopped on the thread that started it"""
+        if mode == "cprofile":
+            collector.disable()
+        else:
+            collector.stop()
+
+    def finish(
+        self,
+        path: str,
+        mode: str,
+        collector,
+        started: float,
+        started_at: datetime,
+        stopped: Optional[float] = None
+    ) -> ProfileCapture:
+        """Stop collecting if still running, write the profile file and record the capture"""
+        duration = (stopped or time.perf_counter()) - started
+        try:
+            self.stop(mode, collector)
+            if mode != "cprofile":
+                stacks = collector.stacks
+            with self._lock:
+                self._sequence += 1
+                capture_id = f"{started_at.strftime('%Y%m%dT%H%M%S')}-{self._sequence}"
+            os.makedirs(self.directory, exist_ok=True)
+            if mode == "cprofile":
+                filename = os.path.join(self.directory, f"{capture_id}.pstats")
+                collector.dump_stats(filename)
+                top = _top_cprofile(pstats.Stats(collector))
+            else:
+                filename = os.path.join(self.directory, f"{capture_id}.collapsed")
+                with open(filename, "w") as f:
+                    for stack, count in stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+                top = _top_sampled(stacks, self.sample_interval)
+
+            capture = ProfileCapture(
+                id=capture_id,
+                path=path,
+                mode=mode,
+                started_at=started_at.isoformat(),
+                duration_seconds=duration,
+                file=filename,
+                top=top
+            )
+            with self._lock:
+                self.captures.append(capture)
+                expired = self.captures[:-self.max_captures]
+                self.captures = self.captures[-self.max_captures:]
+            for old in expired:
+                try:
+                    os.remove(old.file)
+                except OSError:
+                    pass
+            logger.info(f"Captured {mode} profile {capture_id} of {path} ({duration:.3f}s)")
+            return capture
+        finally:
+            with self._lock:
+                self._active = False
+
+
+def _top_cprofile(stats: pstats.Stats) -> List[Tuple[str, float]]:
+    """Application functions by cumulative time"""
+    rows = [
+        (_frame_label(filename, name), cumulative)
+        for (filename, _, name), (_, _, _, cumulative, _) in stats.stats.items()
+        if filename.startswith(PACKAGE_ROOT)
+    ]
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _top_sampled(stacks: Counter, interval: float) -> List[Tuple[str, float]]:
+    """Application functions by estimated inclusive time"""
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        for frame in set(stack.split(";")):
+            # Frames outside the package are labelled by file name
+            if ".py:" not in frame:
+                inclusive[frame] += count
+    return [(frame, count * interval) for frame, count in inclusive.most_common(TOP_FUNCTIONS)]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that captures armed requests with a RequestProfiler"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send) -> None:
+        mode = self.profiler.claim(scope["path"]) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        collector = self.profiler.start(mode)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.stop(mode, collector)
+            stopped = time.perf_counter()
+            # Writing the profile file would block the loop
+            await asyncio.to_thread(self.profiler.finish, scope["path"], mode, collector, started, started_at, stopped)
@@ -0,0 +1,822 @@
+"""Local IMAP and SMTP stand-in servers for tests and benchmarks
+
+The IMAP stand-in speaks enough IMAP4rev1 for EmailService and the asyncio
+client: SEARCH, FETCH and STORE over sequence and UID sets, CONDSTORE, IDLE
+and STARTTLS or implicit TLS. The SMTP stand-in supports STARTTLS and records
+delivered messages. Both can add latency to every command, or to specific
+commands, to simulate a WAN link.
+"""
+import functools
+import os
+import socketserver
+import ssl
+import threading
+import time
+from email import message_from_bytes
+from email.message import EmailMessage as MIMEMessage, Message
+from email.parser import BytesHeaderParser
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from tests.corpus import generate_corpus
+
+# Self-signed key and certificate for localhost and 127.0.0.1
+CERT_FILE = os.path.join(os.path.dirname(__file__), "standin_cert.pem")
+
+# Search keys that test a flag, and whether the flag must be set
+FLAG_KEYS = {
+    "ANSWERED": ("\\Answered", True),
+    "UNANSWERED": ("\\Answered", False),
+    "DELETED": ("\\Deleted", True),
+    "UNDELETED": ("\\Deleted", False),
+    "DRAFT": ("\\Draft", True),
+    "UNDRAFT": ("\\Draft", False),
+    "FLAGGED": ("\\Flagged", True),
+    "UNFLAGGED": ("\\Flagged", False),
+    "SEEN": ("\\Seen", True),
+    "UNSEEN": ("\\Seen", False),
+}
+
+
+def make_message(
+    index: int,
+    subject: Optional[str] = None,
+    body: Optional[str] = None,
+    html: Optional[str] = None,
+    attachment: Optional[bytes] = None
+) -> bytes:
+    """Build an RFC822 message, optionally with an HTML alternative and an attachment"""
+    msg = MIMEMessage()
+    msg["Subject"] = subject or f"Message {index}"
+    msg["From"] = f"Sender {index} <sender{index}@example.com>"
+    msg["To"] = "user@example.com"
+    msg["Date"] = format_datetime(datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index))
+    msg["Message-ID"] = f"<{index}@example.com>"
+    msg.set_content(body or f"Body of message {index}. Please review the project report.")
+    if html:
+        msg.add_alternative(html, subtype="html")
+    if attachment is not None:
+        msg.add_attachment(attachment, maintype="application", subtype="octet-stream", filename="data.bin")
+    return msg.as_bytes()
+
+
+@functools.lru_cache(maxsize=None)
+def server_context() -> ssl.SSLContext:
+    """TLS context the stand-ins present to clients"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT_FILE)
+    return context
+
+
+def start_tls(handler: socketserver.StreamRequestHandler) -> None:
+    """Switch a handler's connection to TLS once STARTTLS has been answered"""
+    handler.request = handler.connection = server_context().wrap_socket(handler.request, server_side=True)
+    handler.rfile = handler.connection.makefile("rb")
+    handler.wfile = handler.connection.makefile("wb")
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def body_structure(part: Message) -> str:
+    """Render the IMAP BODYSTRUCTURE of a parsed message"""
+    if part.is_multipart():
+        children = "".join(body_structure(child) for child in part.get_payload())
+        boundary = _quote(part.get_boundary() or "")
+        return f'({children} {_quote(part.get_content_subtype().upper())} ("BOUNDARY" {boundary}) NIL NIL)'
+
+    payload = part.get_payload()
+    payload = payload if isinstance(payload, str) else ""
+    params = [f"{_quote(k.upper())} {_quote(v)}" for k, v in part.get_params()[1:]] if part.get_params() else []
+    encoding = (part.get("Content-Transfer-Encoding") or "7BIT").upper()
+    fields = [
+        _quote(part.get_content_maintype().upper()),
+        _quote(part.get_content_subtype().upper()),
+        f"({' '.join(params)})" if params else "NIL",
+        "NIL",
+        "NIL",
+        _quote(encoding),
+        str(len(payload.encode()))
+    ]
+    if part.get_content_maintype() == "text":
+        fields.append(str(payload.count("\n")))
+    fields.append("NIL")
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        disposition_params = f'("FILENAME" {_quote(filename)})' if filename else "NIL"
+        fields.append(f"({_quote(disposition.upper())} {disposition_params})")
+    else:
+        fields.append("NIL")
+    fields += ["NIL", "NIL"]
+    return f"({' '.join(fields)})"
+
+
+def header_fields(raw: bytes, names: List[str]) -> bytes:
+    """Extract the named header lines (with continuations) of a raw message"""
+    header_block = raw.split(b"\r\n\r\n", 1)[0] if b"\r\n\r\n" in raw else raw.split(b"\n\n", 1)[0]
+    wanted = {n.upper() for n in names}
+    out, keep = [], False
+    for line in header_block.splitlines():
+        if line[:1] in (b" ", b"\t"):
+            if keep:
+                out.append(line)
+            continue
+        keep = line.split(b":", 1)[0].decode(errors="replace").upper() in wanted
+        if keep:
+            out.append(line)
+    return b"\r\n".join(out) + b"\r\n\r\n"
+
+
+def body_text(raw: bytes) -> bytes:
+    """Everything after the top-level header block"""
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        if separator in raw:
+            return raw.split(separator, 1)[1]
+    return b""
+
+
+class StandinMessage:
+    """Message stored in a stand-in mailbox"""
+
+    def __init__(self, uid: int, raw: bytes, flags: Iterable[str] = (), modseq: int = 1):
+        self.uid = uid
+        self.raw = raw
+        self.flags: Set[str] = set(flags)
+        self.modseq = modseq
+        self._headers: Optional[Message] = None
+
+    @property
+    def headers(self) -> Message:
+        """Parsed header block, for SEARCH"""
+        if self._headers is None:
+            self._headers = BytesHeaderParser().parsebytes(self.raw)
+        return self._headers
+
+
+class StandinMailbox:
+    """Folder of messages with IMAP UID bookkeeping"""
+
+    def __init__(self, uidvalidity: int = 1):
+        self.uidvalidity = uidvalidity
+        self.uidnext = 1
+        self.highestmodseq = 1
+        self.messages: List[StandinMessage] = []
+        # Notified on every change, to wake IDLE sessions
+        self.changed = threading.Condition()
+
+    def _notify(self) -> None:
+        with self.changed:
+            self.changed.notify_all()
+
+    def append(self, raw: bytes, flags: Iterable[str] = ()) -> StandinMessage:
+        """Add a message and assign it the next UID"""
+        self.highestmodseq += 1
+        message = StandinMessage(self.uidnext, raw, flags, self.highestmodseq)
+        self.uidnext += 1
+        self.messages.append(message)
+        self._notify()
+        return message
+
+    def set_flags(self, uid: int, flags: Iterable[str]) -> None:
+        """Replace the flags of a message, bumping its MODSEQ"""
+        for message in self.messages:
+            if message.uid == uid:
+                self.highestmodseq += 1
+                message.flags = set(flags)
+                message.modseq = self.highestmodseq
+        self._notify()
+
+    def expunge(self, uid: int) -> None:
+        """Remove a message"""
+        self.messages = [m for m in self.messages if m.uid != uid]
+        self._notify()
+
+    def reset_uidvalidity(self) -> None:
+        """Renumber all messages under a new UIDVALIDITY"""
+        self.uidvalidity += 1
+        self.uidnext = 1
+        for message in self.messages:
+            message.uid = self.uidnext
+            self.uidnext += 1
+
+
+def parse_sequence_set(spec: str, largest: int) -> List[int]:
+    """Expand an IMAP sequence set such as `1:3,7,10:*`"""
+    numbers: List[int] = []
+    for part in spec.split(","):
+        if ":" in part:
+            low, high = (largest if v == "*" else int(v) for v in part.split(":"))
+            low, high = min(low, high), max(low, high)
+            numbers.extend(range(low, high + 1))
+        else:
+            numbers.append(largest if part == "*" else int(part))
+    return numbers
+
+
+def tokenize(line: str) -> List[str]:
+    """Split an IMAP command line into atoms, quoted strings and lists"""
+    tokens: List[str] = []
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if char == " ":
+            i += 1
+        elif char == '"':
+            end = i + 1
+            value = []
+            while line[end] != '"':
+                if line[end] == "\\":
+                    end += 1
+                value.append(line[end])
+                end += 1
+            tokens.append("".join(value))
+            i = end + 1
+        elif char == "(":
+            depth, end = 0, i
+            while True:
+                if line[end] == "(":
+                    depth += 1
+                elif line[end] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                end += 1
+            tokens.append(line[i:end + 1])
+            i = end + 1
+        else:
+            end = line.find(" ", i)
+            end = len(line) if end == -1 else end
+            # Keep section specifiers such as BODY.PEEK[HEADER.FIELDS (A B)] together
+            if "[" in line[i:end] and "]" not in line[i:end]:
+                end = line.find("]", i) + 1
+                while end < len(line) and line[end] != " ":
+                    end += 1
+            tokens.append(line[i:end])
+            i = end
+    return tokens
+
+
+class IMAPHandler(socketserver.StreamRequestHandler):
+    """Handle one IMAP client connection"""
+
+    server: "StandinServer"
+
+    def setup(self) -> None:
+        if self.server.implicit_tls:
+            self.request = server_context().wrap_socket(self.request, server_side=True)
+        super().setup()
+        self.selected: Optional[StandinMailbox] = None
+        self.authenticated = False
+        self.tls = self.server.implicit_tls
+
+    def send(self, data: bytes) -> None:
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        self.server.record("CONNECT")
+        self.send(b"* OK IMAP4rev1 stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.decode().rstrip("\r\n")
+            if not line:
+                continue
+            tag, _, rest = line.partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            if command == "UID":
+                sub, _, args = args.partition(" ")
+                command = f"UID {sub.upper()}"
+
+            self.server.record(command)
+            self.server.delay(command)
+
+            handler = getattr(self, "cmd_" + command.replace(" ", "_"), None)
+            if handler is None:
+                self.send(f"{tag} BAD unknown command {command}\r\n".encode())
+                continue
+            try:
+                if handler(tag, args) is False:
+                    return
+            except Exception as e:  # pragma: no cover - reported to the client
+                self.send(f"{tag} BAD {e}\r\n".encode())
+
+    # Commands
+
+    def cmd_CAPABILITY(self, tag: str, args: str) -> None:
+        capabilities = " ".join(c for c in self.server.capabilities if not (self.tls and c == "STARTTLS"))
+        self.send(f"* CAPABILITY {capabilities}\r\n{tag} OK CAPABILITY completed\r\n".encode())
+
+    def cmd_NOOP(self, tag: str, args: str) -> None:
+        self.send(f"{tag} OK NOOP completed\r\n".encode())
+
+    def cmd_STARTTLS(self, tag: str, args: str) -> None:
+        if self.tls or "STARTTLS" not in self.server.capabilities:
+            self.send(f"{tag} BAD STARTTLS not available\r\n".encode())
+            return
+        self.send(f"{tag} OK begin TLS negotiation\r\n".encode())
+        start_tls(self)
+        self.tls = True
+
+    def cmd_ENABLE(self, tag: str, args: str) -> None:
+        enabled = [c for c in tokenize(args) if c.upper() in self.server.capabilities]
+        self.send(f"* ENABLED {' '.join(enabled)}\r\n{tag} OK ENABLE completed\r\n".encode())
+
+    def cmd_LOGIN(self, tag: str, args: str) -> None:
+        user, password = tokenize(args)[:2]
+        if self.server.credentials and self.server.credentials.get(user) != password:
+            self.send(f"{tag} NO [AUTHENTICATIONFAILED] invalid credentials\r\n".encode())
+            return
+        self.authenticated = True
+        self.send(f"{tag} OK LOGIN completed\r\n".encode())
+
+    def cmd_LOGOUT(self, tag: str, args: str) -> bool:
+        self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n".encode())
+        return False
+
+    def cmd_SELECT(self, tag: str, args: str) -> None:
+        name = tokenize(args)[0]
+        mailbox = self.server.folders.get(name)
+        if mailbox is None:
+            self.send(f"{tag} NO no such mailbox\r\n".encode())
+            return
+        self.selected = mailbox
+        unseen = sum(1 for m in mailbox.messages if "\\Seen" not in m.flags)
+        modseq = ""
+        if "CONDSTORE" in self.server.capabilities:
+            modseq = f"* OK [HIGHESTMODSEQ {mailbox.highestmodseq}] highest\r\n"
+        self.send(
+            f"* FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)\r\n"
+            f"* {len(mailbox.messages)} EXISTS\r\n"
+            f"* 0 RECENT\r\n"
+            f"* OK [UNSEEN {unseen}] unseen\r\n"
+            f"* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid\r\n"
+            f"* OK [UIDNEXT {mailbox.uidnext}] predicted next UID\r\n"
+            f"{modseq}"
+            f"{tag} OK [READ-WRITE] SELECT completed\r\n".encode()
+        )
+
+    cmd_EXAMINE = cmd_SELECT
+
+    def _match(self, tokens: List[str], i: int, number: int, message: StandinMessage) -> Tuple[bool, int]:
+        """Evaluate the search key at tokens[i]; return the result and the index after it"""
+        key = tokens[i].upper()
+        if key == "NOT":
+            matched, i = self._match(tokens, i + 1, number, message)
+            return not matched, i
+        if key == "OR":
+            left, i = self._match(tokens, i + 1, number, message)
+            right, i = self._match(tokens, i, number, message)
+            return left or right, i
+        if key.startswith("("):
+            return self._match_all(tokenize(tokens[i][1:-1]), number, message), i + 1
+        if key == "ALL":
+            return True, i + 1
+        if key in FLAG_KEYS:
+            flag, wanted = FLAG_KEYS[key]
+            return (flag in message.flags) == wanted, i + 1
+        if key in ("FROM", "TO", "CC", "SUBJECT"):
+            value = str(message.headers.get(key, ""))
+            return tokens[i + 1].lower() in value.lower(), i + 2
+        if key in ("SINCE", "BEFORE", "ON"):
+            day = datetime.strptime(tokens[i + 1], "%d-%b-%Y").date()
+            sent = parsedate_to_datetime(message.headers["Date"]).date()
+            matched = {"SINCE": sent >= day, "BEFORE": sent < day, "ON": sent == day}[key]
+            return matched, i + 2
+        if key in ("LARGER", "SMALLER"):
+            size = int(tokens[i + 1])
+            return (len(message.raw) > size if key == "LARGER" else len(message.raw) < size), i + 2
+        messages = self.selected.messages
+        if key == "UID":
+            largest = messages[-1].uid if messages else 0
+            return message.uid in parse_sequence_set(tokens[i + 1], largest), i + 2
+        if key[:1].isdigit() or key[:1] == "*":
+            return number in parse_sequence_set(key, len(messages)), i + 1
+        raise ValueError(f"unsupported search key {key}")
+
+    def _match_all(self, tokens: List[str], number: int, message: StandinMessage) -> bool:
+        i = 0
+        while i < len(tokens):
+            matched, i = self._match(tokens, i, number, message)
+            if not matched:
+                return False
+        return True
+
+    def _search(self, args: str) -> List[int]:
+        """Return 1-based sequence numbers matching the search criteria"""
+        tokens = tokenize(args)
+        if tokens and tokens[0].upper() == "CHARSET":
+            tokens = tokens[2:]
+        return [
+            number for number, message in enumerate(self.selected.messages, 1)
+            if self._match_all(tokens, number, message)
+        ]
+
+    def cmd_SEARCH(self, tag: str, args: str) -> None:
+        found = " ".join(str(n) for n in self._search(args))
+        self.send(f"* SEARCH {found}\r\n{tag} OK SEARCH completed\r\n".encode())
+
+    def cmd_UID_SEARCH(self, tag: str, args: str) -> None:
+        found = " ".join(str(self.selected.messages[n - 1].uid) for n in self._search(args))
+        self.send(f"* SEARCH {found}\r\n{tag} OK SEARCH completed\r\n".encode())
+
+    def _fetch_items(self, message: StandinMessage, items: List[str], uid: bool) -> bytes:
+        """Render the data items of one FETCH response"""
+        parts: List[bytes] = []
+        if uid and "UID" not in items:
+            items = ["UID"] + items
+        for item in items:
+            name = item.upper()
+            if name == "UID":
+                parts.append(f"UID {message.uid}".encode())
+            elif name == "FLAGS":
+                parts.append(f"FLAGS ({' '.join(sorted(message.flags))})".encode())
+            elif name == "MODSEQ":
+                parts.append(f"MODSEQ ({message.modseq})".encode())
+            elif name == "RFC822.SIZE":
+                parts.append(f"RFC822.SIZE {len(message.raw)}".encode())
+            elif name == "BODYSTRUCTURE":
+                parts.append(f"BODYSTRUCTURE {body_structure(message_from_bytes(message.raw))}".encode())
+            elif name.startswith("BODY.PEEK[HEADER.FIELDS") or name.startswith("BODY[HEADER.FIELDS"):
+                section = item[item.index("[") + 1:item.index("]")]
+                names = section[section.index("(") + 1:section.index(")")].split()
+                data = header_fields(message.raw, names)
+                parts.append(f"BODY[{section}] {{{len(data)}}}\r\n".encode() + data)
+            elif name.startswith("BODY.PEEK[TEXT]") or name.startswith("BODY[TEXT]"):
+                data = body_text(message.raw)
+                label = "BODY[TEXT]"
+                if "<" in item:
+                    offset, count = (int(v) for v in item[item.index("<") + 1:-1].split("."))
+                    data = data[offset:offset + count]
+                    label += f"<{offset}>"
+                parts.append(f"{label} {{{len(data)}}}\r\n".encode() + data)
+            elif name in ("RFC822", "BODY[]", "BODY.PEEK[]"):
+                label = "RFC822" if name == "RFC822" else "BODY[]"
+                parts.append(f"{label} {{{len(message.raw)}}}\r\n".encode() + message.raw)
+                if name != "BODY.PEEK[]":
+                    message.flags.add("\\Seen")
+            else:
+                raise ValueError(f"unsupported fetch item {item}")
+        return b" ".join(parts)
+
+    def _select_numbers(self, spec: str, uid: bool) -> List[int]:
+        """Resolve a sequence or UID set to 1-based sequence numbers"""
+        messages = self.selected.messages
+        if uid:
+            largest = messages[-1].uid if messages else 0
+            wanted = set(parse_sequence_set(spec, largest))
+            return [n for n, m in enumerate(messages, 1) if m.uid in wanted]
+        return [n for n in parse_sequence_set(spec, len(messages)) if 1 <= n <= len(messages)]
+
+    def _fetch(self, tag: str, args: str, uid: bool) -> None:
+        spec, _, rest = args.partition(" ")
+        tokens = tokenize(rest)
+        item_spec = tokens[0]
+        if item_spec.startswith("("):
+            item_spec = item_spec[1:-1]
+        items = tokenize(item_spec)
+
+        # CONDSTORE modifier: (CHANGEDSINCE <modseq>)
+        changed_since = None
+        if len(tokens) > 1 and "CHANGEDSINCE" in tokens[1].upper():
+            changed_since = int(tokens[1].strip("()").split()[1])
+            if "MODSEQ" not in [i.upper() for i in items]:
+                items.append("MODSEQ")
+
+        messages = self.selected.messages
+        numbers = self._select_numbers(spec, uid)
+        if changed_since is not None:
+            numbers = [n for n in numbers if messages[n - 1].modseq > changed_since]
+
+        out = bytearray()
+        for number in numbers:
+            out += f"* {number} FETCH (".encode()
+            out += self._fetch_items(messages[number - 1], items, uid)
+            out += b")\r\n"
+        out += f"{tag} OK FETCH completed\r\n".encode()
+        self.send(bytes(out))
+
+    def cmd_FETCH(self, tag: str, args: str) -> None:
+        self._fetch(tag, args, uid=False)
+
+    def cmd_UID_FETCH(self, tag: str, args: str) -> None:
+        self._fetch(tag, args, uid=True)
+
+    def _store(self, tag: str, args: str, uid: bool) -> None:
+        spec, action, flag_list = tokenize(args)[:3]
+        flags = set(flag_list.strip("()").split())
+        mailbox = self.selected
+        out = bytearray()
+        for number in self._select_numbers(spec, uid):
+            message = mailbox.messages[number - 1]
+            action_name = action.upper().replace(".SILENT", "")
+            if action_name == "+FLAGS":
+                new_flags = message.flags | flags
+            elif action_name == "-FLAGS":
+                new_flags = message.flags - flags
+            else:
+                new_flags = flags
+            mailbox.set_flags(message.uid, new_flags)
+            if not action.upper().endswith(".SILENT"):
+                out += f"* {number} FETCH (UID {message.uid} FLAGS ({' '.join(sorted(message.flags))}))\r\n".encode()
+        out += f"{tag} OK STORE completed\r\n".encode()
+        self.send(bytes(out))
+
+    def cmd_STORE(self, tag: str, args: str) -> None:
+        self._store(tag, args, uid=False)
+
+    def cmd_UID_STORE(self, tag: str, args: str) -> None:
+        self._store(tag, args, uid=True)
+
+    def cmd_EXPUNGE(self, tag: str, args: str) -> None:
+        mailbox = self.selected
+        out = bytearray()
+        for number in range(len(mailbox.messages), 0, -1):
+            message = mailbox.messages[number - 1]
+            if "\\Deleted" in message.flags:
+                mailbox.expunge(message.uid)
+                out += f"* {number} EXPUNGE\r\n".encode()
+        out += f"{tag} OK EXPUNGE completed\r\n".encode()
+        self.send(bytes(out))
+
+    def cmd_CLOSE(self, tag: str, args: str) -> None:
+        self.selected = None
+        self.send(f"{tag} OK CLOSE completed\r\n".encode())
+
+    def _report_changes(self, known: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Send untagged updates for changes since the known (uid, modseq) snapshot"""
+        messages = list(self.selected.messages)
+        current = {m.uid: m for m in messages}
+        out = bytearray()
+        for number in range(len(known), 0, -1):
+            if known[number - 1][0] not in current:
+                out += f"* {number} EXPUNGE\r\n".encode()
+        known = [entry for entry in known if entry[0] in current]
+        for number, (uid, modseq) in enumerate(known, 1):
+            message = current[uid]
+            if message.modseq != modseq:
+                out += f"* {number} FETCH (UID {uid} FLAGS ({' '.join(sorted(message.flags))}))\r\n".encode()
+        if len(messages) != len(known):
+            out += f"* {len(messages)} EXISTS\r\n".encode()
+        if out:
+            self.send(bytes(out))
+        return [(m.uid, m.modseq) for m in messages]
+
+    def cmd_IDLE(self, tag: str, args: str) -> Optional[bool]:
+        mailbox = self.selected
+        if mailbox is None:
+            self.send(f"{tag} BAD no mailbox selected\r\n".encode())
+            return None
+        known = [(m.uid, m.modseq) for m in mailbox.messages]
+        self.send(b"+ idling\r\n")
+
+        # The client ends IDLE with DONE; wait for it without blocking updates
+        done = threading.Event()
+        lines: List[bytes] = []
+
+        def wait_for_done() -> None:
+            lines.append(self.rfile.readline())
+            done.set()
+
+        threading.Thread(target=wait_for_done, daemon=True).start()
+        while not done.is_set():
+            with mailbox.changed:
+                mailbox.changed.wait(0.05)
+            known = self._report_changes(known)
+        if not lines[0]:
+            return False
+        self.send(f"{tag} OK IDLE terminated\r\n".encode())
+        return None
+
+
+class StandinBase(socketserver.ThreadingTCPServer):
+    """Threaded stand-in server with simulated latency and command counters"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        handler: type,
+        latency: float,
+        command_latency: Optional[Dict[str, float]]
+    ):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.command_latency = command_latency or {}
+        self.commands: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def record(self, command: str) -> None:
+        with self._lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+    def delay(self, command: str) -> None:
+        """Sleep for the simulated latency of a command"""
+        latency = self.command_latency.get(command, self.latency)
+        if latency:
+            time.sleep(latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class StandinServer(StandinBase):
+    """In-process IMAP stand-in
+
+    latency applies to every command; command_latency overrides it per
+    command name, e.g. {"UID FETCH": 0.05}. With starttls the server offers
+    STARTTLS, and with implicit_tls it expects TLS from the first byte (IMAPS),
+    in both cases with the certificate in CERT_FILE.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        credentials: Optional[Dict[str, str]] = None,
+        command_latency: Optional[Dict[str, float]] = None,
+        starttls: bool = False,
+        implicit_tls: bool = False
+    ):
+        super().__init__((host, port), IMAPHandler, latency, command_latency)
+        self.credentials = credentials or {}
+        self.implicit_tls = implicit_tls
+        self.capabilities = ["IMAP4rev1", "UIDPLUS", "IDLE"] + (["STARTTLS"] if starttls else [])
+        self.folders: Dict[str, StandinMailbox] = {"INBOX": StandinMailbox()}
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.commands.clear()
+
+    @property
+    def round_trips(self) -> int:
+        """Number of commands received since the last counter reset"""
+        return sum(n for name, n in self.commands.items() if name != "CONNECT")
+
+    def seed(
+        self,
+        count: int,
+        folder: str = "INBOX",
+        seen_every: int = 0,
+        corpus_seed: Optional[int] = None
+    ) -> None:
+        """Fill a folder with synthetic messages, from the varied corpus if corpus_seed is set"""
+        mailbox = self.folders.setdefault(folder, StandinMailbox())
+        start = len(mailbox.messages)
+        if corpus_seed is not None:
+            raws = [message.raw for message in generate_corpus(count, corpus_seed)]
+        else:
+            raws = [make_message(i) for i in range(start, start + count)]
+        for i, raw in enumerate(raws, start):
+            flags = ["\\Seen"] if seen_every and i % seen_every == 0 else []
+            mailbox.append(raw, flags)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Handle one SMTP client connection"""
+
+    server: "StandinSMTPServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.tls = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.mail_from: Optional[str] = None
+        self.recipients: List[str] = []
+
+    def send(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        self.server.record("CONNECT")
+        self.send("220 stand-in ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, args = line.decode().rstrip("\r\n").partition(" ")
+            command = command.upper()
+            self.server.record(command)
+            self.server.delay(command)
+
+            handler = getattr(self, "cmd_" + command, None)
+            if handler is None:
+                self.send("502 command not implemented")
+            elif handler(args) is False:
+                return
+
+    @staticmethod
+    def _address(args: str) -> str:
+        return args.partition(":")[2].strip().split(" ")[0].strip("<>")
+
+    # Commands
+
+    def cmd_EHLO(self, args: str) -> None:
+        self.send("250-stand-in greets you")
+        self.send("250-AUTH PLAIN LOGIN")
+        if self.server.starttls and not self.tls:
+            self.send("250-STARTTLS")
+        self.send("250 8BITMIME")
+
+    def cmd_STARTTLS(self, args: str) -> None:
+        if self.tls or not self.server.starttls:
+            self.send("454 TLS not available")
+            return
+        self.send("220 ready to start TLS")
+        start_tls(self)
+        self.tls = True
+        self._reset()
+
+    def cmd_HELO(self, args: str) -> None:
+        self.send("250 stand-in")
+
+    def cmd_AUTH(self, args: str) -> None:
+        self.send("235 authentication succeeded")
+
+    def cmd_NOOP(self, args: str) -> None:
+        self.send("250 OK")
+
+    def cmd_RSET(self, args: str) -> None:
+        self._reset()
+        self.send("250 OK")
+
+    def cmd_MAIL(self, args: str) -> None:
+        self._reset()
+        self.mail_from = self._address(args)
+        self.send("250 OK")
+
+    def cmd_RCPT(self, args: str) -> None:
+        recipient = self._address(args)
+        if recipient in self.server.refused:
+            self.send("550 mailbox unavailable")
+            return
+        self.recipients.append(recipient)
+        self.send("250 OK")
+
+    def cmd_DATA(self, args: str) -> None:
+        if not self.recipients:
+            self.send("554 no valid recipients")
+            return
+        self.send("354 end data with <CR><LF>.<CR><LF>")
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b".\r\n", b".\n", b""):
+                break
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        self.server.deliver(self.mail_from, list(self.recipients), b"".join(lines))
+        self._reset()
+        self.send("250 OK queued")
+
+    def cmd_QUIT(self, args: str) -> bool:
+        self.send("221 bye")
+        return False
+
+
+class StandinSMTPServer(StandinBase):
+    """In-process SMTP stand-in that records delivered messages"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        command_latency: Optional[Dict[str, float]] = None,
+        starttls: bool = False
+    ):
+        super().__init__((host, port), SMTPHandler, latency, command_latency)
+        self.starttls = starttls
+        self.refused: Set[str] = set()
+        self.delivered: List[Tuple[str, List[str], bytes]] = []
+
+    def deliver(self, sender: str, recipients: List[str], data: bytes) -> None:
+        with self._lock:
+            self.delivered.append((sender, recipients, data))
@@ -0,0 +1,195 @@
+"""Tests for multiple accounts and fair scheduling between them"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.api import routes
+from src.services.scheduler import FairScheduler
+from src.utils.config import get_account_names, get_email_config, get_email_password
+from tests.standin_server import StandinServer, make_message
+
+
+def test_account_settings_fall_back_to_globals(monkeypatch):
+    """Test named accounts override only the settings they set"""
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("IMAP_SERVER", "imap.example.com")
+    monkeypatch.setenv("ACCOUNTS", "work, home-2")
+    monkeypatch.setenv("ACCOUNT_WORK_EMAIL_ADDRESS", "me@work.example.com")
+    monkeypatch.setenv("ACCOUNT_WORK_IMAP_SERVER", "imap.work.example.com")
+    monkeypatch.setenv("ACCOUNT_HOME_2_EMAIL_ADDRESS", "me@home.example.com")
+
+    assert get_account_names() == ["default", "work", "home-2"]
+    assert get_email_config("work").imap_server == "imap.work.example.com"
+    assert get_email_config("home-2").imap_server == "imap.example.com"
+    assert get_email_config("home-2").email_address == "me@home.example.com"
+    # Credentials are never inherited from the default account
+    monkeypatch.setenv("EMAIL_PASSWORD", "secret")
+    assert get_email_password("work") == ""
+
+
+@pytest.mark.asyncio
+async def test_waiting_accounts_take_turns():
+    """Test a backlogged account alternates with others instead of going first"""
+    scheduler = FairScheduler(capacity=1)
+    await scheduler.acquire_async("big")
+    order = []
+
+    async def work(account):
+        async with scheduler.async_slot(account):
+            order.append(account)
+
+    tasks = [asyncio.create_task(work("big")) for _ in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(work("small")))
+    await asyncio.sleep(0)
+    scheduler.release("big")
+    await asyncio.gather(*tasks)
+
+    assert order == ["big", "small", "big", "big"]
+    assert scheduler.stats()["big"]["granted"] == 4
+    assert scheduler.in_use == 0
+
+
+def test_account_limit_leaves_slots_for_others():
+    """Test an account cannot take more than its limit even with free slots"""
+    scheduler = FairScheduler(capacity=4, limits={"big": 2})
+    assert scheduler.acquire("big", timeout=0.1)
+    assert scheduler.acquire("big", timeout=0.1)
+    assert not scheduler.acquire("big", timeout=0.1)
+    assert scheduler.acquire("small", timeout=0.1)
+
+    assert scheduler.stats()["big"] == {
+        "running": 2, "waiting": 0, "limit": 2, "granted": 2, "wait_seconds_total": pytest.approx(0, abs=0.1)
+    }
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_turn():
+    """Test a cancelled request neither holds nor leaks a slot"""
+    scheduler = FairScheduler(capacity=1)
+    await scheduler.acquire_async("a")
+    waiter = asyncio.create_task(scheduler.acquire_async("b"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.release("a")
+
+    assert scheduler.in_use == 0
+    assert "b" not in scheduler.stats()
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    """Configure a default and a "work" account on two IMAP stand-ins"""
+    with StandinServer() as home, StandinServer() as work:
+        home.seed(2)
+        work.folders["INBOX"].append(make_message(0, subject="Quarterly report"))
+        for key, value in {
+            "EMAIL_ADDRESS": "me@example.com",
+            "EMAIL_PASSWORD": "secret",
+            "IMAP_SERVER": "127.0.0.1",
+            "IMAP_PORT": str(home.port),
+            "USE_SSL": "false",
+            "ACCOUNTS": "work",
+            "ACCOUNT_WORK_EMAIL_ADDRESS": "me@work.example.com",
+            "ACCOUNT_WORK_EMAIL_PASSWORD": "secret",
+            "ACCOUNT_WORK_IMAP_PORT": str(work.port),
+            "MESSAGE_STORE_PATH": "",
+            "SEARCH_INDEX_PATH": "",
+            "SUMMARY_PATH": "",
+        }.items():
+            monkeypatch.setenv(key, value)
+        for name in ("_account_registry", "_fetch_scheduler", "_analysis_scheduler"):
+            monkeypatch.setattr(routes, name, None)
+        yield TestClient(main.app)
+        for kind, _, pool in routes.get_account_registry().pools():
+            if kind != "imap_async":
+                pool.close()
+
+
+def test_routes_select_the_account(accounts):
+    """Test the account selector picks the mailbox a request works on"""
+    default = accounts.post("/api/v1/emails/fetch", json={"limit": 10})
+    work = accounts.post("/api/v1/emails/fetch?account=work", json={"limit": 10})
+
+    assert [e["subject"] for e in default.json()] == ["Message 0", "Message 1"]
+    assert [e["subject"] for e in work.json()] == ["Quarterly report"]
+    assert accounts.get("/api/v1/config?account=work").json()["email_address"] == "me@work.example.com"
+    assert accounts.post("/api/v1/emails/fetch?account=other", json={}).status_code == 404
+    assert [a["name"] for a in accounts.get("/api/v1/accounts").json()] == ["default", "work"]
+
+    pools = accounts.get("/api/v1/pool/stats").json()["imap_async"]
+    assert len(pools) == 2
+    scheduler = routes.get_fetch_scheduler()
+    assert scheduler.in_use == 0
+    assert {account: s["granted"] for account, s in scheduler.stats().items()} == {"default": 1, "work": 1}
+
+
+def test_by_uid_takes_only_numeric_uids(accounts):
+    """Test UIDs are validated before they reach the IMAP command"""
+    assert accounts.get("/api/v1/emails/by-uid/2").json()["subject"] == "Message 1"
+    assert accounts.get("/api/v1/emails/by-uid/9").status_code == 404
+    for uid in ("1:*", "abc", "0"):
+        assert accounts.get(f"/api/v1/emails/by-uid/{uid}").status_code == 422
+
+
+def test_misconfigured_account_fails_alone(accounts, monkeypatch):
+    """Test an account with invalid settings is reported without breaking the others"""
+    monkeypatch.setenv("ACCOUNTS", "work,broken")
+    monkeypatch.setenv("ACCOUNT_BROKEN_EMAIL_ADDRESS", "not-an-address")
+    monkeypatch.setenv("ACCOUNT_BROKEN_EMAIL_PASSWORD", "secret")
+
+    listed = {a["name"]: a for a in accounts.get("/api/v1/accounts").json()}
+    broken = accounts.post("/api/v1/emails/fetch?account=broken", json={})
+
+    assert listed["work"]["error"] is None
+    assert listed["broken"]["email_address"] is None
+    assert "email_address" in listed["broken"]["error"]
+    assert broken.status_code == 400
+    assert broken.json()["detail"].startswith("Account broken is misconfigured")
+    assert accounts.post("/api/v1/emails/fetch?account=work", json={"limit": 10}).status_code == 200
+    assert accounts.post("/api/v1/emails/fetch", json={"limit": 10}).status_code == 200
+    assert accounts.get("/api/v1/config?account=broken").status_code == 400
+
+
+def test_reaper_closes_idle_pooled_connections(accounts):
+    """Test the periodic reaper closes pooled connections once they sit idle"""
+    assert accounts.get("/api/v1/emails/by-uid/2").status_code == 200
+    registry = routes.get_account_registry()
+    for _, _, pool in registry.pools():
+        pool.idle_timeout = 0
+
+    async def reap_once():
+        reaper = asyncio.create_task(routes.reap_idle_connections(0.01))
+        await asyncio.sleep(0.1)
+        reaper.cancel()
+        await asyncio.gather(reaper, return_exceptions=True)
+
+    asyncio.run(reap_once())
+
+    stats = accounts.get("/api/v1/pool/stats").json()
+    assert sum(s["evicted_idle"] for s in stats["imap"].values()) == 1
+    assert all(s["idle"] == 0 for s in stats["imap"].values())
+
+
+def test_accounts_on_one_address_keep_separate_stores(accounts, monkeypatch, tmp_path):
+    """Test stores are keyed by account name, and background analysis takes the account's slots"""
+    monkeypatch.setenv("ACCOUNT_WORK_EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("SUMMARY_PATH", str(tmp_path / "summary.db"))
+    monkeypatch.setenv("SEARCH_INDEX_PATH", str(tmp_path / "index.db"))
+    for name in ("_mailbox_summary", "_search_index"):
+        monkeypatch.setattr(routes, name, None)
+
+    for account in ("default", "work"):
+        assert accounts.post(f"/api/v1/emails/fetch?account={account}", json={"limit": 10}).status_code == 200
+
+    assert accounts.get("/api/v1/emails/summary").json()["total"] == 2
+    assert accounts.get("/api/v1/emails/summary?account=work").json()["total"] == 1
+    hits = accounts.get("/api/v1/emails/search?q=quarterly&account=work").json()
+    assert [hit["subject"] for hit in hits] == ["Quarterly report"]
+    assert accounts.get("/api/v1/emails/search?q=quarterly").json() == []
+    granted = {account: s["granted"] for account, s in routes.get_analysis_scheduler().stats().items()}
+    assert granted == {"default": 2, "work": 2}
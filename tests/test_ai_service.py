@@ -1,6 +1,6 @@
 """Tests for AI Email Service"""
 import pytest
-from datetime import datetime
+from datetime import datetime, timezone
 
 from src.services.ai_service import AIEmailService
 from src.models.email_models import EmailMessage, EmailAddress
@@ -139,3 +139,37 @@ def test_meeting_email_tagging(ai_service):
     classification = ai_service.classify_email(meeting_email)
     
     assert "meeting" in classification.tags
+
+
+def test_extract_features(ai_service, sample_email):
+    """Test shared feature extraction"""
+    features = ai_service.extract_features(sample_email)
+    
+    assert features.text == f"{sample_email.subject} {sample_email.body}".lower()
+    assert features.body == sample_email.body.lower()
+    assert features.has("urgent")
+    assert features.has("deadline")
+    assert features.lead_sentences[0] == "Please complete the project report by tomorrow"
+
+
+def test_shared_features_give_same_results(ai_service, sample_email):
+    """Test that passing precomputed features does not change results"""
+    features = ai_service.extract_features(sample_email)
+    
+    assert ai_service.analyze_email(sample_email, features) == ai_service.analyze_email(sample_email)
+    assert ai_service.detect_spam(sample_email, features) == ai_service.detect_spam(sample_email)
+
+
+def test_classify_batch_matches_classify_email(ai_service, sample_email):
+    """Test vectorized batch classification equals per-email classification"""
+    emails = [
+        sample_email,
+        sample_email.model_copy(update={"subject": "Re: lunch", "body": "Sounds good, thanks!"}),
+        sample_email.model_copy(update={"subject": "Invoice", "body": "Payment due for the bank transaction."}),
+        sample_email.model_copy(update={"subject": "Hello", "body": "Nothing to see here"}),
+        sample_email.model_copy(update={"date": datetime(2020, 1, 1)}),
+        sample_email.model_copy(update={"date": datetime.now(timezone.utc)}),
+    ]
+    
+    assert ai_service.classify_batch(emails) == [ai_service.classify_email(e) for e in emails]
+    assert ai_service.classify_batch([]) == []
@@ -0,0 +1,122 @@
+"""Tests for the analysis result cache"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.email_models import EmailAddress, EmailMessage
+from src.services.ai_service import AIEmailService
+from src.services.analysis_cache import AnalysisCache
+
+
+def make_email(email_id="1", date=None, subject="Urgent: invoice", body="Please pay the invoice."):
+    return EmailMessage(
+        id=email_id,
+        subject=subject,
+        sender=EmailAddress(email="billing@example.com"),
+        recipients=[EmailAddress(email="user@example.com")],
+        body=body,
+        date=date or datetime.now()
+    )
+
+
+@pytest.fixture
+def cached_service():
+    """Create an AI service with an in-memory cache"""
+    return AIEmailService(cache=AnalysisCache(max_entries=100))
+
+
+def test_cache_evicts_least_recently_used():
+    """Test the memory tier keeps only the most recently used entries"""
+    cache = AnalysisCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries_after_ttl():
+    """Test entries older than the TTL are misses"""
+    cache = AnalysisCache(ttl=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.06)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test results written to disk are found by a new cache"""
+    path = str(tmp_path / "analysis.db")
+    cache = AnalysisCache(disk_path=path)
+    cache.put("a", {"result": True})
+    cache.close()
+
+    cache = AnalysisCache(max_entries=1, disk_path=path)
+    assert cache.get("a") == {"result": True}
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_cached_results_match_uncached(cached_service):
+    """Test cache hits return the same results as a fresh analysis"""
+    plain = AIEmailService()
+    email = make_email()
+
+    for _ in range(2):
+        assert cached_service.analyze_email(email) == plain.analyze_email(email)
+        assert cached_service.classify_email(email) == plain.classify_email(email)
+        assert cached_service.detect_spam(email) == plain.detect_spam(email)
+
+    stats = cached_service.cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+
+
+def test_cache_hit_reevaluates_recency_and_email_id(cached_service):
+    """Test priority and email_id come from the email, not the cached copy"""
+    recent = make_email("1")
+    old = make_email("2", date=datetime.now() - timedelta(days=2))
+
+    first = cached_service.analyze_email(recent)
+    second = cached_service.analyze_email(old)
+
+    assert cached_service.cache.stats()["hits"] == 1
+    assert first.classification.priority == "high"
+    assert first.action_required
+    assert second.classification.priority == "medium"
+    assert second.email_id == "2"
+    assert second == AIEmailService().analyze_email(old)
+
+
+def test_cache_key_depends_on_content(cached_service):
+    """Test emails with different content are cached separately"""
+    cached_service.classify_email(make_email(body="Meeting on Friday"))
+    cached_service.classify_email(make_email(body="Party on Friday"))
+
+    assert cached_service.cache.stats()["misses"] == 2
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    """Test the disk tier drops its oldest rows once it is over its cap"""
+    path = str(tmp_path / "analysis.db")
+    cache = AnalysisCache(max_entries=1, disk_path=path, max_disk_entries=10)
+    for i in range(25):
+        cache.put(str(i), i)
+
+    stats = cache.stats()
+    assert stats["disk_size"] <= 10
+    assert stats["disk_evictions"] >= 15
+    assert cache.get("0") is None
+    assert cache.get("23") == 23
+    cache.close()
+
+    cache = AnalysisCache(disk_path=path, max_disk_entries=10)
+    assert cache.stats()["disk_size"] == stats["disk_size"]
+    cache.close()
@@ -0,0 +1,130 @@
+"""Tests for the asyncio IMAP client path"""
+import asyncio
+import time
+
+import pytest
+
+from src.services.async_imap import AsyncIMAPClient
+from src.services.connection_pool import AsyncIMAPConnectionPool
+from src.services.email_service import EmailService
+from tests.standin_server import StandinServer, make_message
+from tests.test_email_service import make_service
+
+
+@pytest.fixture
+def imap_server():
+    """Start an IMAP stand-in seeded with messages"""
+    with StandinServer() as server:
+        server.seed(25, seen_every=3)
+        server.folders["INBOX"].messages[1].flags.add("\\Flagged")
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_fetch_emails_async_matches_blocking_fetch(imap_server):
+    """Test the async path returns the same messages as imaplib"""
+    service = make_service(imap_server, chunk_size=10)
+    expected = service.fetch_emails(limit=20)
+    service.disconnect()
+
+    service = make_service(imap_server, chunk_size=10)
+    emails = await service.fetch_emails_async(limit=20)
+    await service.disconnect_async()
+
+    assert emails == expected
+    assert emails[0].is_read is False
+
+
+@pytest.mark.asyncio
+async def test_fetch_emails_async_unread_only(imap_server):
+    """Test UNSEEN searches through the async client"""
+    service = make_service(imap_server)
+    emails = await service.fetch_emails_async(limit=50, unread_only=True)
+    await service.disconnect_async()
+
+    assert len(emails) == 16
+    assert not any(e.is_read for e in emails)
+
+
+@pytest.mark.asyncio
+async def test_fetch_emails_async_on_large_mailbox():
+    """Test SEARCH replies longer than the stream buffer are read whole"""
+    with StandinServer() as server:
+        raw = make_message(0)
+        for _ in range(15000):
+            server.folders["INBOX"].append(raw)
+        service = make_service(server)
+        emails = await service.fetch_emails_async(limit=3)
+        await service.disconnect_async()
+
+    assert [e.uid for e in emails] == ["14998", "14999", "15000"]
+
+
+@pytest.mark.asyncio
+async def test_slow_mailbox_does_not_delay_others(imap_server):
+    """Test a slow server only slows down its own requests"""
+    with StandinServer(latency=0.3) as slow_server:
+        slow_server.seed(5)
+        finished = []
+
+        async def fetch(server, name):
+            service = make_service(server)
+            await service.fetch_emails_async(limit=5)
+            await service.disconnect_async()
+            finished.append((name, time.monotonic()))
+
+        start = time.monotonic()
+        await asyncio.gather(fetch(slow_server, "slow"), fetch(imap_server, "fast"))
+
+    assert [name for name, _ in finished] == ["fast", "slow"]
+    assert finished[0][1] - start < 0.3
+
+
+@pytest.mark.asyncio
+async def test_command_timeout_marks_connection_broken(imap_server):
+    """Test a stalled command is abandoned after the timeout"""
+    client = await AsyncIMAPClient.connect("127.0.0.1", imap_server.port, use_ssl=False, timeout=0.1)
+    imap_server.latency = 0.5
+
+    with pytest.raises(asyncio.TimeoutError):
+        await client.noop()
+
+    assert client.broken
+    client.abort()
+
+
+@pytest.mark.asyncio
+async def test_async_pool_reuses_connection(imap_server):
+    """Test pooled async connections log in once and skip repeat SELECTs"""
+    pool = AsyncIMAPConnectionPool(make_service(imap_server).open_async_imap_connection)
+    base = make_service(imap_server)
+
+    for _ in range(3):
+        service = EmailService(base.config, base.password, async_imap_pool=pool)
+        assert len(await service.fetch_emails_async(limit=5)) == 5
+        await service.disconnect_async()
+
+    assert imap_server.commands["LOGIN"] == 1
+    assert imap_server.commands["SELECT"] == 1
+    stats = pool.stats()
+    assert stats["reused"] == 2
+    assert stats["skipped_selects"] == 2
+
+    await pool.close()
+    assert imap_server.commands["LOGOUT"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_pool_evicts_idle_connections(imap_server):
+    """Test idle async connections past the timeout are logged out without a new acquire"""
+    pool = AsyncIMAPConnectionPool(make_service(imap_server).open_async_imap_connection, idle_timeout=0.05)
+    await pool.release(await pool.acquire())
+
+    assert await pool.evict_idle() == 0
+    await asyncio.sleep(0.1)
+    assert await pool.evict_idle() == 1
+
+    assert imap_server.commands["LOGOUT"] == 1
+    assert pool.stats()["evicted_idle"] == 1
+    assert pool.stats()["idle"] == 0
+    await pool.close()
@@ -0,0 +1,160 @@
+"""Tests for batch email analysis"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+
+import main
+from src.api import routes
+from src.services import batch_service as batch_module
+from src.services.ai_service import AIEmailService
+from src.services.batch_service import BatchAnalysisService
+from src.services.scheduler import FairScheduler
+from src.models.email_models import EmailMessage, EmailAddress
+
+
+@pytest.fixture(scope="module")
+def batch_service():
+    """Create batch service with a small process pool"""
+    service = BatchAnalysisService(max_workers=2, chunk_size=3)
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def emails():
+    """Create a batch of varied emails"""
+    bodies = [
+        "Please review the invoice and confirm the payment today.",
+        "Don't miss our sale! 50% discount on everything.",
+        "Happy birthday! Hope to see you at the party.",
+        "Click here now! Act now! Limited time offer! 100% free!",
+        "Can you help with the project presentation?",
+    ]
+    return [
+        EmailMessage(
+            id=str(i),
+            subject=f"Message {i}",
+            sender=EmailAddress(email="sender@example.com"),
+            recipients=[EmailAddress(email="test@example.com")],
+            body=bodies[i % len(bodies)],
+            date=datetime(2024, 1, 1),
+            folder="inbox"
+        )
+        for i in range(11)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_analysis_matches_single_analysis(batch_service, emails):
+    """Test batch results equal per-email analysis, in input order"""
+    ai_service = AIEmailService()
+    
+    results = await batch_service.process(emails)
+    
+    assert results == [ai_service.analyze_email(e).model_dump(mode="json") for e in emails]
+
+
+@pytest.mark.asyncio
+async def test_batch_spam_check(batch_service, emails):
+    """Test spam check operation"""
+    results = await batch_service.process(emails, operation="spam-check", chunk_size=4)
+    
+    assert [r["email_id"] for r in results] == [e.id for e in emails]
+    assert results[3]["is_spam"]
+    assert not results[0]["is_spam"]
+
+
+@pytest.mark.asyncio
+async def test_batch_streaming_yields_every_email(batch_service, emails):
+    """Test streaming returns one result per email"""
+    streamed = {}
+    async for index, result in batch_service.iter_process(emails, operation="classify"):
+        streamed[index] = result
+    
+    assert sorted(streamed) == list(range(len(emails)))
+    assert streamed[1]["category"] == "promotions"
+
+
+@pytest.mark.asyncio
+async def test_batch_unknown_operation(batch_service, emails):
+    """Test unknown operations are rejected"""
+    with pytest.raises(ValueError):
+        await batch_service.process(emails, operation="translate")
+
+
+@pytest.mark.asyncio
+async def test_batch_chunks_run_in_account_slots(batch_service, emails):
+    """Test each chunk takes and returns one of the account's scheduler slots"""
+    scheduler = FairScheduler(capacity=1)
+    batch_service.scheduler = scheduler
+    try:
+        results = await batch_service.process(emails, operation="classify", account="work")
+    finally:
+        batch_service.scheduler = None
+
+    assert len(results) == len(emails)
+    assert scheduler.stats()["work"]["granted"] == 4
+    assert scheduler.in_use == 0
+
+
+
+# Chunk starts seen by failing_chunk
+started_chunks = []
+
+
+def failing_chunk(operation, start, emails):
+    started_chunks.append(start)
+    if start == 0 and operation == "analyze":
+        raise RuntimeError("worker died")
+    time.sleep(0.05)
+    return [(start + offset, {}) for offset in range(len(emails))]
+
+
+@pytest.fixture
+def slot_service(monkeypatch):
+    """Batch service on threads whose chunks each take the one slot in turn"""
+    started_chunks.clear()
+    monkeypatch.setattr(batch_module, "_process_chunk", failing_chunk)
+    service = BatchAnalysisService(chunk_size=3, scheduler=FairScheduler(capacity=1))
+    service._executor = ThreadPoolExecutor(max_workers=2)
+    yield service
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_cancels_the_rest(slot_service, emails):
+    """Test chunks still waiting for a slot are cancelled when one fails"""
+    with pytest.raises(RuntimeError):
+        await slot_service.process(emails, account="work")
+    await asyncio.sleep(0.2)
+
+    assert len(started_chunks) < 4
+    assert slot_service.scheduler.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_stopped_stream_cancels_the_rest(slot_service, emails):
+    """Test closing the stream early cancels chunks that have not run"""
+    stream = slot_service.iter_process(emails, operation="classify", account="work")
+    await stream.__anext__()
+    await stream.aclose()
+    await asyncio.sleep(0.2)
+
+    assert len(started_chunks) < 4
+    assert slot_service.scheduler.in_use == 0
+
+
+def test_streamed_batch_reports_failures(slot_service, emails, monkeypatch):
+    """Test a chunk failing mid-stream ends the response with an error line"""
+    monkeypatch.setattr(routes, "_batch_service", slot_service)
+    monkeypatch.setenv("SUMMARY_PATH", "")
+    payload = {"emails": [e.model_dump(mode="json") for e in emails], "stream": True}
+
+    response = TestClient(main.app).post("/api/v1/emails/analyze/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.text.splitlines()[-1] == '{"error":"worker died"}'
@@ -0,0 +1,222 @@
+"""Tests for pooled mail server connections"""
+import socket
+import threading
+import time
+
+import pytest
+
+from src.services.connection_pool import (
+    ConnectionPool,
+    IMAPConnectionPool,
+    PoolTimeoutError,
+    SMTPConnectionPool
+)
+from src.services.email_service import EmailService
+from src.models.email_models import EmailConfig, OutgoingEmail
+from tests.standin_server import StandinServer, StandinSMTPServer
+from tests.test_email_service import make_service
+
+
+class FakeConnection:
+    """Connection stand-in that records health checks and closes"""
+
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+
+
+class FakePool(ConnectionPool[FakeConnection]):
+    def check_connection(self, connection: FakeConnection) -> bool:
+        return connection.healthy
+
+    def close_connection(self, connection: FakeConnection) -> None:
+        connection.closed = True
+
+
+@pytest.fixture
+def imap_server():
+    """Start an IMAP stand-in seeded with messages"""
+    with StandinServer() as server:
+        server.seed(10)
+        yield server
+
+
+def make_pooled_service(server, pool):
+    """Create an email service that borrows connections from pool"""
+    service = make_service(server)
+    return EmailService(service.config, service.password, imap_pool=pool)
+
+
+def test_pool_reuses_released_connection():
+    """Test a released connection is handed to the next caller"""
+    pool = FakePool(FakeConnection)
+
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["reused"] == 1
+    assert stats["reuse_rate"] == 0.5
+
+
+def test_pool_times_out_when_full():
+    """Test acquire waits for a free slot and then gives up"""
+    pool = FakePool(FakeConnection, max_size=1)
+    held = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    assert pool.acquire(timeout=1) is held
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_pool_replaces_unhealthy_and_discarded_connections():
+    """Test failed health checks and discards open a fresh connection"""
+    pool = FakePool(FakeConnection, check_after=0)
+
+    first = pool.acquire()
+    pool.release(first)
+    first.healthy = False
+    second = pool.acquire()
+    assert second is not first
+    assert first.closed
+
+    pool.release(second, discard=True)
+    assert second.closed
+    assert pool.acquire() not in (first, second)
+
+    stats = pool.stats()
+    assert stats["health_check_failures"] == 1
+    assert stats["discarded"] == 1
+
+
+def test_pool_evicts_idle_connections():
+    """Test connections idle past the timeout are closed"""
+    pool = FakePool(FakeConnection, idle_timeout=0.01)
+    connection = pool.acquire()
+    pool.release(connection)
+    time.sleep(0.02)
+
+    assert pool.evict_idle() == 1
+    assert connection.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_pooled_service_logs_in_once(imap_server):
+    """Test repeated fetches share one login and skip redundant SELECTs"""
+    pool = IMAPConnectionPool(make_service(imap_server).open_imap_connection)
+
+    for _ in range(3):
+        service = make_pooled_service(imap_server, pool)
+        service.connect_imap()
+        assert len(service.fetch_emails(limit=5)) == 5
+        service.disconnect()
+
+    assert imap_server.commands["CONNECT"] == 1
+    assert imap_server.commands["LOGIN"] == 1
+    assert imap_server.commands["SELECT"] == 1
+    stats = pool.stats()
+    assert stats["skipped_selects"] == 2
+    assert stats["reused"] == 2
+
+    pool.close()
+    assert pool.stats()["size"] == 0
+
+
+def test_pooled_service_discards_failed_connection(imap_server):
+    """Test a connection that hit an error is not returned to the pool"""
+    pool = IMAPConnectionPool(make_service(imap_server).open_imap_connection)
+    service = make_pooled_service(imap_server, pool)
+    service.connect_imap()
+    service.imap_connection.connection.shutdown()
+
+    with pytest.raises(Exception):
+        service.fetch_emails()
+    service.disconnect()
+
+    assert pool.stats()["discarded"] == 1
+    service = make_pooled_service(imap_server, pool)
+    service.connect_imap()
+    assert len(service.fetch_emails(limit=3)) == 3
+    service.disconnect()
+    assert imap_server.commands["LOGIN"] == 2
+
+
+@pytest.fixture
+def smtp_server():
+    """Start an SMTP stand-in"""
+    with StandinSMTPServer() as server:
+        yield server
+
+
+def make_smtp_service(server, pool=None):
+    """Create an email service that sends through the SMTP stand-in"""
+    config = EmailConfig(
+        email_address="user@example.com",
+        imap_server="127.0.0.1",
+        smtp_server="127.0.0.1",
+        smtp_port=server.port,
+        use_ssl=False,
+        smtp_starttls=False
+    )
+    return EmailService(config, "secret", smtp_pool=pool)
+
+
+def test_pooled_smtp_sessions_are_reset_and_reused(smtp_server):
+    """Test sends share one login and are separated by RSET"""
+    pool = SMTPConnectionPool(make_smtp_service(smtp_server).open_smtp_connection)
+
+    for i in range(3):
+        service = make_smtp_service(smtp_server, pool)
+        assert service.send_email(["a@example.com"], f"Notice {i}", "Body")
+        service.disconnect()
+
+    assert len(smtp_server.delivered) == 3
+    assert smtp_server.commands["CONNECT"] == 1
+    assert smtp_server.commands["AUTH"] == 1
+    assert smtp_server.commands["RSET"] == 3
+    pool.close()
+
+
+def test_send_bulk_reports_each_recipient(smtp_server):
+    """Test bulk sends spread over sessions and report refused recipients"""
+    smtp_server.refused.add("bounce@example.com")
+    pool = SMTPConnectionPool(make_smtp_service(smtp_server).open_smtp_connection, max_size=2)
+    service = make_smtp_service(smtp_server, pool)
+    messages = [
+        OutgoingEmail(to=[f"user{i}@example.com"], subject=f"Notice {i}", body="Body")
+        for i in range(10)
+    ]
+    messages.append(OutgoingEmail(to=["bounce@example.com", "ok@example.com"], subject="Mixed", body="Body"))
+    messages.append(OutgoingEmail(to=["bounce@example.com"], subject="Bounced", body="Body"))
+
+    result = service.send_bulk(messages)
+
+    assert result.sessions == 2
+    assert result.sent == 11
+    assert result.failed == 2
+    assert [s.message_index for s in result.recipients] == sorted(s.message_index for s in result.recipients)
+    refused = [s for s in result.recipients if s.status == "refused"]
+    assert [(s.message_index, s.code) for s in refused] == [(10, 550), (11, 550)]
+    assert len(smtp_server.delivered) == 11
+    assert smtp_server.commands["CONNECT"] == 2
+
+
+def test_send_bulk_retries_dropped_session(smtp_server):
+    """Test a session closed by the server is replaced mid-send"""
+    pool = SMTPConnectionPool(make_smtp_service(smtp_server).open_smtp_connection, check_after=60)
+    service = make_smtp_service(smtp_server, pool)
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.sock.shutdown(socket.SHUT_RDWR)
+
+    result = service.send_bulk([OutgoingEmail(to=["a@example.com"], subject="Hi", body="Body")])
+
+    assert result.sent == 1
+    assert len(smtp_server.delivered) == 1
+    assert pool.stats()["discarded"] == 1
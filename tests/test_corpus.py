@@ -0,0 +1,31 @@
+"""Tests for the synthetic corpus and parsing it"""
+import email
+import email.policy
+
+from src.services.mime_parser import parse_message
+from tests.corpus import generate_corpus
+
+
+def test_corpus_is_seeded():
+    """Test the same seed gives the same corpus and another seed does not"""
+    assert [m.raw for m in generate_corpus(20, seed=1)] == [m.raw for m in generate_corpus(20, seed=1)]
+    assert [m.raw for m in generate_corpus(20, seed=1)] != [m.raw for m in generate_corpus(20, seed=2)]
+
+
+def test_corpus_parses_like_standard_parser():
+    """Test every corpus message parses to the bodies the email package finds"""
+    corpus = generate_corpus(150)
+    assert {m.structure for m in corpus} == {"plain", "alternative", "html", "attachments"}
+    assert len({m.language for m in corpus}) > 3
+
+    for message in corpus:
+        parsed = parse_message(message.raw, 10_000_000)
+        reference = email.message_from_bytes(message.raw, policy=email.policy.default)
+        plain = reference.get_body(("plain",))
+        html = reference.get_body(("html",))
+        if reference.is_multipart():
+            assert parsed.body == (plain.get_content() if plain else "")
+            assert parsed.html_body == (html.get_content() if html else None)
+        else:
+            assert parsed.body == reference.get_content()
+        assert len(parsed.attachments) == len(list(reference.iter_attachments()))
@@ -0,0 +1,276 @@
+"""Tests for the email service against a local IMAP stand-in"""
+import pytest
+
+from src.services.email_service import EmailService
+from src.services.imap_utils import FetchResponse, body_structure, parse_fetch_response, parse_imap_list, to_sequence_set
+from src.services.sync_state import SyncStateStore
+from src.models.email_models import EmailConfig
+from tests.standin_server import StandinServer
+
+
+@pytest.fixture
+def imap_server():
+    """Start an IMAP stand-in seeded with messages"""
+    with StandinServer() as server:
+        server.seed(25, seen_every=3)
+        server.folders["INBOX"].messages[1].flags.add("\\Flagged")
+        yield server
+
+
+def make_service(server, chunk_size=200):
+    """Create an email service pointed at the stand-in"""
+    config = EmailConfig(
+        email_address="user@example.com",
+        imap_server="127.0.0.1",
+        smtp_server="127.0.0.1",
+        imap_port=server.port,
+        use_ssl=False,
+        fetch_chunk_size=chunk_size
+    )
+    return EmailService(config, "secret")
+
+
+def test_to_sequence_set():
+    """Test compressing ids into IMAP sequence sets"""
+    assert to_sequence_set([b"3", b"1", b"2", b"7", b"9", b"10"]) == "1:3,7,9:10"
+    assert to_sequence_set([]) == ""
+
+
+@pytest.mark.parametrize("data", [b'("text" NIL', b'("text', b'("te\\', b"(", b'(("a" "b")'])
+def test_parse_imap_list_rejects_truncated_data(data):
+    """Test unclosed lists and strings raise instead of looping forever"""
+    with pytest.raises(ValueError):
+        parse_imap_list(data)
+
+
+def test_malformed_body_structure_counts_as_missing():
+    """Test a truncated BODYSTRUCTURE is treated as no structure"""
+    response = FetchResponse(sequence="1", attributes=b'UID 4 BODYSTRUCTURE ("text" "plain" NIL')
+    
+    assert body_structure(response) is None
+    data = b'("text" NIL 12 "a\\"b")'
+    assert parse_imap_list(data) == (["text", None, 12, 'a"b'], len(data))
+
+
+def test_parse_fetch_response_demultiplexes_messages():
+    """Test splitting imaplib FETCH data into per-message responses"""
+    data = [
+        (b"1 (UID 11 FLAGS (\\Seen) RFC822 {5}", b"first"),
+        b")",
+        (b"2 (UID 12 RFC822 {6}", b"second"),
+        b" FLAGS (\\Flagged))",
+        b"3 (FLAGS ())",
+    ]
+    
+    responses = parse_fetch_response(data)
+    
+    assert [r.sequence for r in responses] == ["1", "2", "3"]
+    assert responses[0].uid == "11"
+    assert responses[0].flags == ["\\Seen"]
+    assert responses[1].literal("RFC822") == b"second"
+    assert responses[1].flags == ["\\Flagged"]
+    assert responses[2].literal("RFC822") is None
+
+
+def test_fetch_emails_batches_fetch_commands(imap_server):
+    """Test messages are fetched in chunks rather than one by one"""
+    service = make_service(imap_server, chunk_size=10)
+    
+    emails = service.fetch_emails(limit=25)
+    service.disconnect()
+    
+    assert [e.id for e in emails] == [str(n) for n in range(1, 26)]
+    assert emails[0].subject == "Message 0"
+    assert imap_server.commands["FETCH"] == 3
+
+
+def test_iter_emails_fetches_chunks_lazily(imap_server):
+    """Test iter_emails yields messages before later chunks are fetched"""
+    service = make_service(imap_server, chunk_size=10)
+    
+    emails = service.iter_emails(limit=25)
+    first = next(emails)
+    assert first.id == "1"
+    assert imap_server.commands["FETCH"] == 1
+    
+    rest = list(emails)
+    service.disconnect()
+    
+    assert [e.id for e in rest] == [str(n) for n in range(2, 26)]
+    assert imap_server.commands["FETCH"] == 3
+
+
+def test_fetch_emails_returns_flags(imap_server):
+    """Test FLAGS are returned with the message"""
+    service = make_service(imap_server)
+    
+    emails = service.fetch_emails(limit=5)
+    service.disconnect()
+    
+    assert [e.uid for e in emails] == ["21", "22", "23", "24", "25"]
+    assert [e.is_read for e in emails] == [False, True, False, False, True]
+    
+    emails = make_service(imap_server).fetch_emails(limit=25)
+    assert emails[1].is_starred
+    assert not emails[2].is_starred
+
+
+def test_fetch_emails_unread_only(imap_server):
+    """Test fetching unread messages"""
+    service = make_service(imap_server)
+    
+    emails = service.fetch_emails(limit=50, unread_only=True)
+    service.disconnect()
+    
+    assert len(emails) == 16
+    assert all(not e.is_read for e in emails)
+
+
+def test_fetch_messages_by_uid(imap_server):
+    """Test fetching a UID set"""
+    service = make_service(imap_server, chunk_size=2)
+    service.connect_imap()
+    service.imap_connection.select("INBOX")
+    
+    emails = service._fetch_messages([b"4", b"5", b"9"], "INBOX", by_uid=True)
+    service.disconnect()
+    
+    assert [e.uid for e in emails] == ["4", "5", "9"]
+    assert imap_server.commands["UID FETCH"] == 2
+
+
+@pytest.fixture
+def state_store():
+    """Create an in-memory sync state store"""
+    store = SyncStateStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_sync_fetches_only_new_messages(imap_server, state_store):
+    """Test incremental sync downloads only unseen UIDs"""
+    first = make_service(imap_server).sync_emails(state_store, initial_limit=10)
+    
+    assert first.full_resync
+    assert [m.uid for m in first.new_messages] == [str(u) for u in range(16, 26)]
+    assert first.highest_uid == 25
+    
+    imap_server.seed(3)
+    second = make_service(imap_server).sync_emails(state_store)
+    
+    assert not second.full_resync
+    assert [m.uid for m in second.new_messages] == ["26", "27", "28"]
+    assert state_store.get("user@example.com", "INBOX").highest_uid == 28
+    
+    third = make_service(imap_server).sync_emails(state_store)
+    
+    assert third.new_messages == []
+
+
+def test_sync_reports_flag_changes_with_condstore(imap_server, state_store):
+    """Test CONDSTORE sync reports only messages whose flags changed"""
+    imap_server.capabilities += ["CONDSTORE", "ENABLE"]
+    make_service(imap_server).sync_emails(state_store)
+    
+    imap_server.folders["INBOX"].set_flags(7, ["\\Seen", "\\Flagged"])
+    result = make_service(imap_server).sync_emails(state_store)
+    
+    assert result.new_messages == []
+    assert [(c.uid, c.is_read, c.is_starred) for c in result.flag_changes] == [("7", True, True)]
+    assert result.highest_modseq == imap_server.folders["INBOX"].highestmodseq
+
+
+def test_sync_reports_only_changed_flags_without_condstore(imap_server, state_store):
+    """Test sync without CONDSTORE reports just the messages whose flags changed"""
+    make_service(imap_server).sync_emails(state_store, initial_limit=10)
+    imap_server.seed(2)
+    second = make_service(imap_server).sync_emails(state_store)
+    assert second.flag_changes == []
+    
+    imap_server.folders["INBOX"].set_flags(20, ["\\Seen"])
+    imap_server.folders["INBOX"].set_flags(26, ["\\Flagged"])
+    imap_server.folders["INBOX"].expunge(22)
+    third = make_service(imap_server).sync_emails(state_store)
+    
+    assert [(c.uid, c.is_read, c.is_starred) for c in third.flag_changes] == [("20", True, False), ("26", False, True)]
+    assert "22" not in state_store.get_flags("user@example.com", "INBOX")
+    assert make_service(imap_server).sync_emails(state_store).flag_changes == []
+
+
+def test_sync_resyncs_when_uidvalidity_changes(imap_server, state_store):
+    """Test a UIDVALIDITY change discards the saved state"""
+    make_service(imap_server).sync_emails(state_store)
+    imap_server.folders["INBOX"].reset_uidvalidity()
+    
+    result = make_service(imap_server).sync_emails(state_store, initial_limit=5)
+    
+    assert result.full_resync
+    assert result.uidvalidity == 2
+    assert len(result.new_messages) == 5
+
+
+def test_sync_reports_expunged_known_messages(imap_server, state_store):
+    """Test sync reports which of the caller's known UIDs are gone"""
+    make_service(imap_server).sync_emails(state_store)
+    imap_server.folders["INBOX"].expunge(3)
+    imap_server.folders["INBOX"].expunge(8)
+    
+    result = make_service(imap_server).sync_emails(state_store, known_uids=["2", "3", "8", "9"])
+    
+    assert result.expunged == ["3", "8"]
+    assert make_service(imap_server).sync_emails(state_store).expunged == []
+
+
+def test_fetch_summaries(imap_server):
+    """Test headers-only fetch builds summaries with previews"""
+    from tests.standin_server import make_message
+    mailbox = imap_server.folders["INBOX"]
+    mailbox.append(make_message(100, subject="With attachment", body="See the attached file.", attachment=b"\0" * 5000))
+    mailbox.append(make_message(101, subject="HTML", body="Plain version here.", html="<p>Rich <b>version</b></p>"))
+    service = make_service(imap_server)
+    
+    summaries = service.fetch_summaries(limit=3, preview_length=12)
+    service.disconnect()
+    
+    assert [s.subject for s in summaries] == ["Message 24", "With attachment", "HTML"]
+    assert summaries[0].preview == "Body of mess"
+    assert summaries[1].preview == "See the atta"
+    assert summaries[1].has_attachments
+    assert not summaries[2].has_attachments
+    assert summaries[2].preview == "Plain versio"
+    assert summaries[1].size > 5000
+    assert summaries[0].sender.email == "sender24@example.com"
+
+
+def test_fetch_email_by_uid(imap_server):
+    """Test loading a single full message by UID"""
+    service = make_service(imap_server)
+    
+    message = service.fetch_email_by_uid(7)
+    missing = service.fetch_email_by_uid(999)
+    service.disconnect()
+    
+    assert message.uid == "7"
+    assert message.subject == "Message 6"
+    assert "project report" in message.body
+    assert missing is None
+
+
+def test_recipients_skip_groups_and_bare_names(imap_server):
+    """Test group syntax and entries without an address do not become recipients"""
+    from tests.standin_server import make_message
+    headers = {
+        "undisclosed-recipients:;": [],
+        'team: a@example.com, "Doe, J" <j@example.com>;, nobody': [("a@example.com", None), ("j@example.com", "Doe, J")],
+    }
+    mailbox = imap_server.folders["INBOX"]
+    for index, to in enumerate(headers):
+        mailbox.append(make_message(100 + index).replace(b"To: user@example.com", f"To: {to}".encode()))
+    service = make_service(imap_server)
+    
+    messages = service.fetch_emails(limit=2)
+    summaries = service.fetch_summaries(limit=2)
+    service.disconnect()
+    
+    for items in (messages, summaries):
+        assert [[(r.email, r.name) for r in item.recipients] for item in items] == list(headers.values())
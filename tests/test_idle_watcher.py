@@ -0,0 +1,153 @@
+"""Tests for IMAP IDLE watches and new-mail events"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+from src.services.ai_service import AIEmailService
+from src.services.async_imap import AsyncIMAPClient
+from src.services.idle_watcher import EventBroker, IdleWatcher, MailEvent
+from src.services.search_index import SearchIndex
+from tests.standin_server import StandinServer, make_message
+from tests.test_email_service import make_service
+
+
+@pytest.fixture
+def imap_server():
+    """Start an IMAP stand-in with a few messages already in the inbox"""
+    with StandinServer() as server:
+        server.seed(3)
+        yield server
+
+
+async def append_later(server, delay, index=100, folder="INBOX"):
+    await asyncio.sleep(delay)
+    server.folders[folder].append(make_message(index))
+
+
+@pytest.mark.asyncio
+async def test_idle_returns_on_new_mail_or_timeout(imap_server):
+    """Test IDLE ends as soon as mail arrives and comes back empty when quiet"""
+    client = await AsyncIMAPClient.connect("127.0.0.1", imap_server.port, use_ssl=False)
+    await client.login("user@example.com", "secret")
+    await client.select("INBOX")
+
+    asyncio.create_task(append_later(imap_server, 0.05))
+    started = time.perf_counter()
+    changes = await client.idle(5.0)
+    assert time.perf_counter() - started < 1.0
+    assert changes["EXISTS"] == [b"4"]
+
+    assert await client.idle(0.05) == {}
+    assert (await client.noop())[0] == "OK"
+    await client.logout()
+
+
+@pytest.mark.asyncio
+async def test_watch_fetches_only_new_mail(imap_server):
+    """Test a watch yields just the new message and sends nothing while quiet"""
+    service = make_service(imap_server)
+    watch = service.watch_async("INBOX", idle_timeout=5.0)
+    first = asyncio.ensure_future(watch.__anext__())
+    await asyncio.sleep(0.2)
+    imap_server.reset_counters()
+    await asyncio.sleep(0.2)
+    assert imap_server.round_trips == 0
+
+    imap_server.folders["INBOX"].append(make_message(100))
+    messages = await asyncio.wait_for(first, 1.0)
+
+    assert [m.uid for m in messages] == ["4"]
+    assert messages[0].subject == "Message 100"
+    await watch.aclose()
+    await service.disconnect_async()
+
+
+@pytest.mark.asyncio
+async def test_watcher_publishes_analyzed_mail(imap_server):
+    """Test the watcher analyzes new mail and publishes it to subscribers"""
+    broker = EventBroker()
+    queue = broker.subscribe()
+    index = SearchIndex(":memory:")
+    watcher = IdleWatcher(
+        lambda: make_service(imap_server), ["INBOX"], AIEmailService(), broker, idle_timeout=5.0, index=index
+    )
+    watcher.start()
+    try:
+        await asyncio.sleep(0.2)
+        imap_server.folders["INBOX"].append(make_message(100))
+        event = await asyncio.wait_for(queue.get(), 2.0)
+    finally:
+        await watcher.stop()
+
+    assert isinstance(event, MailEvent)
+    assert (event.account, event.folder) == ("user@example.com", "INBOX")
+    assert event.email.subject == "Message 100"
+    assert event.analysis.email_id == event.email.id
+    assert watcher.stats()["messages"] == 1
+    # Watched mail is searchable as soon as it is published
+    assert [hit.uid for hit in index.search("\"Message 100\"")] == ["4"]
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_watcher_reconnects_after_failure(imap_server):
+    """Test a watch that cannot connect is retried until it succeeds"""
+    attempts = []
+
+    def factory():
+        attempts.append(None)
+        service = make_service(imap_server)
+        if len(attempts) < 3:
+            # Nothing listens on port 1, so the connection is refused
+            service.config = service.config.model_copy(update={"imap_port": 1})
+        return service
+
+    broker = EventBroker()
+    queue = broker.subscribe()
+    watcher = IdleWatcher(factory, ["INBOX"], AIEmailService(), broker, idle_timeout=5.0, retry_delay=0.01)
+    watcher.start()
+    try:
+        while len(attempts) < 3:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        imap_server.folders["INBOX"].append(make_message(100))
+        event = await asyncio.wait_for(queue.get(), 2.0)
+    finally:
+        await watcher.stop()
+
+    assert event.email.subject == "Message 100"
+    assert watcher.stats()["reconnects"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_loses_oldest_events():
+    """Test a full subscriber queue drops its oldest event rather than blocking"""
+    broker = EventBroker(queue_size=2)
+    queue = broker.subscribe()
+    for event in ("a", "b", "c"):
+        broker.publish(event)
+
+    assert [queue.get_nowait(), queue.get_nowait()] == ["b", "c"]
+    assert broker.dropped == 1
+    broker.unsubscribe(queue)
+    assert broker.subscribers == 0
+
+
+def test_events_need_the_watcher():
+    """Test the event stream is unavailable while no folders are watched"""
+    response = TestClient(main.app).get("/api/v1/emails/events")
+
+    assert response.status_code == 503
+
+
+def test_startup_without_watch_folders(monkeypatch):
+    """Test the app starts when neither WATCH_FOLDERS nor an account is configured"""
+    monkeypatch.delenv("WATCH_FOLDERS", raising=False)
+    monkeypatch.delenv("EMAIL_ADDRESS", raising=False)
+
+    with TestClient(main.app) as client:
+        assert client.get("/api/v1/health").status_code == 200
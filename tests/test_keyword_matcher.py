@@ -0,0 +1,58 @@
+"""Tests for the keyword matcher"""
+import pytest
+
+from src.services.ai_service import AIEmailService
+from src.services.keyword_matcher import KeywordMatcher
+
+
+SAMPLE_TEXTS = [
+    "",
+    "urgent: project deadline tomorrow. please submit the report asap!",
+    "click here now! act now! limited time offer! 100% free!",
+    "i know the snow is due today, can you help?",
+    "paymentoday invoice re: billing receipt",
+]
+
+
+@pytest.fixture(params=["automaton", "fallback"])
+def matcher(request):
+    """Create matcher over the AI service vocabulary for each backend"""
+    matcher = KeywordMatcher(AIEmailService.get_matcher().keywords)
+    if request.param == "fallback":
+        matcher._automaton = None
+    elif matcher._automaton is None:
+        pytest.skip("pyahocorasick not installed")
+    return matcher
+
+
+@pytest.mark.parametrize("text", SAMPLE_TEXTS)
+def test_matcher_agrees_with_substring_search(matcher, text):
+    """Test that reported keywords are exactly those found by `in`"""
+    expected = {keyword for keyword in matcher.keywords if keyword in text}
+
+    assert set(matcher.count(text)) == expected
+
+
+def test_matcher_reports_overlapping_keywords(matcher):
+    """Test overlapping and nested keywords are all reported"""
+    hits = matcher.count("click here now")
+
+    assert "click here now" in hits
+    assert "click here" in hits
+    assert "now" in hits
+
+
+def test_matcher_counts_occurrences(matcher):
+    """Test keyword occurrence counting"""
+    hits = matcher.count("meeting? another meeting?")
+
+    assert hits["meeting"] == 2
+    assert hits["?"] == 2
+
+
+def test_matcher_deduplicates_keywords():
+    """Test duplicate keywords are compiled once"""
+    matcher = KeywordMatcher(["deadline", "urgent", "deadline", ""])
+
+    assert matcher.keywords == ("deadline", "urgent")
+    assert "urgent" in matcher
@@ -0,0 +1,222 @@
+"""Tests for the incrementally maintained mailbox triage summary"""
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.api import routes
+from src.models.email_models import EmailAddress, EmailAnalysis, EmailClassification, EmailMessage
+from src.services.ai_service import PriorityInputs
+from src.services.batch_service import BatchAnalysisService
+from src.services.mailbox_summary import MailboxSummary
+from tests.standin_server import StandinServer, make_message
+
+
+def make_email(uid: int, sender: str, is_read: bool = False, date: datetime = None) -> EmailMessage:
+    return EmailMessage(
+        id=f"<{uid}@example.com>",
+        uid=str(uid),
+        subject=f"Message {uid}",
+        sender=EmailAddress(email=sender),
+        recipients=[EmailAddress(email="user@example.com")],
+        body="",
+        date=date or datetime(2024, 1, uid, 12, 0),
+        is_read=is_read
+    )
+
+
+def make_analysis(uid: int, category: str, sentiment: str) -> EmailAnalysis:
+    # The classification's priority is computed at analysis time and not counted
+    return EmailAnalysis(
+        email_id=str(uid),
+        classification=EmailClassification(category=category, priority="low", confidence=0.8),
+        sentiment=sentiment
+    )
+
+
+def make_inputs(urgent_count: int, is_reply: bool = False) -> PriorityInputs:
+    return PriorityInputs(urgent_count=urgent_count, is_reply=is_reply)
+
+
+@pytest.fixture
+def summary(tmp_path):
+    """Create a summary of a few analyzed messages"""
+    summary = MailboxSummary(str(tmp_path / "summary.db"))
+    emails = [
+        make_email(1, "billing@bank.example"),
+        make_email(2, "billing@bank.example", is_read=True),
+        make_email(3, "boss@work.example"),
+        make_email(4, "Friend@Home.example"),
+    ]
+    analyses = [
+        make_analysis(1, "finance", "negative"),
+        make_analysis(2, "finance", "neutral"),
+        make_analysis(3, "work", "neutral"),
+        make_analysis(4, "personal", "positive"),
+    ]
+    inputs = [make_inputs(2), make_inputs(3), make_inputs(1), make_inputs(0)]
+    summary.add_many("user@example.com", "INBOX", 1, emails, analyses, inputs)
+    yield summary
+    summary.close()
+
+
+def test_counts_by_facet(summary):
+    """Test counts by category, priority, sentiment, read state and domain"""
+    result = summary.summary("user@example.com")
+
+    assert (result.total, result.unread) == (4, 3)
+    assert result.by_category["finance"].model_dump() == {"total": 2, "unread": 1}
+    assert {p: c.total for p, c in result.by_priority.items()} == {"high": 2, "medium": 1, "low": 1}
+    assert result.by_sentiment["neutral"].total == 2
+    assert result.by_read_state == {"read": 1, "unread": 3}
+    assert [(d.domain, d.total) for d in result.top_sender_domains][:1] == [("bank.example", 2)]
+    assert "home.example" in [d.domain for d in result.top_sender_domains]
+
+
+def test_filters_answer_combined_questions(summary):
+    """Test "how many high priority finance emails are unread" comes from the aggregates"""
+    result = summary.summary("user@example.com", category="finance", priority="high", unread_only=True)
+
+    assert result.total == 1
+    assert list(result.by_sentiment) == ["negative"]
+    assert summary.summary("other@example.com").total == 0
+
+
+def test_changes_adjust_counts(summary):
+    """Test read state changes, replacements and deletes update the counts"""
+    assert summary.set_read("user@example.com", "INBOX", [("1", True), ("2", True), ("9", True)]) == 1
+    summary.add_many("user@example.com", "INBOX", 1, [make_email(3, "boss@work.example")],
+                     [make_analysis(3, "work", "negative")], [make_inputs(2)])
+    summary.delete("user@example.com", "INBOX", ["4"])
+    result = summary.summary("user@example.com")
+
+    assert (result.total, result.unread) == (3, 1)
+    assert set(result.by_category) == {"finance", "work"}
+    assert result.by_priority["high"].model_dump() == {"total": 3, "unread": 1}
+    assert "medium" not in result.by_priority
+    assert [d.domain for d in result.top_sender_domains] == ["bank.example", "work.example"]
+    assert summary.uids("user@example.com", "INBOX") == ["1", "2", "3"]
+
+
+def test_uidvalidity_change_drops_counts(summary):
+    """Test counts from an older UIDVALIDITY are dropped"""
+    emails = [make_email(1, "boss@work.example")]
+    assert summary.new_emails("user@example.com", "INBOX", 2, emails) == emails
+
+    summary.add_many("user@example.com", "INBOX", 2, emails, [make_analysis(1, "work", "neutral")], [make_inputs(0)])
+
+    assert summary.summary("user@example.com").total == 1
+    assert summary.new_emails("user@example.com", "INBOX", 2, emails) == []
+
+
+def test_priority_is_derived_when_summarizing(tmp_path):
+    """Test a message with one urgent keyword counts as high priority only while it is recent"""
+    summary = MailboxSummary(str(tmp_path / "summary.db"))
+    now = datetime.now(timezone.utc)
+    emails = [
+        make_email(1, "ops@work.example", date=now - timedelta(minutes=10)),
+        make_email(2, "ops@work.example", date=now - timedelta(hours=2)),
+        make_email(3, "ops@work.example", date=now - timedelta(minutes=5)),
+    ]
+    analyses = [make_analysis(uid, "work", "neutral") for uid in (1, 2, 3)]
+    summary.add_many("user@example.com", "INBOX", 1, emails, analyses, [make_inputs(1), make_inputs(1), make_inputs(0, True)])
+    summary.set_read("user@example.com", "INBOX", [("1", True)])
+
+    result = summary.summary("user@example.com")
+    assert result.by_priority["high"].model_dump() == {"total": 1, "unread": 0}
+    assert result.by_priority["medium"].model_dump() == {"total": 2, "unread": 2}
+    assert summary.summary("user@example.com", priority="high").total == 1
+    assert summary.summary("user@example.com", priority="high", unread_only=True).total == 0
+    assert summary.summary("user@example.com", priority="medium", category="finance").total == 0
+    summary.close()
+
+
+def test_summary_with_stored_priorities_is_rebuilt(tmp_path):
+    """Test a summary from before priorities were derived is dropped and recreated"""
+    path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE messages (account TEXT, folder TEXT, uid INTEGER, priority TEXT)")
+    connection.execute("CREATE TABLE counts (account TEXT, priority TEXT, count INTEGER)")
+    connection.execute("INSERT INTO messages VALUES ('user@example.com', 'INBOX', 1, 'high')")
+    connection.commit()
+    connection.close()
+
+    summary = MailboxSummary(path)
+    assert summary.count() == 0
+    assert summary.summary("user@example.com").total == 0
+    summary.close()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Serve the API for one account on an IMAP stand-in, with the summary enabled"""
+    with StandinServer() as server:
+        server.seed(6)
+        for key, value in {
+            "EMAIL_ADDRESS": "user@example.com",
+            "EMAIL_PASSWORD": "secret",
+            "IMAP_SERVER": "127.0.0.1",
+            "IMAP_PORT": str(server.port),
+            "USE_SSL": "false",
+            "ACCOUNTS": "",
+            "SYNC_STATE_PATH": str(tmp_path / "sync_state.db"),
+            "MESSAGE_STORE_PATH": "",
+            "SEARCH_INDEX_PATH": "",
+            "SUMMARY_PATH": str(tmp_path / "summary.db"),
+        }.items():
+            monkeypatch.setenv(key, value)
+        for name in ("_account_registry", "_fetch_scheduler", "_analysis_scheduler", "_sync_state_store", "_mailbox_summary"):
+            monkeypatch.setattr(routes, name, None)
+        batch_service = BatchAnalysisService()
+        batch_service._executor = ThreadPoolExecutor(max_workers=2)
+        monkeypatch.setattr(routes, "_batch_service", batch_service)
+        yield TestClient(main.app), server
+        batch_service.shutdown()
+        routes.get_mailbox_summary().close()
+        routes.get_sync_state_store().close()
+        for kind, _, pool in routes.get_account_registry().pools():
+            if kind != "imap_async":
+                pool.close()
+
+
+def test_summary_follows_sync(client):
+    """Test the summary counts synced mail and follows flag changes and expunges"""
+    client, server = client
+    assert client.post("/api/v1/emails/sync", json={}).status_code == 200
+    before = client.get("/api/v1/emails/summary").json()
+
+    server.folders["INBOX"].set_flags(2, ["\\Seen"])
+    server.folders["INBOX"].expunge(5)
+    server.folders["INBOX"].append(make_message(6, subject="URGENT: invoice overdue"))
+    result = client.post("/api/v1/emails/sync", json={}).json()
+    after = client.get("/api/v1/emails/summary?domains=0").json()
+
+    assert result["expunged"] == ["5"]
+    assert (before["total"], before["unread"]) == (6, 6)
+    # One message read, one unread expunged and one unread arrived
+    assert (after["total"], after["unread"]) == (6, 5)
+    assert after["by_read_state"] == {"read": 1, "unread": 5}
+    assert after["top_sender_domains"] == []
+    assert sum(c["total"] for c in after["by_category"].values()) == 6
+
+
+def test_summary_follows_list_views_streams_and_batches(client):
+    """Test headers-mode fetches, analyzed streams and analyzed batches all reach the summary"""
+    client, server = client
+    streamed = client.post("/api/v1/emails/fetch/stream", json={"limit": 4, "analyze": True})
+    assert len(streamed.text.splitlines()) == 4
+    assert routes.get_mailbox_summary().count() == 4
+
+    server.folders["INBOX"].set_flags(6, ["\\Seen"])
+    assert client.post("/api/v1/emails/fetch", json={"limit": 10, "mode": "headers"}).status_code == 200
+    assert client.get("/api/v1/emails/summary").json()["unread"] == 3
+
+    email = make_email(27, "boss@work.example", is_read=True).model_dump(mode="json")
+    email["folder"] = "Archive"
+    unnumbered = dict(email, uid="1:*", id="<other@example.com>")
+    assert client.post("/api/v1/emails/analyze/batch", json={"emails": [email, unnumbered]}).status_code == 200
+    result = client.get("/api/v1/emails/summary?folder=Archive").json()
+    assert (result["total"], result["unread"]) == (1, 0)
@@ -0,0 +1,149 @@
+"""Tests for the local message store"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.models.records import AddressRecord, MessageRecord
+from src.services.email_service import EmailService
+from src.services.message_store import MessageStore
+from tests.standin_server import StandinServer
+from tests.test_email_service import make_service
+
+
+@pytest.fixture
+def imap_server():
+    """Start an IMAP stand-in seeded with messages"""
+    with StandinServer() as server:
+        server.seed(25)
+        yield server
+
+
+@pytest.fixture
+def message_store(tmp_path):
+    """Create a message store in a temporary directory"""
+    store = MessageStore(str(tmp_path / "messages.db"))
+    yield store
+    store.close()
+
+
+def make_message(uid: int) -> MessageRecord:
+    return MessageRecord(
+        id=str(uid),
+        uid=str(uid),
+        subject=f"Message {uid}",
+        sender=AddressRecord(email="sender@example.com"),
+        recipients=[AddressRecord(email="user@example.com")],
+        body="Body text " * 50,
+        date=datetime(2024, 1, 1, 12, 0)
+    )
+
+
+def make_stored_service(server, store):
+    """Create an email service that keeps fetched messages in store"""
+    base = make_service(server)
+    return EmailService(base.config, base.password, message_store=store)
+
+
+def test_store_round_trip_and_uidvalidity_change(message_store):
+    """Test stored messages come back intact until UIDVALIDITY changes"""
+    message_store.put_many("user@example.com", "INBOX", 1, [make_message(1), make_message(2)])
+
+    found = message_store.get_many("user@example.com", "INBOX", 1, ["1", "2", "3"])
+    assert sorted(found) == ["1", "2"]
+    assert found["1"] == make_message(1)
+    assert message_store.get_many("user@example.com", "Archive", 1, ["1"]) == {}
+
+    message_store.put_many("user@example.com", "INBOX", 2, [make_message(5)])
+    assert message_store.get_many("user@example.com", "INBOX", 1, ["1", "2"]) == {}
+    assert list(message_store.get_many("user@example.com", "INBOX", 2, ["5"])) == ["5"]
+
+    stats = message_store.stats()
+    assert stats["hits"] == 3
+    assert stats["invalidated"] == 2
+
+
+def test_store_serves_concurrent_readers(message_store):
+    """Test readers on several threads see the stored messages"""
+    message_store.put_many("user@example.com", "INBOX", 1, [make_message(uid) for uid in range(1, 101)])
+    counts = []
+
+    def read():
+        counts.append(len(message_store.get_many("user@example.com", "INBOX", 1, map(str, range(1, 101)))))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counts == [100] * 8
+
+
+def test_fetch_emails_downloads_each_message_once(imap_server, message_store):
+    """Test a repeat fetch is served from the store with current flags"""
+    service = make_stored_service(imap_server, message_store)
+    first = service.fetch_emails(limit=10)
+    service.disconnect()
+
+    imap_server.folders["INBOX"].messages[-1].flags.add("\\Seen")
+    service = make_stored_service(imap_server, message_store)
+    second = service.fetch_emails(limit=10)
+    service.disconnect()
+
+    assert imap_server.commands["UID FETCH"] == 1
+    assert [m.uid for m in second] == [m.uid for m in first]
+    assert [m.id for m in second] == [m.id for m in first]
+    assert second[-1].is_read and not first[-1].is_read
+    assert second[0].body == first[0].body
+
+
+@pytest.mark.asyncio
+async def test_fetch_emails_async_uses_store(imap_server, message_store):
+    """Test the async fetch path reads and fills the same store"""
+    service = make_stored_service(imap_server, message_store)
+    service.fetch_emails(limit=5)
+    service.disconnect()
+
+    service = make_stored_service(imap_server, message_store)
+    emails = await service.fetch_emails_async(limit=8)
+    await service.disconnect_async()
+
+    assert len(emails) == 8
+    assert message_store.stats()["hits"] == 5
+    assert message_store.stats()["stored"] == 8
+
+
+def test_fetch_email_by_uid_uses_store(imap_server, message_store):
+    """Test lazy loads by UID skip the download when stored"""
+    service = make_stored_service(imap_server, message_store)
+    service.fetch_emails(limit=3)
+    uid = imap_server.folders["INBOX"].messages[-1].uid
+
+    email = service.fetch_email_by_uid(uid)
+    missing = service.fetch_email_by_uid(999)
+    service.disconnect()
+
+    assert email.uid == str(uid)
+    assert missing is None
+    assert imap_server.commands["UID FETCH"] == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_emails_async_parses_and_stores_off_the_loop(imap_server, message_store):
+    """Test MIME parsing and store calls of the async fetch run on worker threads"""
+    service = make_stored_service(imap_server, message_store)
+    threads = []
+    for name in ("_collect_messages", "_split_stored"):
+        method = getattr(service, name)
+
+        def record(*args, method=method, **kwargs):
+            threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+
+        setattr(service, name, record)
+    emails = await service.fetch_emails_async(limit=5)
+    await service.disconnect_async()
+
+    assert len(emails) == 5
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,76 @@
+"""Tests for stage metrics and their Prometheus rendering"""
+import pytest
+
+from src.services.ai_service import AIEmailService
+from src.utils.metrics import Metrics, metrics
+from tests.standin_server import StandinServer
+from tests.test_email_service import make_service
+
+
+@pytest.fixture
+def recorded():
+    """Enable the process-wide metrics and start from zero"""
+    enabled = metrics.enabled
+    metrics.enabled = True
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+    metrics.enabled = enabled
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test observations land in le buckets that add up to the count"""
+    registry = Metrics(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.05, 3.0):
+        registry.observe("imap_fetch", seconds)
+    registry.count("bytes", "mime_parse", 1024)
+
+    text = registry.render()
+
+    assert 'email_assistant_stage_seconds_bucket{stage="imap_fetch",le="0.01"} 1' in text
+    assert 'email_assistant_stage_seconds_bucket{stage="imap_fetch",le="0.1"} 3' in text
+    assert 'email_assistant_stage_seconds_bucket{stage="imap_fetch",le="+Inf"} 4' in text
+    assert 'email_assistant_stage_seconds_count{stage="imap_fetch"} 4' in text
+    assert 'email_assistant_bytes_total{stage="mime_parse"} 1024' in text
+
+
+def test_component_stats_are_typed():
+    """Test pool and cache stats render as gauges and _total counters"""
+    text = Metrics().render([("pool", {"pool": "imap"}, {"size": 2, "acquires": 7, "wait_seconds_total": 0.5})])
+
+    assert "# TYPE email_assistant_pool_size gauge" in text
+    assert 'email_assistant_pool_size{pool="imap"} 2' in text
+    assert 'email_assistant_pool_acquires_total{pool="imap"} 7' in text
+    assert 'email_assistant_pool_wait_seconds_total{pool="imap"} 0.5' in text
+
+
+def test_fetch_and_analysis_record_stages(recorded):
+    """Test a fetch and an analysis time each stage they go through"""
+    with StandinServer() as server:
+        server.seed(5)
+        service = make_service(server)
+        emails = service.fetch_emails(limit=5)
+        service.disconnect()
+    for email in emails:
+        AIEmailService().analyze_email(email)
+
+    counts = recorded.stage_counts()
+    assert counts["imap_connect"] == 1
+    assert counts["imap_select"] == 1
+    assert counts["imap_search"] == 1
+    assert counts["imap_fetch"] == 1
+    assert counts["mime_parse"] == 5
+    assert counts["classify"] == counts["sentiment"] == counts["action_items"] == 5
+    assert 'email_assistant_messages_total{stage="mime_parse"} 5' in recorded.render()
+
+
+def test_disabled_metrics_record_nothing(recorded):
+    """Test nothing is recorded while metrics are turned off"""
+    recorded.enabled = False
+    with StandinServer() as server:
+        server.seed(3)
+        service = make_service(server)
+        service.fetch_emails(limit=3)
+        service.disconnect()
+
+    assert recorded.stage_counts() == {}
@@ -0,0 +1,103 @@
+"""Tests for the attachment-skipping MIME parser"""
+import email
+import email.policy
+import tracemalloc
+from email.message import EmailMessage as MIMEMessage
+
+from src.services.mime_parser import parse_message
+
+
+def build_message(text="Hello", html="<p>Hello</p>", attachments=()):
+    """Build a multipart message with the standard library"""
+    message = MIMEMessage()
+    message["Subject"] = "Report"
+    message["From"] = "alice@example.com"
+    message["To"] = "bob@example.com"
+    message.set_content(text)
+    if html is not None:
+        message.add_alternative(html, subtype="html")
+    for filename, data in attachments:
+        message.add_attachment(data, maintype="application", subtype="octet-stream", filename=filename)
+    return message.as_bytes()
+
+
+def test_bodies_match_standard_parser():
+    """Test text and HTML bodies equal what the email package decodes"""
+    raw = build_message(text="Grüße aus Köln\n" * 3, html="<b>Grüße</b>\n", attachments=[("a.bin", b"x" * 100)])
+    reference = email.message_from_bytes(raw, policy=email.policy.default)
+
+    parsed = parse_message(raw, 1_000_000)
+
+    assert parsed.body == reference.get_body(("plain",)).get_content()
+    assert parsed.html_body == reference.get_body(("html",)).get_content()
+    assert parsed.headers["Subject"] == "Report"
+    assert not parsed.truncated
+
+
+def test_attachments_are_described_not_decoded():
+    """Test attachments are recorded by name, type and decoded size"""
+    raw = build_message(attachments=[("data.bin", bytes(range(256)) * 40), ("Überblick.pdf", b"%PDF" * 3)])
+
+    parsed = parse_message(raw, 1_000_000)
+
+    assert [(a.filename, a.content_type, a.size) for a in parsed.attachments] == [
+        ("data.bin", "application/octet-stream", 10240),
+        ("Überblick.pdf", "application/octet-stream", 12),
+    ]
+
+
+def test_text_bodies_are_capped():
+    """Test bodies are cut at the byte cap without splitting characters"""
+    raw = build_message(text="é" * 1000, html=None)
+
+    parsed = parse_message(raw, 101)
+
+    assert parsed.truncated
+    assert parsed.body == "é" * 50
+
+
+def test_declared_charset_is_used():
+    """Test non-UTF-8 parts are decoded with their charset"""
+    raw = (
+        b"Subject: Hi\r\nMIME-Version: 1.0\r\n"
+        b"Content-Type: text/plain; charset=iso-8859-1\r\n"
+        b"Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+        b"Caf=E9 =\r\nau lait"
+    )
+
+    parsed = parse_message(raw, 1_000_000)
+
+    assert parsed.body == "Café au lait"
+    assert parsed.attachments == []
+
+
+def test_boundaries_are_matched_exactly():
+    """Test a boundary that prefixes another does not split parts"""
+    raw = (
+        b"Content-Type: multipart/mixed; boundary=\"b\"\r\n\r\n"
+        b"--b\r\nContent-Type: multipart/alternative; boundary=\"bb\"\r\n\r\n"
+        b"--bb\r\nContent-Type: text/plain\r\n\r\nplain text\r\n"
+        b"--bb\r\nContent-Type: text/html\r\n\r\n<p>html</p>\r\n"
+        b"--bb--\r\n"
+        b"--b\r\nContent-Type: image/png\r\nContent-Transfer-Encoding: base64\r\n\r\niVBORw0K\r\n"
+        b"--b--\r\n"
+    )
+
+    parsed = parse_message(raw, 1_000_000)
+
+    assert parsed.body == "plain text"
+    assert parsed.html_body == "<p>html</p>"
+    assert [(a.filename, a.content_type, a.size) for a in parsed.attachments] == [(None, "image/png", 6)]
+
+
+def test_large_attachment_is_not_copied():
+    """Test parsing memory does not grow with attachment size"""
+    raw = build_message(attachments=[("big.bin", b"\0" * 20_000_000)])
+
+    tracemalloc.start()
+    parsed = parse_message(raw, 1_000_000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert parsed.attachments[0].size == 20_000_000
+    assert peak < 1_000_000
@@ -78,3 +78,4 @@ def test_email_config_creation():
     assert config.imap_port == 993
     assert config.smtp_port == 587
     assert config.use_ssl
+    assert config.smtp_starttls
@@ -0,0 +1,127 @@
+"""Tests for the pipelined fetch, parse and analysis engine"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from src.services.ai_service import AIEmailService
+from src.services.message_store import MessageStore
+from src.services.pipeline import FetchPipeline, PipelineStats
+from src.services.scheduler import FairScheduler
+from tests.standin_server import StandinServer
+from tests.test_email_service import make_service
+
+
+@pytest.fixture
+def imap_server():
+    """Start an IMAP stand-in seeded with a varied corpus"""
+    with StandinServer() as server:
+        server.seed(30, seen_every=4, corpus_seed=7)
+        yield server
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_pipeline_matches_fetch_and_analyze(imap_server):
+    """Test results on a process pool equal a serial fetch followed by analysis"""
+    service = make_service(imap_server, chunk_size=7)
+    expected = service.fetch_emails(limit=25)
+    service.disconnect()
+
+    service = make_service(imap_server, chunk_size=7)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        results = list(FetchPipeline(service, pool).run(limit=25))
+    service.disconnect()
+
+    ai_service = AIEmailService()
+    assert [email for email, _ in results] == expected
+    assert [analysis for _, analysis in results] == [ai_service.analyze_email(email) for email in expected]
+
+
+def test_stages_overlap(imap_server, executor):
+    """Test chunks keep downloading while the consumer works on earlier ones"""
+    imap_server.command_latency = {"FETCH": 0.1}
+    service = make_service(imap_server, chunk_size=6)
+    stats = PipelineStats()
+
+    started = time.perf_counter()
+    for index, _ in enumerate(FetchPipeline(service, executor, stats).run(limit=30, analyze=False)):
+        if index % 6 == 0:
+            time.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    service.disconnect()
+
+    # Five chunks each take 0.1s to download and 0.1s to consume
+    assert elapsed < 0.85
+    assert stats.stats()["stages"]["fetch"]["chunks"] == 5
+    assert stats.stats()["stages"]["emit"]["items"] == 30
+
+
+def test_backpressure_caps_chunks_in_flight(imap_server, executor):
+    """Test a stalled consumer stops fetching after the queues fill"""
+    service = make_service(imap_server, chunk_size=2)
+    stats = PipelineStats()
+    results = FetchPipeline(service, executor, stats, queue_size=1).run(limit=30)
+
+    next(results)
+    time.sleep(0.3)
+    fetched = stats.stats()["stages"]["fetch"]["chunks"]
+    results.close()
+    service.disconnect()
+
+    # One chunk being emitted, one per queue and one held by each thread
+    assert fetched <= 5
+    assert stats.stats()["queues"]["fetched"]["depth_max"] <= 1
+
+
+def test_new_messages_are_stored(imap_server, executor, tmp_path):
+    """Test parsed messages land in the message store and are not downloaded again"""
+    store = MessageStore(str(tmp_path / "messages.db"))
+    service = make_service(imap_server)
+    service.message_store = store
+    first = [email for email, _ in FetchPipeline(service, executor).run(limit=10, analyze=False)]
+    service.disconnect()
+
+    imap_server.reset_counters()
+    service = make_service(imap_server)
+    service.message_store = store
+    second = [email for email, _ in FetchPipeline(service, executor).run(limit=10, analyze=False)]
+    service.disconnect()
+
+    assert second == first
+    assert "UID FETCH" not in imap_server.commands
+    store.close()
+
+
+def test_chunks_run_in_account_slots(imap_server, executor):
+    """Test every chunk is downloaded and parsed in a slot of the account"""
+    fetch_scheduler = FairScheduler(capacity=1)
+    analysis_scheduler = FairScheduler(capacity=1)
+    service = make_service(imap_server, chunk_size=10)
+    pipeline = FetchPipeline(
+        service,
+        executor,
+        account="work",
+        fetch_scheduler=fetch_scheduler,
+        analysis_scheduler=analysis_scheduler
+    )
+    results = list(pipeline.run(limit=30))
+    service.disconnect()
+
+    assert len(results) == 30
+    # One more fetch slot finds there are no chunks left
+    assert fetch_scheduler.stats()["work"]["granted"] == 4
+    assert analysis_scheduler.stats()["work"]["granted"] == 3
+    assert fetch_scheduler.in_use == analysis_scheduler.in_use == 0
+
+
+def test_fetch_failure_reaches_the_consumer(executor):
+    """Test an error in the fetch stage is raised from the results iterator"""
+    with StandinServer(credentials={"user@example.com": "other"}) as server:
+        service = make_service(server)
+        with pytest.raises(Exception):
+            list(FetchPipeline(service, executor).run(limit=5))
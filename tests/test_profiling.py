@@ -0,0 +1,116 @@
+"""Tests for on-demand request profiling"""
+import pstats
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.api import routes
+from src.models.email_models import EmailMessage
+from src.models.records import MessageRecord
+from src.services.ai_service import AIEmailService
+from src.utils.profiling import RequestProfiler
+from tests.standin_server import StandinServer, make_message
+
+EMAIL = {
+    "id": "1",
+    "subject": "Project meeting tomorrow",
+    "sender": {"email": "boss@example.com"},
+    "recipients": [{"email": "user@example.com"}],
+    "body": "Please review the report before the meeting. Could you send the slides today?",
+    "date": "2024-01-01T12:00:00+00:00",
+}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Client for the app with admin endpoints enabled and a fresh profiler"""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret-token")
+    routes.get_profiler().disarm()
+    monkeypatch.setattr(routes.get_profiler(), "directory", str(tmp_path))
+    monkeypatch.setattr(routes.get_profiler(), "captures", [])
+    return TestClient(main.app, headers={"X-Admin-Token": "secret-token"})
+
+
+def test_admin_token_is_required(client, monkeypatch):
+    """Test profiling endpoints need the admin token and vanish without one"""
+    assert client.get("/api/v1/admin/profiling").status_code == 200
+    assert client.get("/api/v1/admin/profiling", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    monkeypatch.delenv("ADMIN_TOKEN")
+    assert client.get("/api/v1/admin/profiling").status_code == 404
+
+
+def test_armed_requests_are_profiled(client):
+    """Test the next N matching requests are captured with service functions attributed"""
+    armed = client.post("/api/v1/admin/profiling", json={"routes": ["/emails/analyze"], "count": 2, "mode": "cprofile"})
+    assert armed.json()["remaining"] == 2
+
+    assert client.get("/api/v1/health").status_code == 200
+    for _ in range(3):
+        assert client.post("/api/v1/emails/analyze", json=EMAIL).status_code == 200
+
+    status = client.get("/api/v1/admin/profiling").json()
+    assert status["remaining"] == 0
+    assert [c["path"] for c in status["captures"]] == ["/api/v1/emails/analyze"] * 2
+    assert "services.ai_service:analyze_email" in [name for name, _ in status["captures"][0]["top"]]
+
+    download = client.get(f"/api/v1/admin/profiling/{status['captures'][0]['id']}")
+    assert download.status_code == 200
+    path = status["captures"][0]["file"]
+    assert any(name == "analyze_email" for _, _, name in pstats.Stats(path).stats)
+
+
+def test_sampling_profile_is_collapsed_stacks(tmp_path):
+    """Test the sampler writes collapsed stacks of application code on any thread"""
+    profiler = RequestProfiler(str(tmp_path), sample_interval=0.001)
+    profiler.arm(["/emails/analyze"], 1, mode="sampling")
+    mode = profiler.claim("/api/v1/emails/analyze")
+    assert profiler.claim("/api/v1/emails/analyze") is None
+
+    collector = profiler.start(mode)
+    started_at = datetime.now(timezone.utc)
+    record = MessageRecord.from_model(EmailMessage.model_validate(EMAIL))
+    service = AIEmailService()
+    for _ in range(3000):
+        service.analyze_email(record)
+    capture = profiler.finish("/api/v1/emails/analyze", mode, collector, 0.0, started_at)
+
+    lines = open(capture.file).read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert "services.ai_service:AIEmailService.analyze_email" in [name for name, _ in capture.top]
+
+
+def test_fetch_is_sampled_by_default(client, monkeypatch):
+    """Test the default mode samples, so parsing done off the event loop is captured"""
+    armed = client.post("/api/v1/admin/profiling", json={"routes": ["/emails/fetch"], "count": 1})
+    assert armed.json()["mode"] == "sampling"
+    monkeypatch.setattr(routes.get_profiler(), "sample_interval", 0.001)
+
+    with StandinServer() as server:
+        server.seed(1)
+        for _ in range(300):
+            server.folders["INBOX"].append(make_message(0))
+        for key, value in {
+            "EMAIL_ADDRESS": "user@example.com",
+            "EMAIL_PASSWORD": "secret",
+            "IMAP_SERVER": "127.0.0.1",
+            "IMAP_PORT": str(server.port),
+            "USE_SSL": "false",
+            "ACCOUNTS": "",
+            "MESSAGE_STORE_PATH": "",
+            "SEARCH_INDEX_PATH": "",
+            "SUMMARY_PATH": "",
+        }.items():
+            monkeypatch.setenv(key, value)
+        for name in ("_account_registry", "_fetch_scheduler"):
+            monkeypatch.setattr(routes, name, None)
+        assert client.post("/api/v1/emails/fetch", json={"limit": 300}).status_code == 200
+        for kind, _, pool in routes.get_account_registry().pools():
+            if kind != "imap_async":
+                pool.close()
+
+    capture = routes.get_profiler().status()["captures"][0]
+    assert capture.mode == "sampling"
+    assert any(name.startswith("services.email_service:") for name, _ in capture.top)
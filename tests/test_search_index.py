@@ -0,0 +1,225 @@
+"""Tests for the full-text search index"""
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.api import routes
+from src.models.email_models import EmailAddress, EmailClassification, EmailMessage
+from src.services.ai_service import PriorityInputs
+from src.services.batch_service import BatchAnalysisService
+from src.services.search_index import QuerySyntaxError, SearchIndex, parse_query
+from tests.standin_server import StandinServer, make_message
+
+NOT_URGENT = PriorityInputs(urgent_count=0, is_reply=False)
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Create a search index seeded with a few messages"""
+    index = SearchIndex(str(tmp_path / "search.db"))
+    emails = [
+        make_email(1, "Team meeting on Friday", "Agenda for the weekly team meeting", "alice@example.com"),
+        make_email(2, "Invoice 4411 overdue", "Please pay the attached invoice asap", "billing@example.com"),
+        make_email(3, "Lunch?", "Are you free for lunch after the meeting?", "bob@example.com"),
+        make_email(4, "Invoicing changes", "New invoicing process from next month", "billing@example.com"),
+    ]
+    classifications = [
+        make_classification("work", "medium", ["meeting"]),
+        make_classification("finance", "high", ["invoice", "urgent"]),
+        make_classification("personal", "low"),
+        make_classification("finance", "low", ["invoice"]),
+    ]
+    priority_inputs = [
+        PriorityInputs(urgent_count=1, is_reply=False),
+        PriorityInputs(urgent_count=2, is_reply=False),
+        NOT_URGENT,
+        NOT_URGENT,
+    ]
+    index.add_many("user@example.com", "INBOX", 1, emails, classifications, priority_inputs)
+    yield index
+    index.close()
+
+
+def make_email(uid: int, subject: str, body: str, sender: str, date: datetime = None) -> EmailMessage:
+    return EmailMessage(
+        id=f"<{uid}@example.com>",
+        uid=str(uid),
+        subject=subject,
+        sender=EmailAddress(email=sender),
+        recipients=[EmailAddress(email="user@example.com")],
+        body=body,
+        date=date or datetime(2024, 1, uid, 12, 0)
+    )
+
+
+def make_classification(category: str, priority: str, tags=None) -> EmailClassification:
+    return EmailClassification(category=category, priority=priority, confidence=0.8, tags=tags or [])
+
+
+def uids(hits):
+    return sorted(hit.uid for hit in hits)
+
+
+def test_parse_query_translates_operators():
+    """Test user queries become FTS5 expressions"""
+    assert parse_query("invoice overdue") == '"invoice" AND "overdue"'
+    assert parse_query("a AND NOT b") == '"a" NOT "b"'
+    assert parse_query("invoice -paid") == '"invoice" NOT "paid"'
+    assert parse_query('subject:"team meeting" (urgent OR asap)') == (
+        'subject : "team meeting" AND ( "urgent" OR "asap" )'
+    )
+    assert parse_query("invoic*") == '"invoic" *'
+
+
+@pytest.mark.parametrize("query", ["", "NOT a", "-a", "a OR", 'a "open'])
+def test_parse_query_rejects_malformed_queries(query):
+    """Test malformed queries raise QuerySyntaxError"""
+    with pytest.raises(QuerySyntaxError):
+        parse_query(query)
+
+
+def test_search_boolean_phrase_field_and_prefix(index):
+    """Test the supported query forms find the right messages"""
+    assert uids(index.search("meeting")) == ["1", "3"]
+    assert uids(index.search("meeting NOT lunch")) == ["1"]
+    assert uids(index.search('"team meeting"')) == ["1"]
+    assert uids(index.search("subject:meeting")) == ["1"]
+    assert uids(index.search("sender:billing")) == ["2", "4"]
+    assert uids(index.search("invoic*")) == ["2", "4"]
+    assert uids(index.search("lunch OR overdue")) == ["2", "3"]
+
+
+def test_search_ranks_subject_matches_first(index):
+    """Test subject matches outrank body matches and date order works"""
+    hits = index.search("meeting")
+    assert hits[0].uid == "1"
+    assert "[meeting]" in hits[0].snippet
+
+    assert [hit.uid for hit in index.search("meeting", order="date")] == ["3", "1"]
+
+
+def test_search_filters_by_category_and_priority(index):
+    """Test classification filters narrow the results"""
+    assert uids(index.search("invoic*", category="finance", priority="high")) == ["2"]
+    assert uids(index.search("tags:urgent")) == ["2"]
+    assert index.search("meeting", category="finance") == []
+    assert index.search("meeting", folder="Archive") == []
+
+
+def test_priority_is_derived_when_searching(index):
+    """Test an urgent message is high priority only while it is recent"""
+    now = datetime.now(timezone.utc)
+    emails = [
+        make_email(5, "Server down", "Fix it", "ops@example.com", date=now - timedelta(minutes=10)),
+        make_email(6, "Server down", "Fix it", "ops@example.com", date=now - timedelta(hours=2)),
+    ]
+    urgent = PriorityInputs(urgent_count=1, is_reply=False)
+    # The classifications' priorities are computed at index time and not stored
+    classifications = [make_classification("work", "high"), make_classification("work", "high")]
+    index.add_many("user@example.com", "INBOX", 1, emails, classifications, [urgent, urgent])
+
+    assert uids(index.search("server", priority="high")) == ["5"]
+    assert uids(index.search("server", priority="medium")) == ["6"]
+    assert {hit.uid: hit.priority for hit in index.search("server")} == {"5": "high", "6": "medium"}
+
+
+def test_date_order_compares_instants(index):
+    """Test dates with different UTC offsets sort by the moment they denote"""
+    emails = [
+        make_email(5, "Offsets", "", "a@example.com", date=datetime(2024, 2, 1, 10, 0, tzinfo=timezone(timedelta(hours=5)))),
+        make_email(6, "Offsets", "", "a@example.com", date=datetime(2024, 2, 1, 8, 0, tzinfo=timezone.utc)),
+    ]
+    index.add_many("user@example.com", "INBOX", 1, emails, [make_classification("work", "low")] * 2, [NOT_URGENT] * 2)
+
+    hits = index.search("offsets", order="date")
+    assert [hit.uid for hit in hits] == ["6", "5"]
+    assert hits[1].date == datetime(2024, 2, 1, 5, 0, tzinfo=timezone.utc)
+
+
+def test_index_with_stored_priorities_is_rebuilt(tmp_path):
+    """Test an index from before priorities were derived is dropped and recreated"""
+    path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE documents (id INTEGER PRIMARY KEY, priority TEXT)")
+    connection.execute("CREATE VIRTUAL TABLE documents_text USING fts5(subject)")
+    connection.execute("INSERT INTO documents VALUES (1, 'high')")
+    connection.commit()
+    connection.close()
+
+    index = SearchIndex(path)
+    assert index.count() == 0
+    index.close()
+
+
+def test_reindexing_replaces_entries(index):
+    """Test indexing a message again replaces its document"""
+    email = make_email(3, "Dinner?", "Are you free for dinner?", "bob@example.com")
+    index.add_many("user@example.com", "INBOX", 1, [email], [make_classification("personal", "low")], [NOT_URGENT])
+
+    assert index.count() == 4
+    assert index.search("lunch") == []
+    assert uids(index.search("dinner")) == ["3"]
+
+
+def test_new_emails_and_uidvalidity_change(index):
+    """Test only unindexed messages are new and UIDVALIDITY changes drop documents"""
+    emails = [make_email(uid, "Subject", "Body", "a@example.com") for uid in (4, 5)]
+    assert [e.uid for e in index.new_emails("user@example.com", "INBOX", 1, emails)] == ["5"]
+    assert len(index.new_emails("user@example.com", "INBOX", 2, emails)) == 2
+
+    index.add_many("user@example.com", "INBOX", 2, emails[1:], [make_classification("work", "low")], [NOT_URGENT])
+
+    assert index.count() == 1
+    assert index.search("meeting") == []
+
+
+def test_search_reports_invalid_queries(index):
+    """Test malformed queries raise QuerySyntaxError from search"""
+    with pytest.raises(QuerySyntaxError):
+        index.search("meeting AND")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Serve the API for one account on an IMAP stand-in, with the search index enabled"""
+    with StandinServer() as server:
+        server.seed(3)
+        server.folders["INBOX"].append(make_message(3, subject="Invoice overdue"))
+        for key, value in {
+            "EMAIL_ADDRESS": "user@example.com",
+            "EMAIL_PASSWORD": "secret",
+            "IMAP_SERVER": "127.0.0.1",
+            "IMAP_PORT": str(server.port),
+            "USE_SSL": "false",
+            "ACCOUNTS": "",
+            "FETCH_CHUNK_SIZE": "2",
+            "MESSAGE_STORE_PATH": "",
+            "SEARCH_INDEX_PATH": str(tmp_path / "search.db"),
+            "SUMMARY_PATH": "",
+        }.items():
+            monkeypatch.setenv(key, value)
+        for name in ("_account_registry", "_fetch_scheduler", "_analysis_scheduler", "_search_index"):
+            monkeypatch.setattr(routes, name, None)
+        batch_service = BatchAnalysisService()
+        batch_service._executor = ThreadPoolExecutor(max_workers=2)
+        monkeypatch.setattr(routes, "_batch_service", batch_service)
+        yield TestClient(main.app)
+        batch_service.shutdown()
+        routes.get_search_index().close()
+        for kind, _, pool in routes.get_account_registry().pools():
+            if kind != "imap_async":
+                pool.close()
+
+
+def test_streamed_messages_are_indexed(client):
+    """Test messages streamed by /emails/fetch/stream become searchable"""
+    response = client.post("/api/v1/emails/fetch/stream", json={"limit": 10})
+    assert len(response.text.splitlines()) == 4
+
+    assert routes.get_search_index().count() == 4
+    hits = client.get("/api/v1/emails/search?q=invoice").json()
+    assert [hit["uid"] for hit in hits] == ["4"]
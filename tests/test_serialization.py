@@ -0,0 +1,74 @@
+"""Tests for the fast JSON response path"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from src.api import serialization
+from src.api.serialization import FastJSONResponse, check_fields, dumps, project_all
+from src.models.email_models import EmailAnalysis, EmailClassification, EmailMessage
+from src.models.records import AddressRecord, AttachmentRecord, MessageRecord
+
+
+def make_record(uid: int) -> MessageRecord:
+    return MessageRecord(
+        id=str(uid),
+        uid=str(uid),
+        subject=f"Message {uid}",
+        sender=AddressRecord(email="sender@example.com", name="Sender"),
+        recipients=[AddressRecord(email="user@example.com")],
+        body="Body text",
+        html_body="<p>Body text</p>",
+        date=datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc),
+        attachments=["report.pdf"],
+        attachment_info=[AttachmentRecord("report.pdf", "application/pdf", 1024)]
+    )
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Run a test with orjson and with the standard library fallback"""
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_records_encode_like_the_api_model(encoder):
+    """Test encoded records validate to the same EmailMessage"""
+    records = [make_record(1), make_record(2)]
+
+    decoded = json.loads(FastJSONResponse(records).body)
+
+    assert [EmailMessage.model_validate(item) for item in decoded] == [r.to_model() for r in records]
+
+
+def test_models_and_nested_values_are_encoded(encoder):
+    """Test pydantic models inside the content are encoded"""
+    analysis = EmailAnalysis(
+        email_id="1",
+        classification=EmailClassification(category="work", priority="low", confidence=0.5)
+    )
+
+    decoded = json.loads(dumps({"email": make_record(1), "analysis": analysis}))
+
+    assert decoded["analysis"] == analysis.model_dump(mode="json")
+    assert decoded["email"]["sender"] == {"email": "sender@example.com", "name": "Sender"}
+
+
+def test_projection_keeps_only_named_fields(encoder):
+    """Test fields= drops everything else, bodies included"""
+    decoded = json.loads(dumps(project_all([make_record(1)], ["uid", "subject", "date"])))
+
+    assert decoded == [{"uid": "1", "subject": "Message 1", "date": "2024-01-01T12:00:00+00:00"}]
+
+
+def test_unknown_fields_are_rejected():
+    """Test projections are checked against the response model"""
+    check_fields(["uid", "body"], EmailMessage)
+    check_fields(None, EmailMessage)
+    with pytest.raises(HTTPException) as error:
+        check_fields(["uid", "secret"], EmailMessage)
+    assert error.value.status_code == 400
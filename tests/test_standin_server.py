@@ -0,0 +1,150 @@
+"""Tests for the IMAP and SMTP stand-ins used by tests and benchmarks"""
+import imaplib
+import socket
+import time
+
+from src.services.email_service import EmailService
+from src.models.email_models import EmailConfig
+from tests.standin_server import StandinServer, StandinSMTPServer, make_message
+
+
+def make_tls_service(imap_server, smtp_server):
+    """Create an email service that uses IMAPS and SMTP STARTTLS"""
+    config = EmailConfig(
+        email_address="user@example.com",
+        imap_server="127.0.0.1",
+        smtp_server="127.0.0.1",
+        imap_port=imap_server.port,
+        smtp_port=smtp_server.port,
+        use_ssl=True
+    )
+    return EmailService(config, "secret")
+
+
+def test_smtp_uses_starttls_without_imap_ssl():
+    """Test SMTP credentials are sent over TLS even when IMAP runs without SSL"""
+    with StandinSMTPServer(starttls=True) as smtp_server:
+        config = EmailConfig(
+            email_address="user@example.com",
+            imap_server="127.0.0.1",
+            smtp_server="127.0.0.1",
+            smtp_port=smtp_server.port,
+            use_ssl=False
+        )
+        service = EmailService(config, "secret")
+        assert service.send_email(["a@example.com"], "Hello", "Body")
+        service.disconnect()
+
+    assert smtp_server.commands["STARTTLS"] == 1
+
+
+def test_search_criteria():
+    """Test SEARCH combines flags, headers, dates and sequence sets"""
+    with StandinServer() as server:
+        server.seed(6, seen_every=2)
+        server.folders["INBOX"].messages[3].flags.add("\\Flagged")
+        connection = imaplib.IMAP4("127.0.0.1", server.port)
+        connection.login("user@example.com", "secret")
+        connection.select("INBOX")
+
+        def search(*criteria):
+            return connection.search(None, *criteria)[1][0].split()
+
+        assert search("ALL") == [b"1", b"2", b"3", b"4", b"5", b"6"]
+        assert search("UNSEEN", "NOT", "FLAGGED") == [b"2", b"6"]
+        assert search("OR", "FROM", "sender1@", "SUBJECT", '"Message 5"') == [b"2", b"6"]
+        assert search("2:4", "SINCE", "1-Jan-2024") == [b"2", b"3", b"4"]
+        assert search("BEFORE", "1-Jan-2024") == []
+        connection.logout()
+
+
+def test_idle_reports_new_and_changed_messages():
+    """Test an IDLE session is told about appends and flag changes until DONE"""
+    with StandinServer() as server:
+        server.seed(2)
+        with socket.create_connection(("127.0.0.1", server.port)) as sock:
+            stream = sock.makefile("rwb")
+            stream.readline()
+            for command in (b"a LOGIN user secret", b"b SELECT INBOX"):
+                stream.write(command + b"\r\n")
+                stream.flush()
+                while not stream.readline().startswith(command[:2]):
+                    pass
+            stream.write(b"c IDLE\r\n")
+            stream.flush()
+            assert stream.readline() == b"+ idling\r\n"
+
+            server.folders["INBOX"].append(make_message(2))
+            assert stream.readline() == b"* 3 EXISTS\r\n"
+            server.folders["INBOX"].set_flags(1, ["\\Seen"])
+            assert stream.readline() == b"* 1 FETCH (UID 1 FLAGS (\\Seen))\r\n"
+
+            stream.write(b"DONE\r\n")
+            stream.flush()
+            assert stream.readline() == b"c OK IDLE terminated\r\n"
+
+
+def test_tls_for_imap_and_smtp():
+    """Test the service fetches over IMAPS and sends after SMTP STARTTLS"""
+    with StandinServer(implicit_tls=True) as imap_server, StandinSMTPServer(starttls=True) as smtp_server:
+        imap_server.seed(3)
+        service = make_tls_service(imap_server, smtp_server)
+
+        assert len(service.fetch_emails(limit=3)) == 3
+        assert service.send_email(["a@example.com"], "Hello", "Body")
+        service.disconnect()
+
+    assert smtp_server.commands["STARTTLS"] == 1
+    assert len(smtp_server.delivered) == 1
+
+
+def test_imap_starttls():
+    """Test STARTTLS upgrades a plain IMAP connection and is then withdrawn"""
+    with StandinServer(starttls=True) as server:
+        server.seed(1)
+        connection = imaplib.IMAP4("127.0.0.1", server.port)
+        assert "STARTTLS" in connection.capabilities
+
+        connection.starttls()
+        connection.login("user@example.com", "secret")
+
+        assert "STARTTLS" not in connection.capabilities
+        assert connection.select("INBOX") == ("OK", [b"1"])
+        connection.logout()
+
+
+def test_per_command_latency():
+    """Test latency can be added to specific commands only"""
+    with StandinServer(command_latency={"SELECT": 0.2}) as server:
+        connection = imaplib.IMAP4("127.0.0.1", server.port)
+        connection.login("user@example.com", "secret")
+        start = time.perf_counter()
+        connection.noop()
+        noop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        connection.select("INBOX")
+        select_time = time.perf_counter() - start
+        connection.logout()
+
+    assert noop_time < 0.1
+    assert select_time >= 0.2
+
+
+def test_seed_from_corpus():
+    """Test the stand-in can be seeded with the synthetic corpus"""
+    with StandinServer() as server:
+        server.seed(20, corpus_seed=3)
+        config = EmailConfig(
+            email_address="user@example.com",
+            imap_server="127.0.0.1",
+            smtp_server="127.0.0.1",
+            imap_port=server.port,
+            use_ssl=False
+        )
+        service = EmailService(config, "secret")
+
+        emails = service.fetch_emails(limit=20)
+        service.disconnect()
+
+    assert len(emails) == 20
+    assert any(email.attachments for email in emails)